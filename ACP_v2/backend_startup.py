@@ -98,8 +98,8 @@ class BackendOrchestrator:
         log(f"   > Detected latest scan: {latest_scan.name}")
 
         # 2. Run Hydration Script (The Bridge)
-        # We assume hydrate_memory.py is in root
-        cmd = f'python hydrate_memory.py "{latest_scan}"'
+        # Bulk loader in tools/analysis; run as a module from the project root
+        cmd = f'python -m tools.analysis.hydrate_memory "{latest_scan}"'
         try:
             subprocess.run(cmd, shell=True, check=True, cwd=self.root)
             log("✅ Memory Hydration Complete.")
@@ -8,10 +8,14 @@ class Settings:
     def __init__(self):
         self.COLLECTION_TRUTH: str = os.environ.get('COLLECTION_TRUTH', 'truth_collection')
         self.COLLECTION_TRACES: str = os.environ.get('COLLECTION_TRACES', 'traces')
+        # Source files (by sha256 of their bytes) whose chunks are all stored
+        self.COLLECTION_SOURCES: str = os.environ.get('COLLECTION_SOURCES', 'ingested_sources')
         self.NUM_RETRIEVAL_RESULTS: int = int(os.environ.get('NUM_RETRIEVAL_RESULTS', 5))
         self.OCR_TEXT_DENSITY_THRESHOLD: int = int(os.environ.get('OCR_TEXT_DENSITY_THRESHOLD', 100))
         self.CHUNK_SIZE: int = int(os.environ.get('CHUNK_SIZE', 500))
         self.CHUNK_OVERLAP: int = int(os.environ.get('CHUNK_OVERLAP', 50))
+        # 'chars' (CHUNK_SIZE/CHUNK_OVERLAP in characters), 'words' or 'tiktoken:<encoding>' (in tokens)
+        self.CHUNK_TOKENIZER: str = os.environ.get('CHUNK_TOKENIZER', 'chars')
         self.MONGO_URI: str = os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
         self.DB_NAME: str = os.environ.get('DB_NAME', 'aletheia_db')
         self.CHROMA_DB_PATH: Path = Path(os.environ.get('CHROMA_DB_PATH', './chroma_db'))
@@ -22,6 +26,27 @@ class Settings:
         self.SSE_METRIC_KEY: str = os.environ.get('SSE_METRIC_KEY', 'sse_metric')
         self.STABILITY_METRIC_KEY: str = os.environ.get('STABILITY_METRIC_KEY', 'stability_metric')
         self.HASH_KEY: str = os.environ.get('HASH_KEY', 'hash_key')
+        # Scanned-page OCR: render DPI, worker processes (0 = inline), page cache ('' disables it)
+        self.OCR_DPI: int = int(os.environ.get('OCR_DPI', 200))
+        self.OCR_WORKERS: int = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+        self.OCR_CACHE_PATH: str = os.environ.get('OCR_CACHE_PATH', './ocr_cache.db')
+        # Persistent embedding cache ('' disables it) and /v1/embeddings batching
+        self.EMBEDDING_CACHE_PATH: str = os.environ.get('EMBEDDING_CACHE_PATH', './embedding_cache.db')
+        self.EMBEDDING_BATCH_SIZE: int = int(os.environ.get('EMBEDDING_BATCH_SIZE', 64))
+        self.EMBEDDING_POOL_SIZE: int = int(os.environ.get('EMBEDDING_POOL_SIZE', 8))
+        # Ingest pipeline tuning (IngestManager.process_all)
+        self.INGEST_EXTRACT_WORKERS: int = int(os.environ.get('INGEST_EXTRACT_WORKERS', os.cpu_count() or 1))
+        self.INGEST_MAX_PENDING_FILES: int = int(os.environ.get('INGEST_MAX_PENDING_FILES', 16))
+        self.INGEST_EMBED_BATCH_SIZE: int = int(os.environ.get('INGEST_EMBED_BATCH_SIZE', 32))
+        self.INGEST_EMBED_WORKERS: int = int(os.environ.get('INGEST_EMBED_WORKERS', 4))
+        self.INGEST_WRITE_BATCH_SIZE: int = int(os.environ.get('INGEST_WRITE_BATCH_SIZE', 256))
+        self.INGEST_QUEUE_SIZE: int = int(os.environ.get('INGEST_QUEUE_SIZE', 8))
+        # Serve retrieved chunks from the Chroma documents instead of MongoDB when present
+        self.RETRIEVAL_FROM_INDEX: bool = os.environ.get('RETRIEVAL_FROM_INDEX', '0').lower() in ('1', 'true', 'yes')
+        # BM25 index over ingested chunks, fused with vector hits at query time ('' disables)
+        self.LEXICAL_INDEX_PATH: str = os.environ.get('LEXICAL_INDEX_PATH', './lexical_index.bin')
+        # IngestManager.process_file saves the BM25 index at most once per this many seconds
+        self.LEXICAL_SAVE_DELAY_SECONDS: float = float(os.environ.get('LEXICAL_SAVE_DELAY_SECONDS', 30))
 
 # Provide a module-level settings instance for import
 app_settings = Settings()
\ No newline at end of file
@@ -4,13 +4,29 @@ class Settings:
 	OCR_TEXT_DENSITY_THRESHOLD: int
 	CHUNK_SIZE: int
 	CHUNK_OVERLAP: int
+	CHUNK_TOKENIZER: str
 	MONGO_URI: str
 	DB_NAME: str
 	COLLECTION_TRUTH: str
+	COLLECTION_SOURCES: str
 	CHROMA_DB_PATH: Any
 	RAW_LANDING_DIR: Any
 	LM_STUDIO_BASE_URL: str
 	EMBEDDING_MODEL: str
 	NOMIC_PREFIX: str
+	OCR_DPI: int
+	OCR_WORKERS: int
+	OCR_CACHE_PATH: str
+	EMBEDDING_CACHE_PATH: str
+	EMBEDDING_BATCH_SIZE: int
+	EMBEDDING_POOL_SIZE: int
+	INGEST_EXTRACT_WORKERS: int
+	INGEST_MAX_PENDING_FILES: int
+	INGEST_EMBED_BATCH_SIZE: int
+	INGEST_EMBED_WORKERS: int
+	INGEST_WRITE_BATCH_SIZE: int
+	INGEST_QUEUE_SIZE: int
+	RETRIEVAL_FROM_INDEX: bool
+	LEXICAL_INDEX_PATH: str
 
 settings: Settings
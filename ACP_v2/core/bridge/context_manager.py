@@ -4,6 +4,8 @@ import json
 import pathlib
 import sys
 
+from core.chunking.chunker import Chunker
+
 # Attempt to load default LLM context length from config, fallback if not available
 DEFAULT_LLM_CONTEXT_LENGTH = 262144 # Fallback default
 config_file = pathlib.Path('tooling/lms_config.json')
@@ -17,8 +19,9 @@ if config_file.exists():
 
 def chunk_text_with_overlap(text: str, chunk_size: int = 12000, overlap_size: int = 500, llm_context_length: int = DEFAULT_LLM_CONTEXT_LENGTH) -> list[str]:
     """
-    Segments a given text into chunks with a specified chunk size and overlap.
-    Ensures semantic continuity across chunks for local LLMs.
+    Segments a given text into chunks of at most chunk_size characters with
+    overlap_size characters of overlap, cut at paragraph, sentence or word
+    boundaries. Ensures semantic continuity across chunks for local LLMs.
     The chunk_size will be capped by llm_context_length if it exceeds it.
     """
     if not text:
@@ -31,22 +34,9 @@ def chunk_text_with_overlap(text: str, chunk_size: int = 12000, overlap_size: in
         print(f"Warning: Requested chunk_size ({chunk_size}) exceeds LLM's context length ({llm_context_length}). Capping chunk_size to {llm_context_length}.", file=sys.stderr)
         chunk_size = llm_context_length
 
-    chunks = []
-    start_index = 0
-    text_length = len(text)
-
-    while start_index < text_length:
-        end_index = min(start_index + chunk_size, text_length)
-        chunk = text[start_index:end_index]
-        chunks.append(chunk)
-
-        if end_index == text_length:
-            break # Reached the end of the text
-
-        # For the next chunk, move back by the overlap size
-        start_index += chunk_size - overlap_size
-
-    return chunks
+    # Chunks end at paragraph/sentence/word boundaries within chunk_size
+    chunker = Chunker(chunk_size, overlap_size)
+    return [chunk.text for chunk in chunker.split(text)]
 
 if __name__ == '__main__':
     # --- Test Cases ---
@@ -0,0 +1,204 @@
+"""
+SQLite Connection Pool
+
+Shared connection layer for ``MessageBus`` and ``SettingsDB``:
+
+  - Readers: one connection per thread (``pool.reader()``), in autocommit
+    mode so every query sees the latest committed state.
+  - Writer: a single thread owns the only write connection and applies
+    submitted jobs in order. Jobs already queued (or arriving within
+    ``group_commit_ms``) share one ``BEGIN IMMEDIATE ... COMMIT``; each job
+    runs inside its own SAVEPOINT so a failing job is rolled back alone.
+
+All connections run in WAL mode with a busy timeout, so readers never block
+the writer and other processes wait instead of failing with "database is
+locked".
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+WriteFn = Callable[[sqlite3.Connection], Any]
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+MAX_WRITE_BATCH = 1000
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+def configure_connection(conn: sqlite3.Connection, busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS):
+    """WAL + NORMAL sync: readers never block the writer and commits skip the per-txn fsync of the main DB."""
+    # Only takes effect on a new database; existing ones need a one-off VACUUM (see retention.py)
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+
+
+class _WriteJob:
+    __slots__ = ("fn", "future", "on_commit")
+
+    def __init__(self, fn: WriteFn, on_commit: Optional[Callable[[], None]]):
+        self.fn = fn
+        self.future: Future = Future()
+        self.on_commit = on_commit
+
+
+class ConnectionPool:
+    """Per-thread reader connections plus one serialized writer thread."""
+
+    def __init__(
+        self,
+        db_path: str,
+        busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+        group_commit_ms: float = 0.0,
+        row_factory=sqlite3.Row,
+    ):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.group_commit_ms = group_commit_ms
+        self.row_factory = row_factory
+
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._closed = False
+
+        self._writer_ready = threading.Event()
+        self._writer_error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._writer_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+        self._writer_ready.wait()
+        if self._writer_error is not None:
+            raise self._writer_error
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = self.row_factory
+        configure_connection(conn, self.busy_timeout_ms)
+        return conn
+
+    # ---------------- reads ----------------
+
+    def reader(self) -> sqlite3.Connection:
+        """The calling thread's read connection (created on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            conn = self._connect()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    # ---------------- writes ----------------
+
+    def write(self, fn: WriteFn, wait: bool = True, on_commit: Optional[Callable[[], None]] = None):
+        """
+        Run ``fn(conn)`` on the writer thread inside a transaction.
+
+        With ``wait=True`` this returns ``fn``'s result once it is committed
+        (or raises its exception). With ``wait=False`` it returns a Future
+        immediately. ``fn`` must not commit or roll back itself.
+        """
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        job = _WriteJob(fn, on_commit)
+        self._queue.put(job)
+        return job.future.result() if wait else job.future
+
+    def flush(self):
+        """Block until every write submitted so far is committed."""
+        if not self._closed:
+            self.write(lambda conn: None)
+
+    def _writer_loop(self):
+        try:
+            conn = self._connect()
+        except BaseException as e:
+            self._writer_error = e
+            self._writer_ready.set()
+            return
+        self._writer_ready.set()
+
+        window = self.group_commit_ms / 1000.0
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + window
+            while len(batch) < MAX_WRITE_BATCH:
+                try:
+                    remaining = deadline - time.monotonic()
+                    job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._apply(conn, batch)
+        conn.close()
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, batch: List[_WriteJob]):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = job.fn(conn)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((job, None, e))
+                else:
+                    conn.execute("RELEASE job")
+                    outcomes.append((job, result, None))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+
+        for job, result, error in outcomes:
+            if error is not None:
+                job.future.set_exception(error)
+                continue
+            # Callbacks run before the caller is released so it observes their effects
+            if job.on_commit is not None:
+                try:
+                    job.on_commit()
+                except Exception:
+                    # The write is committed; a failing notifier must not stall the writer
+                    logger.exception("Write commit callback failed")
+            job.future.set_result(result)
+
+    # ---------------- lifecycle ----------------
+
+    def close(self):
+        """Commit queued writes, stop the writer and close every connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
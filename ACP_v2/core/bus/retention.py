@@ -0,0 +1,251 @@
+"""
+Event Retention
+
+Keeps ``bus_events`` bounded without long write locks:
+
+  - Pruning deletes old events in small batches, each one a short writer
+    transaction, so publishers interleave between batches. Events that a
+    matching active subscription has not acknowledged yet (rowid above its
+    cursor) are never pruned, and neither is the newest row (SQLite would
+    otherwise reuse its rowid and dispatcher cursors would skip new events).
+  - Pruned events can be archived first into day-partitioned, gzip-compressed
+    JSONL files: ``<archive_dir>/bus_events-YYYY-MM-DD.jsonl.gz``.
+  - Compaction returns free pages to the filesystem with
+    ``PRAGMA incremental_vacuum`` in small steps. ``snapshot()`` writes a
+    compacted copy with ``VACUUM INTO`` from a read connection, which in WAL
+    mode does not block writers.
+
+Usage:
+    retention = EventRetention(bus, retention_days=30, archive_dir="bus_archive")
+    retention.start(interval_seconds=300)          # background pruning + compaction
+
+    python -m core.bus.retention prune orchestrator_bus.db --days 30 --archive bus_archive
+    python -m core.bus.retention compact orchestrator_bus.db
+    python -m core.bus.retention snapshot orchestrator_bus.db compacted.db
+    python -m core.bus.retention convert orchestrator_bus.db    # one-off, blocking: enable incremental vacuum
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .message_bus import MessageBus
+
+logger = logging.getLogger(__name__)
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class EventRetention:
+    """Batched pruning, archiving and compaction for one MessageBus."""
+
+    def __init__(
+        self,
+        bus: MessageBus,
+        retention_days: float = 30,
+        archive_dir: Optional[str] = None,
+        processed_retention_hours: Optional[float] = None,
+        batch_size: int = 500,
+        batch_pause: float = 0.01,
+        vacuum_pages: int = 256,
+    ):
+        self.bus = bus
+        self.retention_days = retention_days
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        # Processed events may be archived sooner than the general retention window
+        self.processed_retention_hours = processed_retention_hours
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum_pages = vacuum_pages
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- pruning ----------------
+
+    def prune_batch(self, cutoff: str, processed_only: bool = False) -> int:
+        """Archive and delete up to ``batch_size`` events older than ``cutoff``. Returns rows removed."""
+        query = """
+            SELECT e.rowid AS rowid, e.* FROM bus_events e
+            WHERE e.timestamp < ?
+              AND e.rowid < (SELECT MAX(rowid) FROM bus_events)
+              AND NOT EXISTS (
+                  SELECT 1 FROM bus_subscriptions s
+                  LEFT JOIN bus_subscription_cursors k ON k.subscription_id = s.subscription_id
+                  WHERE s.is_active = 1
+                    AND (s.event_type = e.event_type OR s.event_type = '*')
+                    AND e.rowid > COALESCE(k.last_rowid, 0)
+              )
+        """
+        if processed_only:
+            query += " AND e.processed = 1"
+        query += " ORDER BY e.timestamp LIMIT ?"
+        rows = [dict(r) for r in self.bus.conn.execute(query, (cutoff, self.batch_size))]
+        if not rows:
+            return 0
+        if self.archive_dir:
+            self._archive(rows)
+
+        removed = self.bus.delete_events([r["rowid"] for r in rows])
+        # Under group commit the delete is only queued; the next batch must not select these rows again
+        self.bus.flush()
+        return removed
+
+    def prune(self, cutoff: str, processed_only: bool = False, max_batches: Optional[int] = None) -> int:
+        """Prune in batches until nothing older than ``cutoff`` is eligible."""
+        total = 0
+        batches = 0
+        while not self._stop.is_set():
+            removed = self.prune_batch(cutoff, processed_only)
+            total += removed
+            batches += 1
+            if removed < self.batch_size or (max_batches and batches >= max_batches):
+                break
+            time.sleep(self.batch_pause)
+        return total
+
+    def _archive(self, rows: List[Dict]):
+        """Append rows to their day's gzip JSONL partition (gzip members concatenate)."""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        by_day: Dict[str, List[Dict]] = defaultdict(list)
+        for row in rows:
+            by_day[row["timestamp"][:10]].append(row)
+        for day, day_rows in by_day.items():
+            path = self.archive_dir / f"bus_events-{day}.jsonl.gz"
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                for row in day_rows:
+                    row = dict(row)
+                    row.pop("rowid", None)
+                    row.pop("seq", None)
+                    row["payload"] = json.loads(row.pop("payload_json"))
+                    f.write(json.dumps(row) + "\n")
+
+    # ---------------- compaction ----------------
+
+    def compact(self, max_steps: Optional[int] = None) -> int:
+        """Release free pages in ``vacuum_pages`` steps. Returns pages released (0 if not enabled)."""
+        conn = self.bus.conn
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            return 0
+        released = 0
+        steps = 0
+        while not self._stop.is_set():
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                break
+            pages = min(free, self.vacuum_pages)
+            self.bus.incremental_vacuum(pages)
+            released += pages
+            steps += 1
+            if max_steps and steps >= max_steps:
+                break
+            time.sleep(self.batch_pause)
+        return released
+
+    def snapshot(self, target_path: str) -> str:
+        """Write a compacted copy of the bus database with ``VACUUM INTO``."""
+        if os.path.exists(target_path):
+            raise FileExistsError(target_path)
+        self.bus.conn.execute("VACUUM INTO ?", (str(target_path),))
+        return target_path
+
+    # ---------------- scheduling ----------------
+
+    def run_once(self) -> Dict[str, int]:
+        now = datetime.utcnow()
+        stats = {"pruned": 0, "pruned_processed": 0, "pages_released": 0}
+        if self.processed_retention_hours is not None:
+            cutoff = (now - timedelta(hours=self.processed_retention_hours)).isoformat()
+            stats["pruned_processed"] = self.prune(cutoff, processed_only=True)
+        cutoff = (now - timedelta(days=self.retention_days)).isoformat()
+        stats["pruned"] = self.prune(cutoff)
+        if stats["pruned"] or stats["pruned_processed"]:
+            stats["pages_released"] = self.compact()
+        return stats
+
+    def start(self, interval_seconds: float = 300.0):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    stats = self.run_once()
+                    if stats["pruned"] or stats["pruned_processed"]:
+                        logger.info("Bus retention: %s", stats)
+                except sqlite3.Error:
+                    logger.exception("Bus retention pass failed")
+                self._stop.wait(interval_seconds)
+
+        self._thread = threading.Thread(target=loop, name="bus-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def enable_incremental_vacuum(db_path: str):
+    """
+    One-off conversion of an existing database; runs a full (blocking) VACUUM.
+
+    The bus is opened first so ``bus_events`` is migrated to its explicit
+    ``seq`` key: VACUUM may renumber implicit rowids, not INTEGER PRIMARY KEYs.
+    """
+    MessageBus(db_path).close()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="bus_events retention and compaction")
+    parser.add_argument("action", choices=["prune", "compact", "snapshot", "convert"])
+    parser.add_argument("db")
+    parser.add_argument("target", nargs="?", help="output path for snapshot")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--processed-hours", type=float, default=None)
+    parser.add_argument("--archive", default=None, help="directory for gzip JSONL archives")
+    args = parser.parse_args(argv)
+
+    if args.action == "convert":
+        enable_incremental_vacuum(args.db)
+        print(f"[*] Incremental vacuum enabled for {args.db}")
+        return 0
+
+    bus = MessageBus(args.db)
+    retention = EventRetention(
+        bus, args.days, archive_dir=args.archive, processed_retention_hours=args.processed_hours
+    )
+    try:
+        if args.action == "prune":
+            print(f"[*] {retention.run_once()}")
+        elif args.action == "compact":
+            print(f"[*] Released {retention.compact()} pages")
+        else:
+            if not args.target:
+                parser.error("snapshot needs a target path")
+            print(f"[*] Snapshot written: {retention.snapshot(args.target)}")
+    finally:
+        bus.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
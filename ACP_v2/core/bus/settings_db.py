@@ -6,12 +6,38 @@ Persistent storage for:
   - Workflow configuration
   - Integration settings
   - Feature flags
+
+Uses the same ``ConnectionPool`` as the message bus (per-thread readers, one
+serialized writer, WAL); ``set_settings`` writes many keys in one transaction.
+
+User settings and feature flags are served from an in-process cache. Every
+write to either table bumps ``settings_generation`` in the same transaction.
+A read checks ``PRAGMA data_version`` (which moves when any other connection
+commits, in this process or another) and re-reads the generation only then,
+so a read is normally a dict lookup and never returns a value older than the
+last committed write.
 """
 
+import copy
 import sqlite3
 import json
+import threading
 from datetime import datetime
-from typing import Any, Optional, Dict, List
+from typing import Any, Optional, Dict, List, Tuple
+
+from .connection_pool import ConnectionPool
+
+
+class _SettingsView:
+    """Immutable snapshot of user_settings + feature_flags at one generation."""
+
+    __slots__ = ("generation", "epoch", "settings", "flags")
+
+    def __init__(self, generation: int, epoch: int, settings: Dict[str, Any], flags: Dict[str, bool]):
+        self.generation = generation
+        self.epoch = epoch
+        self.settings = settings
+        self.flags = flags
 
 
 class SettingsDB:
@@ -19,13 +45,28 @@ class SettingsDB:
 
     def __init__(self, db_path: str = "settings.db"):
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self._view: Optional[_SettingsView] = None
+        # Bumped when this process commits a settings/flag write; views from older epochs are dropped
+        self._epoch = 0
+        self._view_lock = threading.Lock()
+        self._seen = threading.local()
+        self._pool = ConnectionPool(self.db_path)
         self._init_database()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Read connection for the calling thread."""
+        return self._pool.reader()
+
     def _init_database(self):
         """Initialize settings database."""
-        c = self.conn.cursor()
+        self._pool.write(self._create_schema)
+
+        # Initialize defaults
+        self._init_defaults()
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        c = conn.cursor()
 
         # User settings
         c.execute(
@@ -98,10 +139,74 @@ class SettingsDB:
         """
         )
 
-        self.conn.commit()
-
-        # Initialize defaults
-        self._init_defaults()
+        # Cache generation (single row, bumped with every settings/flag write)
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS settings_generation (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                generation INTEGER NOT NULL
+            )
+        """
+        )
+        c.execute("INSERT OR IGNORE INTO settings_generation (id, generation) VALUES (1, 0)")
+
+    # ========== CACHE ==========
+
+    @staticmethod
+    def _bump_generation(conn: sqlite3.Connection):
+        conn.execute("UPDATE settings_generation SET generation = generation + 1 WHERE id = 1")
+
+    def _invalidate(self):
+        with self._view_lock:
+            self._epoch += 1
+            self._view = None
+
+    def _write_settings(self, apply):
+        """Run a settings/flag write together with a generation bump; drop the cache once committed."""
+
+        def job(conn):
+            apply(conn)
+            self._bump_generation(conn)
+
+        self._pool.write(job, on_commit=self._invalidate)
+
+    def _current_view(self) -> _SettingsView:
+        conn = self.conn
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        view = self._view
+        if view is not None and view.epoch == self._epoch:
+            if getattr(self._seen, "data_version", None) == data_version:
+                return view
+            self._seen.data_version = data_version
+            generation = conn.execute("SELECT generation FROM settings_generation").fetchone()[0]
+            if generation == view.generation:
+                return view
+        self._seen.data_version = data_version
+        return self._reload(conn)
+
+    def _reload(self, conn: sqlite3.Connection) -> _SettingsView:
+        epoch = self._epoch
+        # One read transaction so generation and rows come from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            generation = conn.execute("SELECT generation FROM settings_generation").fetchone()[0]
+            settings = {
+                key: self._decode(value_str, vtype)
+                for key, value_str, vtype in conn.execute(
+                    "SELECT setting_key, setting_value, setting_type FROM user_settings"
+                )
+            }
+            flags = {row[0]: bool(row[1]) for row in conn.execute("SELECT flag_name, enabled FROM feature_flags")}
+        finally:
+            conn.execute("COMMIT")
+
+        view = _SettingsView(generation, epoch, settings, flags)
+        with self._view_lock:
+            current = self._view
+            # Never replace a newer snapshot or cache one taken before a local write committed
+            if epoch == self._epoch and (current is None or current.generation <= generation):
+                self._view = view
+        return view
 
     def _init_defaults(self):
         """Initialize default settings if not present."""
@@ -118,16 +223,16 @@ class SettingsDB:
             "notifications_enabled": (True, "boolean"),
         }
 
-        for key, (value, _vtype) in defaults.items():
-            if self.get_setting(key) is None:
-                self.set_setting(key, value)
+        existing = self._current_view().settings
+        missing = {key: value for key, (value, _vtype) in defaults.items() if key not in existing}
+        if missing:
+            self.set_settings(missing)
 
     # ========== USER SETTINGS ==========
 
-    def set_setting(self, key: str, value: Any, description: str = ""):
-        """Set a user setting."""
-        c = self.conn.cursor()
-
+    @staticmethod
+    def _encode(value: Any) -> Tuple[str, str]:
+        """Return (setting_type, setting_value) for storage."""
         if isinstance(value, bool):
             vtype = "boolean"
             vstr = json.dumps(value)
@@ -143,34 +248,10 @@ class SettingsDB:
         else:
             vtype = "string"
             vstr = str(value)
+        return vtype, vstr
 
-        updated_at = datetime.utcnow().isoformat()
-
-        c.execute(
-            """
-            INSERT OR REPLACE INTO user_settings
-            (setting_key, setting_value, setting_type, updated_at, description)
-            VALUES (?, ?, ?, ?, ?)
-        """,
-            (key, vstr, vtype, updated_at, description),
-        )
-
-        self.conn.commit()
-
-    def get_setting(self, key: str) -> Optional[Any]:
-        """Get a user setting."""
-        c = self.conn.cursor()
-        c.execute(
-            "SELECT setting_value, setting_type FROM user_settings WHERE setting_key = ?",
-            (key,),
-        )
-
-        row = c.fetchone()
-        if not row:
-            return None
-
-        value_str, vtype = row
-
+    @staticmethod
+    def _decode(value_str: str, vtype: str) -> Any:
         if vtype == "boolean":
             return json.loads(value_str)
         if vtype == "integer":
@@ -181,26 +262,39 @@ class SettingsDB:
             return json.loads(value_str)
         return value_str
 
+    def set_setting(self, key: str, value: Any, description: str = ""):
+        """Set a user setting."""
+        self.set_settings({key: value}, {key: description})
+
+    def set_settings(self, values: Dict[str, Any], descriptions: Optional[Dict[str, str]] = None):
+        """Set several user settings in one transaction."""
+        descriptions = descriptions or {}
+        updated_at = datetime.utcnow().isoformat()
+        rows = []
+        for key, value in values.items():
+            vtype, vstr = self._encode(value)
+            rows.append((key, vstr, vtype, updated_at, descriptions.get(key, "")))
+
+        self._write_settings(
+            lambda conn: conn.executemany(
+                """
+                INSERT OR REPLACE INTO user_settings
+                (setting_key, setting_value, setting_type, updated_at, description)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+        )
+
+    def get_setting(self, key: str) -> Optional[Any]:
+        """Get a user setting."""
+        value = self._current_view().settings.get(key)
+        # JSON values are shared with the cache; hand out a private copy
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
     def get_all_settings(self) -> Dict[str, Any]:
         """Get all user settings."""
-        c = self.conn.cursor()
-        c.execute("SELECT setting_key, setting_value, setting_type FROM user_settings")
-        rows = c.fetchall()
-
-        result = {}
-        for key, value_str, vtype in rows:
-            if vtype == "boolean":
-                result[key] = json.loads(value_str)
-            elif vtype == "integer":
-                result[key] = int(value_str)
-            elif vtype == "float":
-                result[key] = float(value_str)
-            elif vtype == "json":
-                result[key] = json.loads(value_str)
-            else:
-                result[key] = value_str
-
-        return result
+        return copy.deepcopy(self._current_view().settings)
 
     # ========== WORKFLOW SETTINGS ==========
 
@@ -214,30 +308,29 @@ class SettingsDB:
         timeout_seconds: int = 300,
     ):
         """Save workflow configuration."""
-        c = self.conn.cursor()
         created_at = datetime.utcnow().isoformat()
 
-        c.execute(
-            """
-            INSERT OR REPLACE INTO workflow_settings
-            (workflow_id, workflow_name, enabled, auto_run, timeout_seconds,
-             configuration_json, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                workflow_id,
-                workflow_name,
-                int(enabled),
-                int(auto_run),
-                timeout_seconds,
-                json.dumps(configuration),
-                created_at,
-                created_at,
-            ),
+        self._pool.write(
+            lambda conn: conn.execute(
+                """
+                INSERT OR REPLACE INTO workflow_settings
+                (workflow_id, workflow_name, enabled, auto_run, timeout_seconds,
+                 configuration_json, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    workflow_id,
+                    workflow_name,
+                    int(enabled),
+                    int(auto_run),
+                    timeout_seconds,
+                    json.dumps(configuration),
+                    created_at,
+                    created_at,
+                ),
+            )
         )
 
-        self.conn.commit()
-
     def get_workflow_config(self, workflow_id: str) -> Optional[Dict]:
         """Get workflow configuration."""
         c = self.conn.cursor()
@@ -283,35 +376,26 @@ class SettingsDB:
 
     def set_feature_flag(self, flag_name: str, enabled: bool, description: str = ""):
         """Set a feature flag."""
-        c = self.conn.cursor()
         updated_at = datetime.utcnow().isoformat()
 
-        c.execute(
-            """
-            INSERT OR REPLACE INTO feature_flags
-            (flag_name, enabled, description, updated_at)
-            VALUES (?, ?, ?, ?)
-        """,
-            (flag_name, int(enabled), description, updated_at),
+        self._write_settings(
+            lambda conn: conn.execute(
+                """
+                INSERT OR REPLACE INTO feature_flags
+                (flag_name, enabled, description, updated_at)
+                VALUES (?, ?, ?, ?)
+            """,
+                (flag_name, int(enabled), description, updated_at),
+            )
         )
 
-        self.conn.commit()
-
     def is_feature_enabled(self, flag_name: str) -> bool:
         """Check if a feature is enabled."""
-        c = self.conn.cursor()
-        c.execute("SELECT enabled FROM feature_flags WHERE flag_name = ?", (flag_name,))
-
-        row = c.fetchone()
-        return bool(row[0]) if row else False
+        return self._current_view().flags.get(flag_name, False)
 
     def get_all_flags(self) -> Dict[str, bool]:
         """Get all feature flags."""
-        c = self.conn.cursor()
-        c.execute("SELECT flag_name, enabled FROM feature_flags")
-        rows = c.fetchall()
-
-        return {row[0]: bool(row[1]) for row in rows}
+        return dict(self._current_view().flags)
 
     # ========== AUDIT LOG ==========
 
@@ -325,21 +409,20 @@ class SettingsDB:
         """Log a settings change."""
         import uuid
 
-        c = self.conn.cursor()
         audit_id = str(uuid.uuid4())
         changed_at = datetime.utcnow().isoformat()
 
-        c.execute(
-            """
-            INSERT INTO settings_audit
-            (audit_id, setting_key, old_value, new_value, changed_by, changed_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """,
-            (audit_id, setting_key, old_value, new_value, changed_by, changed_at),
+        self._pool.write(
+            lambda conn: conn.execute(
+                """
+                INSERT INTO settings_audit
+                (audit_id, setting_key, old_value, new_value, changed_by, changed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (audit_id, setting_key, old_value, new_value, changed_by, changed_at),
+            )
         )
 
-        self.conn.commit()
-
     def get_audit_log(self, limit: int = 100) -> List[Dict]:
         """Get audit log."""
         c = self.conn.cursor()
@@ -357,9 +440,10 @@ class SettingsDB:
         return [dict(row) for row in rows]
 
     def close(self):
-        """Close database connection."""
-        if self.conn:
-            self.conn.close()
+        """Close all database connections."""
+        if getattr(self, "_pool", None) is not None:
+            self._pool.close()
+            self._pool = None
 
     def __del__(self):
         """Cleanup on destruction."""
@@ -2,24 +2,30 @@
 
 Endpoints:
 - GET /api/graph/nodes: Return canon_components enriched with params/types/drift overlays.
-- GET /api/graph/edges: Return call_graph_edges with call_kind styling info.
+- GET /api/graph/edges: Return resolved call_graph_edges with call_kind styling info.
+- GET /api/graph/subgraph: Return nodes/edges within ``depth`` hops of a component.
 - POST /api/action/connect: Create a new connection (canon_calls + call_graph_edges).
 - GET /api/analysis/dag: Build a DAG from current call graph for live animation.
+
+Graph payloads are served from a materialized snapshot (see graph_snapshot.py)
+that is refreshed per changed file when ingest bumps the DB generation.
+Responses carry a weak ETag; ``If-None-Match`` yields 304. The nodes and
+edges endpoints accept ``?file_id=`` to fetch a single file's subgraph.
 """
 from __future__ import annotations
 
 import sqlite3
 import uuid
-from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from core.canon_db import init_db
 from ACP_V1.brain.workflow_analyzer import WorkflowAnalyzer
+from graph_snapshot import GraphSnapshot, record_change
 
 BASE_DIR = Path(__file__).resolve().parent
 DB_PATH = BASE_DIR / "canon.db"
@@ -36,6 +42,7 @@ app.add_middleware(
 # Ensure tables exist for this database path
 init_db(str(DB_PATH))
 _analyzer = WorkflowAnalyzer()
+_snapshot = GraphSnapshot(DB_PATH)
 
 
 def get_connection() -> sqlite3.Connection:
@@ -51,106 +58,54 @@ class ConnectPayload(BaseModel):
     lineno: Optional[int] = None
 
 
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
 @app.get("/api/graph/nodes")
-def get_nodes():
-    conn = get_connection()
-    try:
-        components = conn.execute("SELECT * FROM canon_components").fetchall()
-        params = conn.execute("SELECT * FROM canon_variables WHERE is_param = 1").fetchall()
-        types = conn.execute(
-            """
-            SELECT ct.*, cv.name AS variable_name
-            FROM canon_types ct
-            LEFT JOIN canon_variables cv ON cv.variable_id = ct.variable_id
-            """
-        ).fetchall()
-        drifts = conn.execute("SELECT * FROM drift_events").fetchall()
-        best_practices = conn.execute("SELECT * FROM overlay_best_practice").fetchall()
-
-        params_by_component: Dict[str, List[dict]] = defaultdict(list)
-        for row in params:
-            params_by_component[row["component_id"]].append(
-                {
-                    "variable_id": row["variable_id"],
-                    "name": row["name"],
-                    "type_hint": row["type_hint"],
-                    "lineno": row["lineno"],
-                }
-            )
-
-        outputs_by_component: Dict[str, List[dict]] = defaultdict(list)
-        for row in types:
-            outputs_by_component[row["component_id"]].append(
-                {
-                    "variable_id": row["variable_id"],
-                    "name": row["variable_name"],
-                    "type_annotation": row["type_annotation"],
-                    "inferred_type": row["inferred_type"],
-                }
-            )
-
-        drift_by_component = {row["component_id"]: row for row in drifts}
-        practices_by_component: Dict[str, List[dict]] = defaultdict(list)
-        for row in best_practices:
-            practices_by_component[row["component_id"]].append(
-                {
-                    "practice_id": row["practice_id"],
-                    "severity": row["severity"],
-                    "message": row["message"],
-                    "rule_id": row["rule_id"],
-                }
-            )
-
-        nodes = []
-        for component in components:
-            component_id = component["component_id"]
-            nodes.append(
-                {
-                    "id": component_id,
-                    "type": component["kind"] or "service",
-                    "position": {"x": 0, "y": 0},
-                    "data": {
-                        "label": component["qualified_name"] or component["name"],
-                        "parent_id": component["parent_id"],
-                        "parameters": params_by_component.get(component_id, []),
-                        "outputs": outputs_by_component.get(component_id, []),
-                        "drift": drift_by_component.get(component_id),
-                        "best_practices": practices_by_component.get(component_id, []),
-                        "order_index": component["order_index"],
-                        "kind": component["kind"],
-                    },
-                }
-            )
-
-        return nodes
-    finally:
-        conn.close()
+def get_nodes(request: Request, response: Response, file_id: Optional[str] = None):
+    _snapshot.refresh()
+    etag = _snapshot.etag("nodes", file_id)
+    cached = _not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers["ETag"] = etag
+    return _snapshot.file_nodes(file_id) if file_id else _snapshot.all_nodes()
 
 
 @app.get("/api/graph/edges")
-def get_edges():
-    conn = get_connection()
-    try:
-        rows = conn.execute("SELECT * FROM call_graph_edges").fetchall()
-        edges = []
-        for row in rows:
-            edge_id = row["edge_id"] or f"{row['caller_id']}->{row['callee_id']}"
-            call_kind = row["call_kind"] or "direct"
-            edges.append(
-                {
-                    "id": edge_id,
-                    "source": row["caller_id"],
-                    "target": row["callee_id"],
-                    "data": {
-                        "call_kind": call_kind,
-                        "resolved_name": row["resolved_name"],
-                    },
-                    "style": "dashed" if call_kind == "event" else "solid",
-                }
-            )
-        return edges
-    finally:
-        conn.close()
+def get_edges(request: Request, response: Response, file_id: Optional[str] = None):
+    _snapshot.refresh()
+    etag = _snapshot.etag("edges", file_id)
+    cached = _not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers["ETag"] = etag
+    return _snapshot.file_edges(file_id) if file_id else _snapshot.all_edges()
+
+
+@app.get("/api/graph/subgraph")
+def get_subgraph(
+    request: Request,
+    response: Response,
+    component_id: str,
+    depth: int = Query(1, ge=0, le=10),
+    direction: str = "both",
+):
+    if direction not in ("in", "out", "both"):
+        raise HTTPException(status_code=400, detail="direction must be 'in', 'out' or 'both'")
+    _snapshot.refresh()
+    etag = _snapshot.etag("sub", component_id, depth, direction)
+    cached = _not_modified(request, etag)
+    if cached is not None:
+        return cached
+    subgraph = _snapshot.neighborhood(component_id, depth=depth, direction=direction)
+    if not subgraph["nodes"]:
+        raise HTTPException(status_code=404, detail="component_id not found")
+    response.headers["ETag"] = etag
+    return subgraph
 
 
 @app.post("/api/action/connect")
@@ -196,6 +151,11 @@ def connect_components(payload: ConnectPayload):
                 payload.target_id,
             ),
         )
+        file_row = cur.execute(
+            "SELECT file_id FROM canon_components WHERE component_id = ?",
+            (payload.source_id,),
+        ).fetchone()
+        record_change(conn, file_row["file_id"])
         conn.commit()
 
         return {"status": "ok", "edge_id": edge_id, "call_id": call_id}
@@ -205,23 +165,5 @@ def connect_components(payload: ConnectPayload):
 
 @app.get("/api/analysis/dag")
 def get_dag():
-    conn = get_connection()
-    try:
-        edges = conn.execute("SELECT caller_id, callee_id FROM call_graph_edges").fetchall()
-        dependencies: Dict[str, set] = defaultdict(set)
-        nodes = set()
-        for edge in edges:
-            caller = edge["caller_id"]
-            callee = edge["callee_id"]
-            nodes.add(caller)
-            nodes.add(callee)
-            dependencies[callee].add(caller)
-
-        telemetry = []
-        for node in nodes:
-            telemetry.append({"id": node, "dependencies": list(dependencies.get(node, []))})
-
-        dag = _analyzer.build_dag(telemetry)
-        return dag
-    finally:
-        conn.close()
+    _snapshot.refresh()
+    return _analyzer.build_dag(_snapshot.dependency_telemetry())
@@ -0,0 +1,231 @@
+"""
+Event Dispatcher
+
+Push-based delivery of ``bus_events`` to ``bus_subscriptions`` handlers.
+
+Each subscription owns a rowid cursor in ``bus_subscription_cursors``. The
+dispatch loop fetches new events per subscription with an indexed
+``rowid > cursor`` seek, hands the batch to a worker pool, and advances the
+cursor only after the handler returns (at-least-once delivery). A handler
+that keeps failing on one event is retried ``max_attempts`` times, written to
+``bus_dead_letters`` and skipped so the subscription does not stall.
+
+Publishing through the same ``MessageBus`` wakes the loop immediately; events
+written by other processes are noticed through ``PRAGMA data_version`` on the
+next ``poll_interval`` tick.
+
+Usage:
+    bus = MessageBus("orchestrator_bus.db")
+    bus.subscribe("indexer", "file.scanned", "orchestrator.handlers:on_file_scanned")
+    dispatcher = EventDispatcher(bus)
+    dispatcher.start()
+    ...
+    dispatcher.stop()
+"""
+
+import importlib
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .message_bus import MessageBus
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict], None]
+
+
+def resolve_handler(handler_path: str) -> Handler:
+    """Import ``"pkg.module:func"`` (or ``"pkg.module.func"``) and return the callable."""
+    if ":" in handler_path:
+        module_name, _, attr_path = handler_path.partition(":")
+    else:
+        module_name, _, attr_path = handler_path.rpartition(".")
+    if not module_name or not attr_path:
+        raise ValueError(f"Invalid handler path: {handler_path!r}")
+    target = importlib.import_module(module_name)
+    for attr in attr_path.split("."):
+        target = getattr(target, attr)
+    if not callable(target):
+        raise TypeError(f"Handler {handler_path!r} is not callable")
+    return target
+
+
+class EventDispatcher:
+    """Deliver bus events to subscribed handlers on a worker pool."""
+
+    def __init__(
+        self,
+        bus: MessageBus,
+        workers: int = 4,
+        batch_size: int = 100,
+        poll_interval: float = 0.05,
+        max_attempts: int = 3,
+        retry_backoff: float = 0.05,
+    ):
+        self.bus = bus
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+        self._handlers: Dict[str, Handler] = {}
+        self._handlers_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._results: "queue.Queue[Tuple[str, Optional[int], List[Tuple[str, int, str]]]]" = queue.Queue()
+        self._in_flight: Set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        self.delivered = 0
+        self.dead_lettered = 0
+
+    # ---------------- handlers ----------------
+
+    def register_handler(self, handler_path: str, handler: Handler):
+        """Bind ``handler_path`` to an in-process callable instead of importing it."""
+        with self._handlers_lock:
+            self._handlers[handler_path] = handler
+
+    def _handler(self, handler_path: str) -> Handler:
+        with self._handlers_lock:
+            handler = self._handlers.get(handler_path)
+            if handler is None:
+                handler = resolve_handler(handler_path)
+                self._handlers[handler_path] = handler
+            return handler
+
+    # ---------------- lifecycle ----------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        # Only the loop thread touches the bus; workers just run handlers.
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bus-dispatch")
+        self.bus.add_listener(self._wakeup)
+        self._thread = threading.Thread(target=self._run, name="bus-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self._drain_results()
+        self.bus.remove_listener(self._wakeup)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------------- loop ----------------
+
+    def _run(self):
+        data_version = None
+        while not self._stopping.is_set():
+            woken = self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                self._drain_results()
+                # Changes whenever another connection (the bus writer, another process) commits
+                current = self.bus.conn.execute("PRAGMA data_version").fetchone()[0]
+                if woken or current != data_version:
+                    data_version = current
+                    self.dispatch_once()
+            except sqlite3.Error:
+                logger.exception("Event dispatch cycle failed")
+
+    def dispatch_once(self) -> int:
+        """Submit one batch per idle subscription with pending events. Returns batches submitted."""
+        submitted = 0
+        for sub in self.bus.get_active_subscriptions():
+            sid = sub["subscription_id"]
+            if sid in self._in_flight:
+                continue
+            events = self.bus.get_events_since(sub["last_rowid"], sub["event_type"], self.batch_size)
+            if not events:
+                continue
+            self._in_flight.add(sid)
+            self._pool.submit(self._deliver, sub, events)
+            submitted += 1
+        return submitted
+
+    def _drain_results(self):
+        while True:
+            try:
+                sid, last_rowid, failures = self._results.get_nowait()
+            except queue.Empty:
+                return
+            for event_id, attempts, error in failures:
+                self.bus.record_dead_letter(sid, event_id, attempts, error)
+            self._in_flight.discard(sid)
+            if last_rowid is not None:
+                self.bus.advance_cursor(sid, last_rowid)
+                # More may be waiting behind this batch
+                self._wakeup.set()
+
+    # ---------------- worker ----------------
+
+    def _deliver(self, sub: Dict, events: List[Dict]):
+        """Run the handler over ``events`` in order; report the last rowid that may be acked."""
+        sid = sub["subscription_id"]
+        acked: Optional[int] = None
+        failures: List[Tuple[str, int, str]] = []
+        try:
+            handler = self._handler(sub["handler_path"])
+        except Exception as e:
+            # Unimportable handler: leave the cursor alone so events are kept for a fix.
+            logger.error("Cannot load handler %s: %s", sub["handler_path"], e)
+            self._report(sid, None, [])
+            return
+
+        for event in events:
+            message = {
+                "event_id": event["event_id"],
+                "event_type": event["event_type"],
+                "source": event["source"],
+                "timestamp": event["timestamp"],
+                "payload": None,
+            }
+            for attempt in range(1, self.max_attempts + 1):
+                if self._stopping.is_set() and attempt > 1:
+                    self._report(sid, acked, failures)
+                    return
+                try:
+                    if message["payload"] is None:
+                        message["payload"] = json.loads(event["payload_json"])
+                    handler(message)
+                    self.delivered += 1
+                    break
+                except Exception as e:
+                    if attempt == self.max_attempts:
+                        logger.warning(
+                            "Handler %s failed on %s after %d attempts: %s",
+                            sub["handler_path"], event["event_id"], attempt, e,
+                        )
+                        failures.append((event["event_id"], attempt, f"{type(e).__name__}: {e}"))
+                        self.dead_lettered += 1
+                    else:
+                        time.sleep(self.retry_backoff * attempt)
+            acked = event["rowid"]
+        self._report(sid, acked, failures)
+
+    def _report(self, sid: str, acked: Optional[int], failures: List[Tuple[str, int, str]]):
+        self._results.put((sid, acked, failures))
+        if acked is not None:
+            self._wakeup.set()
@@ -8,33 +8,96 @@ Components:
   - Events (status updates, file scans, errors)
   - Commands (to orchestrator, workflows)
   - State (current configuration, settings)
+
+Subscribers are served push-style by ``core.bus.dispatcher.EventDispatcher``,
+which follows each subscription's rowid cursor in ``bus_subscription_cursors``.
+``bus_events.seq`` is an explicit ``INTEGER PRIMARY KEY`` (the rowid alias),
+so those positions are stable across ``VACUUM``.
+
+Storage goes through ``core.bus.connection_pool.ConnectionPool``: reads use
+a per-thread connection and writes are serialized onto one writer thread, so
+the bus is safe to share across FastAPI workers and background threads.
+
+Bursty producers should use ``publish_many`` and ``ack_many`` (one
+transaction per batch), or construct the bus with ``group_commit_ms`` so that
+single writes arriving within that window share one commit; in that mode
+writes return before they are committed and ``flush()`` waits for them.
+``python -m core.bus.benchmark`` measures both.
+
+``bus_commands`` doubles as a durable job queue (see
+``core.bus.work_queue.WorkQueue``): jobs carry an idempotency key, a lease,
+an attempt count and dependencies in ``bus_command_deps``.
 """
 
 import sqlite3
 import json
+import threading
+import time
 import uuid
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterable, List, Any, Optional, Sequence, Union
+
+from .connection_pool import ConnectionPool, configure_connection  # noqa: F401  (re-export)
+
+EventSpec = Union[Dict[str, Any], Sequence[Any]]
+
+# Job-queue columns, added in place to bus_commands tables created before them
+COMMAND_QUEUE_COLUMNS = [
+    ("idempotency_key", "TEXT"),
+    ("group_id", "TEXT"),
+    ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ("max_attempts", "INTEGER NOT NULL DEFAULT 1"),
+    ("available_at", "REAL NOT NULL DEFAULT 0"),
+    ("lease_owner", "TEXT"),
+    ("lease_expires_at", "REAL"),
+    ("last_error", "TEXT"),
+    ("updated_at", "TEXT"),
+]
+
+# Jobs in these states will not change again
+TERMINAL_COMMAND_STATES = ("COMPLETED", "FAILED", "CANCELLED")
 
 
 class MessageBus:
     """Central message bus for orchestrator communication."""
 
-    def __init__(self, db_path: str = "orchestrator_bus.db"):
+    def __init__(self, db_path: str = "orchestrator_bus.db", group_commit_ms: float = 0.0):
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        # In-process dispatchers register here to be woken on publish
+        self._listeners: List[threading.Event] = []
+
+        # Group commit: the writer coalesces writes arriving within this
+        # window into one transaction. 0 commits every call before returning.
+        self.group_commit_ms = group_commit_ms
+        self._retention = None
+        self._pool = ConnectionPool(self.db_path, group_commit_ms=group_commit_ms)
         self._init_database()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Read connection for the calling thread."""
+        return self._pool.reader()
+
     def _init_database(self):
         """Initialize message bus database."""
-        c = self.conn.cursor()
-
-        # Events table (log of all events)
+        self._pool.write(self._create_schema)
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        c = conn.cursor()
+
+        # Events table (log of all events). ``seq`` aliases the rowid, so the
+        # positions subscription cursors point at survive VACUUM.
+        event_columns = {row[1] for row in c.execute("PRAGMA table_info(bus_events)")}
+        if event_columns and "seq" not in event_columns:
+            c.execute("ALTER TABLE bus_events RENAME TO bus_events_unkeyed")
+            # Indexes follow the renamed table; drop them so they are recreated below
+            c.execute("DROP INDEX IF EXISTS idx_bus_events_type")
+            c.execute("DROP INDEX IF EXISTS idx_bus_events_timestamp")
         c.execute(
             """
             CREATE TABLE IF NOT EXISTS bus_events (
-                event_id TEXT PRIMARY KEY,
+                seq INTEGER PRIMARY KEY,
+                event_id TEXT NOT NULL UNIQUE,
                 timestamp TEXT NOT NULL,
                 event_type TEXT NOT NULL,
                 source TEXT NOT NULL,
@@ -43,6 +106,16 @@ class MessageBus:
             )
         """
         )
+        if event_columns and "seq" not in event_columns:
+            # Keep every event at its old rowid: cursors stay valid as they are
+            c.execute(
+                """
+                INSERT INTO bus_events (seq, event_id, timestamp, event_type, source, payload_json, processed)
+                SELECT rowid, event_id, timestamp, event_type, source, payload_json, processed
+                FROM bus_events_unkeyed ORDER BY rowid
+            """
+            )
+            c.execute("DROP TABLE bus_events_unkeyed")
 
         # Commands table (queued commands for orchestrator)
         c.execute(
@@ -59,6 +132,22 @@ class MessageBus:
         """
         )
 
+        existing = {row[1] for row in c.execute("PRAGMA table_info(bus_commands)")}
+        for column, declaration in COMMAND_QUEUE_COLUMNS:
+            if column not in existing:
+                c.execute(f"ALTER TABLE bus_commands ADD COLUMN {column} {declaration}")
+
+        # Job dependencies: command_id runs only once depends_on_id is COMPLETED
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bus_command_deps (
+                command_id TEXT NOT NULL,
+                depends_on_id TEXT NOT NULL,
+                PRIMARY KEY (command_id, depends_on_id)
+            )
+        """
+        )
+
         # State table (configuration and runtime state)
         c.execute(
             """
@@ -100,7 +189,48 @@ class MessageBus:
         """
         )
 
-        self.conn.commit()
+        # Delivery cursors (last bus_events seq/rowid acknowledged per subscription)
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bus_subscription_cursors (
+                subscription_id TEXT PRIMARY KEY,
+                last_rowid INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL
+            )
+        """
+        )
+
+        # Events a handler kept failing on after all retries
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bus_dead_letters (
+                subscription_id TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                error TEXT,
+                failed_at TEXT NOT NULL,
+                PRIMARY KEY (subscription_id, event_id)
+            )
+        """
+        )
+
+        # Secondary indexes carry the rowid (= seq), so (event_type, rowid > ?) is a range seek
+        c.execute("CREATE INDEX IF NOT EXISTS idx_bus_events_type ON bus_events(event_type)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_bus_events_timestamp ON bus_events(timestamp)")
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bus_subscriptions_type "
+            "ON bus_subscriptions(event_type, is_active)"
+        )
+        c.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_bus_commands_idempotency "
+            "ON bus_commands(idempotency_key) WHERE idempotency_key IS NOT NULL"
+        )
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bus_commands_queue "
+            "ON bus_commands(target, status, available_at)"
+        )
+        c.execute("CREATE INDEX IF NOT EXISTS idx_bus_commands_group ON bus_commands(group_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_bus_command_deps_parent ON bus_command_deps(depends_on_id)")
 
     # ========== EVENT OPERATIONS ==========
 
@@ -109,25 +239,58 @@ class MessageBus:
         event_id = str(uuid.uuid4())
         timestamp = datetime.utcnow().isoformat()
 
-        c = self.conn.cursor()
-        c.execute(
-            """
-            INSERT INTO bus_events
-            (event_id, timestamp, event_type, source, payload_json)
-            VALUES (?, ?, ?, ?, ?)
-        """,
-            (
-                event_id,
-                timestamp,
-                event_type,
-                source,
-                json.dumps(payload),
-            ),
-        )
-        self.conn.commit()
+        def apply(conn):
+            conn.execute(
+                """
+                INSERT INTO bus_events
+                (event_id, timestamp, event_type, source, payload_json)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (
+                    event_id,
+                    timestamp,
+                    event_type,
+                    source,
+                    json.dumps(payload),
+                ),
+            )
+
+        self._write(apply, notify=True)
 
         return event_id
 
+    def publish_many(self, events: Iterable[EventSpec]) -> List[str]:
+        """
+        Publish a batch of events in one transaction.
+
+        Each item is ``{"event_type", "source", "payload"}`` or an
+        ``(event_type, source, payload)`` tuple. Returns the event ids in order.
+        """
+        timestamp = datetime.utcnow().isoformat()
+        rows = []
+        for event in events:
+            if isinstance(event, dict):
+                event_type, source, payload = event["event_type"], event["source"], event.get("payload", {})
+            else:
+                event_type, source, payload = event
+            rows.append((str(uuid.uuid4()), timestamp, event_type, source, json.dumps(payload)))
+        if not rows:
+            return []
+
+        def apply(conn):
+            conn.executemany(
+                """
+                INSERT INTO bus_events
+                (event_id, timestamp, event_type, source, payload_json)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+
+        self._write(apply, notify=True)
+
+        return [row[0] for row in rows]
+
     def get_events(
         self,
         event_type: Optional[str] = None,
@@ -160,11 +323,44 @@ class MessageBus:
 
         return [dict(row) for row in rows]
 
+    def get_events_since(
+        self,
+        last_rowid: int,
+        event_type: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict]:
+        """Events with rowid > ``last_rowid`` in publish order (``event_type='*'`` matches all)."""
+        c = self.conn.cursor()
+        if event_type and event_type != "*":
+            c.execute(
+                """
+                SELECT rowid AS rowid, * FROM bus_events
+                WHERE event_type = ? AND rowid > ?
+                ORDER BY rowid LIMIT ?
+            """,
+                (event_type, last_rowid, limit),
+            )
+        else:
+            c.execute(
+                "SELECT rowid AS rowid, * FROM bus_events WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, limit),
+            )
+        return [dict(row) for row in c.fetchall()]
+
     def mark_event_processed(self, event_id: str):
         """Mark event as processed."""
-        c = self.conn.cursor()
-        c.execute("UPDATE bus_events SET processed = 1 WHERE event_id = ?", (event_id,))
-        self.conn.commit()
+        self.ack_many([event_id])
+
+    def ack_many(self, event_ids: Iterable[str]) -> int:
+        """Mark a batch of events as processed in one transaction."""
+        params = [(event_id,) for event_id in event_ids]
+        if not params:
+            return 0
+        def apply(conn):
+            conn.executemany("UPDATE bus_events SET processed = 1 WHERE event_id = ?", params)
+
+        self._write(apply)
+        return len(params)
 
     # ========== COMMAND OPERATIONS ==========
 
@@ -173,22 +369,23 @@ class MessageBus:
         command_id = str(uuid.uuid4())
         timestamp = datetime.utcnow().isoformat()
 
-        c = self.conn.cursor()
-        c.execute(
-            """
-            INSERT INTO bus_commands
-            (command_id, timestamp, command_type, target, payload_json)
-            VALUES (?, ?, ?, ?, ?)
-        """,
-            (
-                command_id,
-                timestamp,
-                command_type,
-                target,
-                json.dumps(payload),
-            ),
-        )
-        self.conn.commit()
+        def apply(conn):
+            conn.execute(
+                """
+                INSERT INTO bus_commands
+                (command_id, timestamp, command_type, target, payload_json)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (
+                    command_id,
+                    timestamp,
+                    command_type,
+                    target,
+                    json.dumps(payload),
+                ),
+            )
+
+        self._write(apply)
 
         return command_id
 
@@ -221,35 +418,291 @@ class MessageBus:
         self, command_id: str, status: str, result: Optional[Dict] = None
     ):
         """Update command status and result."""
-        c = self.conn.cursor()
 
-        if result:
-            c.execute(
+        def apply(conn):
+            if result:
+                conn.execute(
+                    """
+                    UPDATE bus_commands
+                    SET status = ?, result_json = ?
+                    WHERE command_id = ?
+                """,
+                    (status, json.dumps(result), command_id),
+                )
+            else:
+                conn.execute(
+                    """
+                    UPDATE bus_commands
+                    SET status = ?
+                    WHERE command_id = ?
+                """,
+                    (status, command_id),
+                )
+
+        self._write(apply)
+
+    # ========== JOB QUEUE OPERATIONS ==========
+
+    def enqueue_commands(self, target: str, jobs: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Enqueue jobs idempotently in one transaction; returns idempotency_key -> command_id.
+
+        Each job is a dict with ``command_type``, ``payload``, ``idempotency_key``
+        and optionally ``depends_on`` (idempotency keys), ``max_attempts`` and
+        ``group_id``. A key that already exists keeps its job; if that job had
+        FAILED or been CANCELLED it is reset to PENDING.
+        """
+        jobs = list(jobs)
+        timestamp = datetime.utcnow().isoformat()
+
+        def apply(conn):
+            ids: Dict[str, str] = {}
+            for job in jobs:
+                key = job["idempotency_key"]
+                row = conn.execute(
+                    "SELECT command_id, status FROM bus_commands WHERE idempotency_key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    ids[key] = row["command_id"]
+                    if row["status"] in ("FAILED", "CANCELLED"):
+                        conn.execute(
+                            """
+                            UPDATE bus_commands
+                            SET status = 'PENDING', attempts = 0, available_at = 0, last_error = NULL,
+                                lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+                            WHERE command_id = ?
+                        """,
+                            (timestamp, row["command_id"]),
+                        )
+                    continue
+                command_id = str(uuid.uuid4())
+                ids[key] = command_id
+                conn.execute(
+                    """
+                    INSERT INTO bus_commands
+                    (command_id, timestamp, command_type, target, payload_json,
+                     idempotency_key, group_id, max_attempts, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                    (
+                        command_id,
+                        timestamp,
+                        job["command_type"],
+                        target,
+                        json.dumps(job.get("payload", {})),
+                        key,
+                        job.get("group_id"),
+                        int(job.get("max_attempts", 1)),
+                        timestamp,
+                    ),
+                )
+            for job in jobs:
+                for dep_key in job.get("depends_on", ()):
+                    dep_id = ids.get(dep_key)
+                    if dep_id is None:
+                        row = conn.execute(
+                            "SELECT command_id FROM bus_commands WHERE idempotency_key = ?", (dep_key,)
+                        ).fetchone()
+                        if row is None:
+                            raise ValueError(f"Unknown dependency {dep_key!r}")
+                        dep_id = row["command_id"]
+                    conn.execute(
+                        "INSERT OR IGNORE INTO bus_command_deps VALUES (?, ?)",
+                        (ids[job["idempotency_key"]], dep_id),
+                    )
+            return ids
+
+        ids = self._pool.write(apply)
+        self._notify()
+        return ids
+
+    def lease_commands(
+        self,
+        target: str,
+        owner: str,
+        command_types: Sequence[str],
+        limit: int = 1,
+        lease_seconds: float = 60.0,
+    ) -> List[Dict]:
+        """
+        Claim up to ``limit`` runnable jobs for ``owner``.
+
+        Runnable: PENDING and past its backoff, or RUNNING under an expired
+        lease (its worker died), with every dependency COMPLETED. Claimed jobs
+        are RUNNING with ``attempts`` incremented. An expired job that has used
+        all its attempts is failed instead of being handed out again.
+        """
+        if limit <= 0 or not command_types:
+            return []
+        placeholders = ",".join("?" * len(command_types))
+        updated_at = datetime.utcnow().isoformat()
+
+        def apply(conn):
+            now = time.time()
+            rows = conn.execute(
+                f"""
+                SELECT c.* FROM bus_commands c
+                WHERE c.target = ?
+                  AND c.command_type IN ({placeholders})
+                  AND ((c.status = 'PENDING' AND c.available_at <= ?)
+                       OR (c.status = 'RUNNING' AND c.lease_expires_at < ?))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM bus_command_deps d
+                      JOIN bus_commands p ON p.command_id = d.depends_on_id
+                      WHERE d.command_id = c.command_id AND p.status != 'COMPLETED'
+                  )
+                ORDER BY c.available_at, c.timestamp
+                LIMIT ?
+            """,
+                (target, *command_types, now, now, limit),
+            ).fetchall()
+            leased = []
+            for row in rows:
+                if row["status"] == "RUNNING" and row["attempts"] >= row["max_attempts"]:
+                    self._fail_job(conn, row["command_id"], "Lease expired on final attempt", updated_at)
+                    continue
+                conn.execute(
+                    """
+                    UPDATE bus_commands
+                    SET status = 'RUNNING', lease_owner = ?, lease_expires_at = ?,
+                        attempts = attempts + 1, updated_at = ?
+                    WHERE command_id = ?
+                """,
+                    (owner, now + lease_seconds, updated_at, row["command_id"]),
+                )
+                job = dict(row)
+                job.update(status="RUNNING", lease_owner=owner, attempts=row["attempts"] + 1)
+                leased.append(job)
+            return leased
+
+        return self._pool.write(apply)
+
+    def renew_leases(self, owner: str, command_ids: Iterable[str], lease_seconds: float = 60.0):
+        """Extend the leases ``owner`` still holds (heartbeat for long-running jobs)."""
+        params = [(time.time() + lease_seconds, cid, owner) for cid in command_ids]
+        if not params:
+            return
+
+        def apply(conn):
+            conn.executemany(
                 """
-                UPDATE bus_commands
-                SET status = ?, result_json = ?
-                WHERE command_id = ?
+                UPDATE bus_commands SET lease_expires_at = ?
+                WHERE command_id = ? AND lease_owner = ? AND status = 'RUNNING'
             """,
-                (status, json.dumps(result), command_id),
+                params,
             )
-        else:
-            c.execute(
+
+        self._write(apply)
+
+    def complete_command(self, command_id: str, owner: str, result: Optional[Dict] = None) -> bool:
+        """Mark a leased job COMPLETED; False if ``owner`` no longer holds its lease."""
+        updated_at = datetime.utcnow().isoformat()
+
+        def apply(conn):
+            cursor = conn.execute(
                 """
                 UPDATE bus_commands
-                SET status = ?
-                WHERE command_id = ?
+                SET status = 'COMPLETED', result_json = ?, lease_owner = NULL,
+                    lease_expires_at = NULL, updated_at = ?
+                WHERE command_id = ? AND lease_owner = ? AND status = 'RUNNING'
             """,
-                (status, command_id),
+                (json.dumps(result) if result is not None else None, updated_at, command_id, owner),
             )
+            return cursor.rowcount > 0
+
+        done = self._pool.write(apply)
+        # Dependents may have become runnable
+        self._notify()
+        return done
+
+    def fail_command(
+        self,
+        command_id: str,
+        owner: str,
+        error: str,
+        retry_backoff: float = 5.0,
+        max_backoff: float = 300.0,
+    ) -> Optional[str]:
+        """
+        Record a failed attempt of a leased job; returns its new status.
 
-        self.conn.commit()
+        With attempts left the job goes back to PENDING after an exponential
+        backoff (``retry_backoff * 2 ** (attempts - 1)``, capped at
+        ``max_backoff``). Otherwise it is FAILED and every job depending on it,
+        directly or transitively, is CANCELLED. None if ``owner`` lost the lease.
+        """
+        updated_at = datetime.utcnow().isoformat()
+
+        def apply(conn):
+            row = conn.execute(
+                """
+                SELECT attempts, max_attempts FROM bus_commands
+                WHERE command_id = ? AND lease_owner = ? AND status = 'RUNNING'
+            """,
+                (command_id, owner),
+            ).fetchone()
+            if row is None:
+                return None
+            if row["attempts"] < row["max_attempts"]:
+                delay = min(max_backoff, retry_backoff * 2 ** (row["attempts"] - 1))
+                conn.execute(
+                    """
+                    UPDATE bus_commands
+                    SET status = 'PENDING', available_at = ?, last_error = ?, lease_owner = NULL,
+                        lease_expires_at = NULL, updated_at = ?
+                    WHERE command_id = ?
+                """,
+                    (time.time() + delay, error, updated_at, command_id),
+                )
+                return "PENDING"
+            self._fail_job(conn, command_id, error, updated_at)
+            return "FAILED"
+
+        return self._pool.write(apply)
+
+    @staticmethod
+    def _fail_job(conn: sqlite3.Connection, command_id: str, error: str, updated_at: str):
+        conn.execute(
+            """
+            UPDATE bus_commands
+            SET status = 'FAILED', last_error = ?, lease_owner = NULL,
+                lease_expires_at = NULL, updated_at = ?
+            WHERE command_id = ?
+        """,
+            (error, updated_at, command_id),
+        )
+        conn.execute(
+            """
+            WITH RECURSIVE downstream(command_id) AS (
+                SELECT command_id FROM bus_command_deps WHERE depends_on_id = ?
+                UNION
+                SELECT d.command_id FROM bus_command_deps d
+                JOIN downstream ON d.depends_on_id = downstream.command_id
+            )
+            UPDATE bus_commands SET status = 'CANCELLED', last_error = ?, updated_at = ?
+            WHERE command_id IN (SELECT command_id FROM downstream) AND status = 'PENDING'
+        """,
+            (command_id, f"Dependency {command_id} failed", updated_at),
+        )
+
+    def get_command_group(self, group_id: str) -> List[Dict]:
+        """All jobs enqueued under ``group_id``."""
+        rows = self.conn.execute(
+            "SELECT * FROM bus_commands WHERE group_id = ? ORDER BY timestamp", (group_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_commands(self, target: str) -> Dict[str, int]:
+        """Job counts by status for ``target``."""
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) FROM bus_commands WHERE target = ? GROUP BY status", (target,)
+        ).fetchall()
+        return {row[0]: row[1] for row in rows}
 
     # ========== STATE OPERATIONS ==========
 
     def set_state(self, key: str, value: Any, data_type: Optional[str] = None):
         """Set a state variable with optional explicit type."""
-        c = self.conn.cursor()
-
         # Preserve compatibility: allow caller to force a type (e.g., from tests)
         if data_type:
             normalized_type = data_type.lower()
@@ -274,16 +727,17 @@ class MessageBus:
 
         updated_at = datetime.utcnow().isoformat()
 
-        c.execute(
-            """
-            INSERT OR REPLACE INTO bus_state
-            (state_key, state_value, data_type, updated_at)
-            VALUES (?, ?, ?, ?)
-        """,
-            (key, value_str, data_type, updated_at),
-        )
+        def apply(conn):
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO bus_state
+                (state_key, state_value, data_type, updated_at)
+                VALUES (?, ?, ?, ?)
+            """,
+                (key, value_str, data_type, updated_at),
+            )
 
-        self.conn.commit()
+        self._write(apply)
 
     def get_state(self, key: str) -> Optional[Any]:
         """Get a state variable."""
@@ -334,16 +788,17 @@ class MessageBus:
         schema_id = str(uuid.uuid4())
         created_at = datetime.utcnow().isoformat()
 
-        c = self.conn.cursor()
-        c.execute(
-            """
-            INSERT INTO bus_schemas
-            (schema_id, schema_name, schema_type, definition_json, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        """,
-            (schema_id, schema_name, schema_type, json.dumps(definition), created_at),
-        )
-        self.conn.commit()
+        def apply(conn):
+            conn.execute(
+                """
+                INSERT INTO bus_schemas
+                (schema_id, schema_name, schema_type, definition_json, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (schema_id, schema_name, schema_type, json.dumps(definition), created_at),
+            )
+
+        self._write(apply)
 
         return schema_id
 
@@ -393,23 +848,46 @@ class MessageBus:
     # ========== SUBSCRIPTION OPERATIONS ==========
 
     def subscribe(self, subscriber_name: str, event_type: str, handler_path: str) -> str:
-        """Subscribe to event type."""
+        """
+        Subscribe to event type.
+
+        ``handler_path`` is ``"package.module:function"`` (or dotted). Delivery
+        starts with events published after this call.
+        """
         subscription_id = str(uuid.uuid4())
         created_at = datetime.utcnow().isoformat()
 
-        c = self.conn.cursor()
-        c.execute(
-            """
-            INSERT INTO bus_subscriptions
-            (subscription_id, subscriber_name, event_type, handler_path, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        """,
-            (subscription_id, subscriber_name, event_type, handler_path, created_at),
-        )
-        self.conn.commit()
+        def apply(conn):
+            conn.execute(
+                """
+                INSERT INTO bus_subscriptions
+                (subscription_id, subscriber_name, event_type, handler_path, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (subscription_id, subscriber_name, event_type, handler_path, created_at),
+            )
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO bus_subscription_cursors (subscription_id, last_rowid, updated_at)
+                VALUES (?, (SELECT COALESCE(MAX(rowid), 0) FROM bus_events), ?)
+            """,
+                (subscription_id, created_at),
+            )
+
+        self._write(apply, notify=True)
 
         return subscription_id
 
+    def unsubscribe(self, subscription_id: str):
+        """Deactivate a subscription (its cursor is kept for auditing)."""
+        def apply(conn):
+            conn.execute(
+                "UPDATE bus_subscriptions SET is_active = 0 WHERE subscription_id = ?",
+                (subscription_id,),
+            )
+
+        self._write(apply)
+
     def get_subscribers(self, event_type: str) -> List[Dict]:
         """Get subscribers for an event type."""
         c = self.conn.cursor()
@@ -425,23 +903,132 @@ class MessageBus:
         rows = c.fetchall()
         return [dict(row) for row in rows]
 
+    def get_active_subscriptions(self) -> List[Dict]:
+        """Active subscriptions joined with their delivery cursor."""
+        c = self.conn.cursor()
+        c.execute(
+            """
+            SELECT s.subscription_id, s.subscriber_name, s.event_type, s.handler_path,
+                   COALESCE(k.last_rowid, (SELECT COALESCE(MAX(rowid), 0) FROM bus_events)) AS last_rowid
+            FROM bus_subscriptions s
+            LEFT JOIN bus_subscription_cursors k ON k.subscription_id = s.subscription_id
+            WHERE s.is_active = 1
+        """
+        )
+        return [dict(row) for row in c.fetchall()]
+
+    def advance_cursor(self, subscription_id: str, last_rowid: int):
+        """Acknowledge delivery of every event up to ``last_rowid`` for a subscription."""
+        updated_at = datetime.utcnow().isoformat()
+
+        def apply(conn):
+            conn.execute(
+                """
+                INSERT INTO bus_subscription_cursors (subscription_id, last_rowid, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(subscription_id) DO UPDATE SET
+                    last_rowid = MAX(last_rowid, excluded.last_rowid),
+                    updated_at = excluded.updated_at
+            """,
+                (subscription_id, last_rowid, updated_at),
+            )
+
+        self._write(apply)
+
+    def record_dead_letter(self, subscription_id: str, event_id: str, attempts: int, error: str):
+        failed_at = datetime.utcnow().isoformat()
+
+        def apply(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO bus_dead_letters VALUES (?, ?, ?, ?, ?)",
+                (subscription_id, event_id, attempts, error, failed_at),
+            )
+
+        self._write(apply)
+
+    # ========== WRITES ==========
+
+    def _write(self, apply: Callable[[sqlite3.Connection], Any], notify: bool = False):
+        """Queue ``apply`` on the writer; wait for its commit unless group commit is on."""
+        on_commit = self._notify if notify else None
+        if self.group_commit_ms > 0:
+            self._pool.write(apply, wait=False, on_commit=on_commit)
+        else:
+            self._pool.write(apply, on_commit=on_commit)
+
+    def flush(self):
+        """Block until every write issued so far is committed."""
+        self._pool.flush()
+
+    # ========== DISPATCH WAKEUPS ==========
+
+    def add_listener(self, wakeup: threading.Event):
+        """Have ``wakeup`` set whenever this bus publishes or subscribes."""
+        self._listeners.append(wakeup)
+
+    def remove_listener(self, wakeup: threading.Event):
+        if wakeup in self._listeners:
+            self._listeners.remove(wakeup)
+
+    def _notify(self):
+        for wakeup in list(self._listeners):
+            wakeup.set()
+
     # ========== HOUSEKEEPING ==========
 
-    def cleanup_old_events(self, days: int = 30):
-        """Delete old events (retention policy)."""
-        c = self.conn.cursor()
+    def cleanup_old_events(self, days: int = 30, archive_dir: Optional[str] = None) -> int:
+        """
+        Delete old events (retention policy) in small batches; returns rows removed.
+
+        See ``core.bus.retention.EventRetention`` for archiving, compaction and
+        background scheduling.
+        """
+        from .retention import EventRetention
 
         cutoff = datetime.utcfromtimestamp(
             (datetime.utcnow().timestamp() - (days * 86400))
         ).isoformat()
+        return EventRetention(self, days, archive_dir=archive_dir).prune(cutoff)
+
+    def start_retention(
+        self,
+        days: float = 30,
+        archive_dir: Optional[str] = None,
+        interval_seconds: float = 300.0,
+        **options: Any,
+    ):
+        """Prune (and optionally archive) old events in the background until ``close()``."""
+        from .retention import EventRetention
+
+        if self._retention is None:
+            self._retention = EventRetention(self, days, archive_dir=archive_dir, **options)
+            self._retention.start(interval_seconds)
+        return self._retention
+
+    def delete_events(self, rowids: Iterable[int]) -> int:
+        """Delete events by rowid in one transaction."""
+        params = [(rowid,) for rowid in rowids]
+        if not params:
+            return 0
+
+        def apply(conn):
+            conn.executemany("DELETE FROM bus_events WHERE rowid = ?", params)
+
+        self._write(apply)
+        return len(params)
 
-        c.execute("DELETE FROM bus_events WHERE timestamp < ?", (cutoff,))
-        self.conn.commit()
+    def incremental_vacuum(self, pages: int):
+        """Return up to ``pages`` free pages to the filesystem (needs auto_vacuum=INCREMENTAL)."""
+        self._pool.write(lambda conn: conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall())
 
     def close(self):
-        """Close database connection."""
-        if self.conn:
-            self.conn.close()
+        """Commit pending writes and close all database connections."""
+        if getattr(self, "_retention", None) is not None:
+            self._retention.stop()
+            self._retention = None
+        if getattr(self, "_pool", None) is not None:
+            self._pool.close()
+            self._pool = None
 
     def __del__(self):
         """Cleanup on destruction."""
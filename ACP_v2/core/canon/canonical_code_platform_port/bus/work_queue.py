@@ -0,0 +1,202 @@
+"""
+Work Queue
+
+Durable job execution on top of ``bus_commands``:
+
+  - ``enqueue_graph`` writes a DAG of steps in one transaction. Each job's
+    idempotency key is ``<key>:<step>``, so enqueuing the same work again
+    (e.g. the same file content after a restart) returns the existing jobs.
+  - Workers lease runnable jobs (all dependencies COMPLETED) and renew the
+    lease while the handler runs. A crashed process stops renewing, its
+    leases expire and another worker picks the jobs up.
+  - A handler that raises is retried with exponential backoff up to
+    ``max_attempts``; after that the job is FAILED and its dependents are
+    CANCELLED.
+
+Independent branches of a graph (and jobs of different graphs) run
+concurrently, up to ``workers``.
+
+Usage:
+    queue = WorkQueue(bus, target="staging")
+    queue.register("ingest", lambda payload: ingest(payload["path"]))
+    queue.register("report", lambda payload: report(payload["path"]))
+    queue.enqueue_graph({"ingest": [], "report": ["ingest"]}, {"path": p}, key=content_hash)
+    queue.start()
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .message_bus import MessageBus
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict], Optional[Dict]]
+# Called with the job row and its new status once an attempt has finished
+JobListener = Callable[[Dict, str], None]
+
+
+class WorkQueue:
+    """Lease-based worker pool for jobs stored in ``bus_commands``."""
+
+    def __init__(
+        self,
+        bus: MessageBus,
+        target: str = "workflows",
+        workers: int = 4,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 5.0,
+        max_backoff: float = 300.0,
+        poll_interval: float = 1.0,
+    ):
+        self.bus = bus
+        self.target = target
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        # Unique per process so a restarted worker never "owns" stale leases
+        self.owner = f"worker-{uuid.uuid4()}"
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._listeners: List[JobListener] = []
+        self._running: Dict[str, Dict] = {}
+        self._running_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def register(self, command_type: str, handler: JobHandler):
+        """``handler(payload)`` runs the step; raising marks the attempt failed."""
+        self._handlers[command_type] = handler
+
+    def add_listener(self, listener: JobListener):
+        self._listeners.append(listener)
+
+    # ---------------- enqueue ----------------
+
+    def enqueue_graph(
+        self,
+        steps: Dict[str, List[str]],
+        payload: Dict,
+        key: str,
+        group_id: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Enqueue one job per step (``steps`` maps step -> steps it depends on).
+
+        Returns step -> command_id. All jobs share ``group_id`` (default ``key``).
+        """
+        jobs = [
+            {
+                "command_type": step,
+                "payload": payload,
+                "idempotency_key": f"{key}:{step}",
+                "depends_on": [f"{key}:{dep}" for dep in deps],
+                "max_attempts": self.max_attempts,
+                "group_id": group_id or key,
+            }
+            for step, deps in steps.items()
+        ]
+        ids = self.bus.enqueue_commands(self.target, jobs)
+        self._wakeup.set()
+        return {step: ids[f"{key}:{step}"] for step in steps}
+
+    # ---------------- execution ----------------
+
+    def run_once(self) -> int:
+        """Lease as many jobs as there are free workers and start them. Returns jobs started."""
+        with self._running_lock:
+            free = self.workers - len(self._running)
+        jobs = self.bus.lease_commands(
+            self.target, self.owner, list(self._handlers), limit=free, lease_seconds=self.lease_seconds
+        )
+        for job in jobs:
+            with self._running_lock:
+                self._running[job["command_id"]] = job
+            self._executor.submit(self._run, job)
+        return len(jobs)
+
+    def _run(self, job: Dict):
+        command_id = job["command_id"]
+        try:
+            result = self._handlers[job["command_type"]](json.loads(job["payload_json"]))
+        except Exception as e:
+            logger.warning("Job %s (%s) attempt %d failed: %s", command_id, job["command_type"], job["attempts"], e)
+            status = self.bus.fail_command(
+                command_id, self.owner, str(e), self.retry_backoff, self.max_backoff
+            )
+        else:
+            status = "COMPLETED" if self.bus.complete_command(command_id, self.owner, result) else None
+        finally:
+            with self._running_lock:
+                self._running.pop(command_id, None)
+
+        if status is None:
+            logger.warning("Job %s lost its lease before finishing", command_id)
+        else:
+            for listener in list(self._listeners):
+                try:
+                    listener(job, status)
+                except Exception:
+                    logger.exception("Work queue listener failed")
+        self._wakeup.set()
+
+    def _renew(self):
+        with self._running_lock:
+            command_ids = list(self._running)
+        self.bus.renew_leases(self.owner, command_ids, self.lease_seconds)
+
+    # ---------------- lifecycle ----------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{self.target}-job")
+        self.bus.add_listener(self._wakeup)
+
+        def loop():
+            renew_every = self.lease_seconds / 3
+            last_renew = time.monotonic()
+            while not self._stop.is_set():
+                self._wakeup.clear()
+                try:
+                    self.run_once()
+                    if time.monotonic() - last_renew >= renew_every:
+                        self._renew()
+                        last_renew = time.monotonic()
+                except Exception:
+                    logger.exception("Work queue pass failed")
+                self._wakeup.wait(min(self.poll_interval, renew_every))
+
+        self._thread = threading.Thread(target=loop, name=f"{self.target}-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = True):
+        """Stop leasing; with ``wait`` let running jobs finish (unfinished ones are re-leased later)."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.bus.remove_listener(self._wakeup)
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
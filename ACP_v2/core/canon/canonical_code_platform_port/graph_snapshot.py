@@ -0,0 +1,305 @@
+"""Materialized, versioned graph payloads for the canon API.
+
+The snapshot keeps React Flow node/edge dicts in memory and tracks the
+``canon_generations`` change log written by ingest. When the generation
+advances, only the files listed in the log since the last refresh are
+re-queried; everything else is served from memory.
+
+Databases created before ``canon_generations`` existed fall back to
+``PRAGMA data_version`` and rebuild the whole snapshot when it changes.
+"""
+from __future__ import annotations
+
+import datetime
+import sqlite3
+import threading
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+# Keep IN (...) lists well below SQLite's host parameter limit.
+_SQL_CHUNK = 500
+
+
+def _chunks(items: Iterable[str], size: int = _SQL_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def record_change(conn: sqlite3.Connection, file_id: str) -> bool:
+    """Append ``file_id`` to the change log; False on DBs without ``canon_generations``.
+
+    Those DBs need nothing more: snapshots over them watch ``PRAGMA data_version``.
+    """
+    try:
+        conn.execute(
+            "INSERT INTO canon_generations (file_id, changed_at) VALUES (?, ?)",
+            (file_id, datetime.datetime.utcnow().isoformat()),
+        )
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+class GraphSnapshot:
+    """Thread-safe in-memory graph rebuilt per changed file."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+
+        self.generation = -1
+        self._data_version: Optional[int] = None
+        self._has_changelog = True
+
+        self.nodes: Dict[str, dict] = {}
+        self.nodes_by_file: Dict[str, List[str]] = defaultdict(list)
+        self.edges_by_file: Dict[str, List[dict]] = defaultdict(list)
+        self.out_adj: Dict[str, Set[str]] = defaultdict(set)
+        self.in_adj: Dict[str, Set[str]] = defaultdict(set)
+        self._payloads: Dict[str, list] = {}
+
+    # ------------------------------------------------------------------
+    # Freshness
+    # ------------------------------------------------------------------
+    def _db_generation(self) -> int:
+        row = self._conn.execute("SELECT MAX(generation) FROM canon_generations").fetchone()
+        return row[0] or 0
+
+    def refresh(self) -> int:
+        """Bring the snapshot up to date and return its generation."""
+        with self._lock:
+            if self._has_changelog:
+                try:
+                    latest = self._db_generation()
+                except sqlite3.OperationalError:
+                    self._has_changelog = False
+                else:
+                    if self.generation < 0:
+                        self._rebuild_all()
+                    elif latest > self.generation:
+                        changed = [
+                            row[0]
+                            for row in self._conn.execute(
+                                "SELECT DISTINCT file_id FROM canon_generations WHERE generation > ?",
+                                (self.generation,),
+                            )
+                        ]
+                        self._refresh_files(changed)
+                    self.generation = latest
+                    return self.generation
+
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version or self.generation < 0:
+                self._rebuild_all()
+                self._data_version = data_version
+                self.generation = max(self.generation, 0) + 1
+            return self.generation
+
+    def etag(self, *parts: object) -> str:
+        suffix = "-".join(str(p) for p in parts if p is not None)
+        return f'W/"g{self.generation}{"-" + suffix if suffix else ""}"'
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _rebuild_all(self):
+        self.nodes.clear()
+        self.nodes_by_file.clear()
+        self.edges_by_file.clear()
+        self.out_adj.clear()
+        self.in_adj.clear()
+        self._payloads.clear()
+        file_ids = [r[0] for r in self._conn.execute("SELECT DISTINCT file_id FROM canon_components")]
+        self._load_files(file_ids)
+
+    def _refresh_files(self, file_ids: List[str]):
+        for fid in file_ids:
+            for cid in self.nodes_by_file.pop(fid, []):
+                self.nodes.pop(cid, None)
+            for edge in self.edges_by_file.pop(fid, []):
+                self.out_adj[edge["source"]].discard(edge["target"])
+                self.in_adj[edge["target"]].discard(edge["source"])
+        self._payloads.clear()
+        self._load_files(file_ids)
+
+    def _load_files(self, file_ids: List[str]):
+        for chunk in _chunks(file_ids):
+            ph = ",".join("?" * len(chunk))
+            components = self._conn.execute(
+                f"SELECT * FROM canon_components WHERE file_id IN ({ph})", chunk
+            ).fetchall()
+            component_ids = [c["component_id"] for c in components]
+            overlays = self._load_overlays(component_ids)
+
+            for component in components:
+                cid = component["component_id"]
+                self.nodes[cid] = self._node(component, overlays, cid)
+                self.nodes_by_file[component["file_id"]].append(cid)
+
+            for row in self._conn.execute(
+                f"""
+                SELECT e.*, c.file_id AS caller_file
+                FROM call_graph_edges e
+                JOIN canon_components c ON c.component_id = e.caller_id
+                WHERE c.file_id IN ({ph}) AND e.callee_id IS NOT NULL
+                """,
+                chunk,
+            ):
+                edge = self._edge(row)
+                self.edges_by_file[row["caller_file"]].append(edge)
+                self.out_adj[edge["source"]].add(edge["target"])
+                self.in_adj[edge["target"]].add(edge["source"])
+
+    def _load_overlays(self, component_ids: List[str]) -> Dict[str, Dict[str, list]]:
+        overlays: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
+        for chunk in _chunks(component_ids):
+            self._load_overlay_chunk(chunk, overlays)
+        return overlays
+
+    def _load_overlay_chunk(self, component_ids: List[str], overlays: Dict[str, Dict[str, list]]):
+        ph = ",".join("?" * len(component_ids))
+        for row in self._conn.execute(
+            f"SELECT * FROM canon_variables WHERE is_param = 1 AND component_id IN ({ph})", component_ids
+        ):
+            overlays[row["component_id"]]["parameters"].append(
+                {
+                    "variable_id": row["variable_id"],
+                    "name": row["name"],
+                    "type_hint": row["type_hint"],
+                    "lineno": row["lineno"],
+                }
+            )
+        for row in self._conn.execute(
+            f"""
+            SELECT ct.*, cv.name AS variable_name
+            FROM canon_types ct
+            LEFT JOIN canon_variables cv ON cv.variable_id = ct.variable_id
+            WHERE ct.component_id IN ({ph})
+            """,
+            component_ids,
+        ):
+            overlays[row["component_id"]]["outputs"].append(
+                {
+                    "variable_id": row["variable_id"],
+                    "name": row["variable_name"],
+                    "type_annotation": row["type_annotation"],
+                    "inferred_type": row["inferred_type"],
+                }
+            )
+        for row in self._conn.execute(
+            f"SELECT * FROM drift_events WHERE component_id IN ({ph}) ORDER BY detected_at", component_ids
+        ):
+            overlays[row["component_id"]]["drift"] = [dict(row)]
+        for row in self._conn.execute(
+            f"SELECT * FROM overlay_best_practice WHERE component_id IN ({ph})", component_ids
+        ):
+            overlays[row["component_id"]]["best_practices"].append(
+                {
+                    "practice_id": row["practice_id"],
+                    "severity": row["severity"],
+                    "message": row["message"],
+                    "rule_id": row["rule_id"],
+                }
+            )
+
+    @staticmethod
+    def _node(component: sqlite3.Row, overlays, component_id: str) -> dict:
+        extra = overlays.get(component_id, {})
+        drift = extra.get("drift")
+        return {
+            "id": component_id,
+            "type": component["kind"] or "service",
+            "position": {"x": 0, "y": 0},
+            "data": {
+                "label": component["qualified_name"] or component["name"],
+                "file_id": component["file_id"],
+                "parent_id": component["parent_id"],
+                "parameters": list(extra.get("parameters", [])),
+                "outputs": list(extra.get("outputs", [])),
+                "drift": drift[0] if drift else None,
+                "best_practices": list(extra.get("best_practices", [])),
+                "order_index": component["order_index"],
+                "kind": component["kind"],
+            },
+        }
+
+    @staticmethod
+    def _edge(row: sqlite3.Row) -> dict:
+        call_kind = row["call_kind"] or "direct"
+        return {
+            "id": row["edge_id"] or f"{row['caller_id']}->{row['callee_id']}",
+            "source": row["caller_id"],
+            "target": row["callee_id"],
+            "data": {
+                "call_kind": call_kind,
+                "resolved_name": row["resolved_name"],
+            },
+            "style": "dashed" if call_kind == "event" else "solid",
+        }
+
+    # ------------------------------------------------------------------
+    # Queries (call refresh() first)
+    # ------------------------------------------------------------------
+    def all_nodes(self) -> List[dict]:
+        with self._lock:
+            if "nodes" not in self._payloads:
+                self._payloads["nodes"] = list(self.nodes.values())
+            return self._payloads["nodes"]
+
+    def all_edges(self) -> List[dict]:
+        with self._lock:
+            if "edges" not in self._payloads:
+                self._payloads["edges"] = [e for edges in self.edges_by_file.values() for e in edges]
+            return self._payloads["edges"]
+
+    def file_nodes(self, file_id: str) -> List[dict]:
+        with self._lock:
+            return [self.nodes[cid] for cid in self.nodes_by_file.get(file_id, []) if cid in self.nodes]
+
+    def file_edges(self, file_id: str) -> List[dict]:
+        with self._lock:
+            return list(self.edges_by_file.get(file_id, []))
+
+    def neighborhood(self, component_id: str, depth: int = 1, direction: str = "both") -> Dict[str, list]:
+        """Nodes and edges reachable from ``component_id`` within ``depth`` hops."""
+        with self._lock:
+            if component_id not in self.nodes:
+                return {"nodes": [], "edges": []}
+            seen = {component_id}
+            frontier = deque([(component_id, 0)])
+            while frontier:
+                current, dist = frontier.popleft()
+                if dist >= depth:
+                    continue
+                nxt: Set[str] = set()
+                if direction in ("out", "both"):
+                    nxt |= self.out_adj.get(current, set())
+                if direction in ("in", "both"):
+                    nxt |= self.in_adj.get(current, set())
+                for neighbor in nxt - seen:
+                    seen.add(neighbor)
+                    frontier.append((neighbor, dist + 1))
+
+            nodes = [self.nodes[cid] for cid in seen if cid in self.nodes]
+            files = {node["data"]["file_id"] for node in nodes}
+            edges = [
+                e
+                for fid in files
+                for e in self.edges_by_file.get(fid, [])
+                if e["source"] in seen and e["target"] in seen
+            ]
+            return {"nodes": nodes, "edges": edges}
+
+    def dependency_telemetry(self) -> List[dict]:
+        """Per-node dependency lists in the shape WorkflowAnalyzer.build_dag expects."""
+        with self._lock:
+            nodes = set(self.out_adj) | set(self.in_adj)
+            return [
+                {"id": node, "dependencies": list(self.in_adj.get(node, ()))}
+                for node in nodes
+                if self.out_adj.get(node) or self.in_adj.get(node)
+            ]
@@ -0,0 +1,242 @@
+"""
+File-keyed RAG index bookkeeping.
+
+Tracks which canon components are in the vector index, per file and by
+``source_hash``, so that ingesting one file only touches that file's
+components:
+
+  - ``plan(file_id)`` diffs canon.db against the recorded state and returns
+    the components to upsert (new or changed hash), the ids to delete (no
+    longer in the file) and renames: ingest assigns fresh component ids on
+    every run, so a component whose qualified name and hash are unchanged
+    keeps its vector under the new id instead of being re-embedded.
+  - ``commit(plan)`` records the new state once the vector DB has applied it.
+  - ``apply_index_plan(rag_db, plan, rebuild_all)`` applies a plan to a
+    vector DB, falling back to a full rebuild when it has no keyed
+    upsert/delete operations.
+  - ``components_for_file(file_id)`` is the file -> component secondary map
+    used by reports instead of scanning every indexed component.
+  - ``cached_analyses`` / ``store_analyses`` memoize per-component analysis
+    keyed by (qualified_name, source_hash). An analysis also depends on the
+    rest of the index (context neighbors, recommendations), so ``commit``
+    of any plan that changes the index drops the whole memo.
+
+State lives in its own SQLite file next to the vector DB.
+"""
+
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+try:
+    from tools.core.blob_store import read_segments
+except ImportError:  # standalone port: segments carry inline source_text
+    read_segments = None
+
+
+@dataclass
+class IndexPlan:
+    file_id: str
+    upserts: List[Dict] = field(default_factory=list)
+    deletes: List[str] = field(default_factory=list)
+    renames: List[Tuple[str, Dict]] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def is_noop(self) -> bool:
+        return not self.upserts and not self.deletes and not self.renames
+
+
+def apply_index_plan(rag_db: Any, plan: IndexPlan, rebuild_all: Callable[[], int]) -> int:
+    """Apply ``plan`` to ``rag_db``. Returns the number of components embedded."""
+    if not (hasattr(rag_db, "upsert_components") and hasattr(rag_db, "delete_components")):
+        # Vector DB without keyed operations: fall back to a full rebuild
+        return rebuild_all() if not plan.is_noop else 0
+
+    upserts = list(plan.upserts)
+    deletes = list(plan.deletes)
+    if plan.renames:
+        if hasattr(rag_db, "rename_components"):
+            rag_db.rename_components([(old_id, c["component_id"]) for old_id, c in plan.renames])
+        else:
+            upserts.extend(c for _old_id, c in plan.renames)
+            deletes.extend(old_id for old_id, _c in plan.renames)
+    if deletes:
+        rag_db.delete_components(deletes)
+    if upserts:
+        rag_db.upsert_components(upserts)
+    return len(upserts)
+
+
+class FileIndexState:
+    """Per-file record of what the vector index holds."""
+
+    def __init__(self, canon_db_path: str = "canon.db", state_db_path: str = "rag_index_state.db"):
+        self.canon_db_path = canon_db_path
+        self.state = sqlite3.connect(state_db_path, check_same_thread=False)
+        self.state.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rag_index_state (
+                component_id TEXT PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                qualified_name TEXT,
+                source_hash TEXT,
+                indexed_at TEXT NOT NULL
+            )
+        """
+        )
+        self.state.execute("CREATE INDEX IF NOT EXISTS idx_rag_state_file ON rag_index_state(file_id)")
+        self.state.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rag_state_content ON rag_index_state(qualified_name, source_hash)"
+        )
+        self.state.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rag_analysis_cache (
+                qualified_name TEXT NOT NULL,
+                source_hash TEXT NOT NULL,
+                analysis_json TEXT NOT NULL,
+                computed_at TEXT NOT NULL,
+                PRIMARY KEY (qualified_name, source_hash)
+            )
+        """
+        )
+        self.state.commit()
+
+    def _content_keys(self, component_ids: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """component_id -> (qualified_name, source_hash) for indexed components."""
+        ids = list(component_ids)
+        keys = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for cid, qname, source_hash in self.state.execute(
+                f"SELECT component_id, qualified_name, source_hash FROM rag_index_state "
+                f"WHERE component_id IN ({placeholders})",
+                chunk,
+            ):
+                keys[cid] = (qname, source_hash)
+        return keys
+
+    # ---------------- planning ----------------
+
+    def _canon_components(self, file_id: str) -> List[Dict]:
+        conn = sqlite3.connect(self.canon_db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = [
+                dict(r)
+                for r in conn.execute(
+                    """
+                    SELECT c.component_id, c.file_id, c.qualified_name, c.name, c.kind,
+                           c.source_hash, s.source_text
+                    FROM canon_components c
+                    LEFT JOIN canon_source_segments s ON s.component_id = c.component_id
+                    WHERE c.file_id = ?
+                    ORDER BY c.order_index
+                """,
+                    (file_id,),
+                )
+            ]
+            missing = [r["component_id"] for r in rows if r["source_text"] is None]
+            if missing and read_segments is not None:
+                texts = read_segments(conn, missing)
+                for r in rows:
+                    if r["source_text"] is None:
+                        r["source_text"] = texts.get(r["component_id"])
+            return rows
+        finally:
+            conn.close()
+
+    def plan(self, file_id: str) -> IndexPlan:
+        """Components of ``file_id`` to upsert and delete to bring the index up to date."""
+        indexed = {
+            cid: (qname, source_hash)
+            for cid, qname, source_hash in self.state.execute(
+                "SELECT component_id, qualified_name, source_hash FROM rag_index_state WHERE file_id = ?",
+                (file_id,),
+            )
+        }
+        plan = IndexPlan(file_id)
+        pending = []
+        for component in self._canon_components(file_id):
+            previous = indexed.pop(component["component_id"], None)
+            if previous is None:
+                pending.append(component)
+            elif previous[1] == component["source_hash"]:
+                plan.unchanged += 1
+            else:
+                plan.upserts.append(component)
+
+        # Re-ingested with a new id but identical content -> rename
+        by_content: Dict[Tuple[str, str], List[str]] = {}
+        for cid, key in indexed.items():
+            by_content.setdefault(key, []).append(cid)
+        for component in pending:
+            candidates = by_content.get((component["qualified_name"], component["source_hash"]))
+            if candidates:
+                old_id = candidates.pop()
+                del indexed[old_id]
+                plan.renames.append((old_id, component))
+            else:
+                plan.upserts.append(component)
+
+        # Whatever was indexed for this file but is no longer in canon.db
+        plan.deletes = list(indexed)
+        return plan
+
+    # ---------------- recording ----------------
+
+    def commit(self, plan: IndexPlan):
+        now = datetime.utcnow().isoformat()
+        stale = plan.deletes + [old_id for old_id, _component in plan.renames]
+        if stale:
+            self.state.executemany(
+                "DELETE FROM rag_index_state WHERE component_id = ?", [(cid,) for cid in stale]
+            )
+        current = plan.upserts + [component for _old_id, component in plan.renames]
+        self.state.executemany(
+            "INSERT OR REPLACE INTO rag_index_state VALUES (?, ?, ?, ?, ?)",
+            [(c["component_id"], plan.file_id, c["qualified_name"], c["source_hash"], now) for c in current],
+        )
+        if not plan.is_noop:
+            # Neighbors and recommendations of every cached analysis may have changed
+            self.state.execute("DELETE FROM rag_analysis_cache")
+        self.state.commit()
+
+    def components_for_file(self, file_id: str) -> List[str]:
+        return [
+            r[0]
+            for r in self.state.execute(
+                "SELECT component_id FROM rag_index_state WHERE file_id = ?", (file_id,)
+            )
+        ]
+
+    # ---------------- analysis memo ----------------
+
+    def cached_analyses(self, component_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Memoized analyses for the indexed components among ``component_ids``."""
+        keys = self._content_keys(component_ids)
+        cached = {}
+        for cid, (qname, source_hash) in keys.items():
+            row = self.state.execute(
+                "SELECT analysis_json FROM rag_analysis_cache WHERE qualified_name = ? AND source_hash = ?",
+                (qname, source_hash),
+            ).fetchone()
+            if row:
+                cached[cid] = json.loads(row[0])
+        return cached
+
+    def store_analyses(self, analyses: Dict[str, Dict]):
+        """Memoize analyses of indexed components (others have no stable key and are skipped)."""
+        keys = self._content_keys(analyses)
+        now = datetime.utcnow().isoformat()
+        self.state.executemany(
+            "INSERT OR REPLACE INTO rag_analysis_cache VALUES (?, ?, ?, ?)",
+            [(qname, source_hash, json.dumps(analyses[cid]), now) for cid, (qname, source_hash) in keys.items()],
+        )
+        self.state.commit()
+
+    def close(self):
+        self.state.close()
@@ -18,6 +18,8 @@ from bus.message_bus import MessageBus  # type: ignore
 from bus.settings_db import SettingsDB  # type: ignore
 from rag_engine import get_rag_analyzer, RAGVectorDB  # type: ignore
 
+from .rag_index import FileIndexState, IndexPlan, apply_index_plan
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,6 +31,7 @@ class RAGOrchestrator:
         self.bus = MessageBus()
         self.settings = SettingsDB()
         self.analyzer = get_rag_analyzer()
+        self.file_index = FileIndexState()
         self.logger = logging.getLogger(__name__)
 
     def is_rag_enabled(self) -> bool:
@@ -42,8 +45,10 @@ class RAGOrchestrator:
             return False
 
         try:
-            # Build/update index
-            indexed_count = self.analyzer.build_index_from_canon_db()
+            # Only this file's components: upsert changed, delete removed
+            plan = self.file_index.plan(file_id)
+            indexed_count = self._apply_index_plan(plan)
+            self.file_index.commit(plan)
 
             # Publish event
             self.bus.publish_event(
@@ -53,11 +58,16 @@ class RAGOrchestrator:
                     'file_id': file_id,
                     'repo_path': repo_path,
                     'components_indexed': indexed_count,
+                    'components_removed': len(plan.deletes),
+                    'components_unchanged': plan.unchanged + len(plan.renames),
                     'timestamp': datetime.now().isoformat(),
                 }
             )
 
-            self.logger.info(f"RAG indexing completed: {indexed_count} components")
+            self.logger.info(
+                f"RAG indexing completed: {indexed_count} upserted, "
+                f"{len(plan.deletes)} removed, {plan.unchanged + len(plan.renames)} unchanged"
+            )
             return True
 
         except Exception as e:
@@ -69,18 +79,18 @@ class RAGOrchestrator:
             )
             return False
 
+    def _apply_index_plan(self, plan: IndexPlan) -> int:
+        """Apply a per-file plan to the vector DB. Returns the number of components embedded."""
+        return apply_index_plan(self.analyzer.rag_db, plan, self.analyzer.build_index_from_canon_db)
+
     def analyze_component(self, component_id: str) -> Dict:
         """Perform semantic analysis on a component."""
         if not self.is_rag_enabled():
             return {}
 
         try:
-            analysis = self.analyzer.analyze_with_context(component_id)
-
-            # Get recommendations
-            recommendations = self.analyzer.get_semantic_recommendations(component_id)
-
-            analysis['recommendations'] = recommendations
+            analyses = self.analyze_components([component_id])
+            analysis = analyses.get(component_id, {})
 
             # Publish analysis event
             self.bus.publish_event(
@@ -99,6 +109,38 @@ class RAGOrchestrator:
             self.logger.error(f"Component analysis failed: {e}")
             return {}
 
+    def analyze_components(self, component_ids: List[str], use_cache: bool = True) -> Dict[str, Dict]:
+        """
+        Analysis plus recommendations for many components at once.
+
+        Results are memoized by (qualified_name, source_hash) until the
+        index next changes, so repeated reports over an unchanged index
+        analyze nothing.
+        Misses go through the analyzer's ``analyze_batch`` when it has one
+        (one embedding pass, neighbors shared between analysis and
+        recommendations); otherwise they are analyzed one at a time.
+        """
+        results = self.file_index.cached_analyses(component_ids) if use_cache else {}
+        misses = [cid for cid in dict.fromkeys(component_ids) if cid not in results]
+        if not misses:
+            return results
+
+        if hasattr(self.analyzer, 'analyze_batch'):
+            fresh = self.analyzer.analyze_batch(misses)
+        else:
+            fresh = {}
+            for component_id in misses:
+                analysis = self.analyzer.analyze_with_context(component_id)
+                if not analysis:
+                    continue
+                analysis['recommendations'] = self.analyzer.get_semantic_recommendations(component_id)
+                fresh[component_id] = analysis
+
+        fresh = {cid: analysis for cid, analysis in fresh.items() if analysis}
+        self.file_index.store_analyses(fresh)
+        results.update(fresh)
+        return results
+
     def search_components(self, query: str, top_k: int = 5) -> List[Dict]:
         """Search for components using semantic search."""
         if not self.is_rag_enabled():
@@ -143,18 +185,19 @@ class RAGOrchestrator:
             return {}
 
         try:
-            # Get indexed components for this file
-            db = RAGVectorDB()
-            components = db.get_indexed_components(limit=100)
-
-            file_components = [c for c in components if c.get('file_id') == file_id]
-
-            # Analyze each component
-            analyses = []
-            for comp in file_components:
-                analysis = self.analyzer.analyze_with_context(comp['component_id'])
-                if analysis:
-                    analyses.append(analysis)
+            # Get indexed components for this file from the file -> component map
+            component_ids = self.file_index.components_for_file(file_id)
+            if not component_ids:
+                # Indexed before per-file state existed
+                db = RAGVectorDB()
+                components = db.get_indexed_components(limit=100)
+                component_ids = [c['component_id'] for c in components if c.get('file_id') == file_id]
+            file_components = component_ids
+
+            # Analyze all components in one batch (cached ones are free)
+            by_id = self.analyze_components(file_components)
+            analyzed_ids = [cid for cid in file_components if cid in by_id]
+            analyses = [by_id[cid] for cid in analyzed_ids]
 
             report = {
                 'file_id': file_id,
@@ -164,16 +207,30 @@ class RAGOrchestrator:
                 'generated_at': datetime.now().isoformat(),
             }
 
-            # Publish report event
-            self.bus.publish_event(
-                event_type='rag_augmented_report',
-                source='rag_orchestrator',
-                payload={
+            # Publish per-component analyses and the report in one transaction
+            timestamp = datetime.now().isoformat()
+            events = [
+                {
+                    'event_type': 'rag_component_analysis',
+                    'source': 'rag_orchestrator',
+                    'payload': {
+                        'component_id': component_id,
+                        'analysis': analysis,
+                        'timestamp': timestamp,
+                    },
+                }
+                for component_id, analysis in zip(analyzed_ids, analyses)
+            ]
+            events.append({
+                'event_type': 'rag_augmented_report',
+                'source': 'rag_orchestrator',
+                'payload': {
                     'file_id': file_id,
                     'components_analyzed': len(analyses),
-                    'timestamp': datetime.now().isoformat(),
-                }
-            )
+                    'timestamp': timestamp,
+                },
+            })
+            self.bus.publish_many(events)
 
             return report
 
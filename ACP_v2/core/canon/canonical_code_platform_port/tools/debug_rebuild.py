@@ -2,6 +2,18 @@ import sqlite3
 import ast
 import hashlib
 
+try:
+    from tools.core.blob_store import read_segments
+except ImportError:  # standalone port: segments carry inline source_text
+    def read_segments(conn, component_ids):
+        ids = list(component_ids)
+        rows = conn.execute(
+            f"SELECT component_id, source_text FROM canon_source_segments "
+            f"WHERE component_id IN ({','.join('?' * len(ids))})",
+            ids,
+        ).fetchall()
+        return {cid: text for cid, text in rows if text is not None}
+
 conn = sqlite3.connect('canon.db')
 c = conn.cursor()
 
@@ -20,24 +32,20 @@ comps = c.execute('''
     WHERE file_id=? AND parent_id IS NULL ORDER BY order_index
 ''', (fid,)).fetchall()
 
+# Inline (legacy) rows and canon_blobs references alike
+segments = read_segments(conn, [cid for cid, _kind, _name in comps])
+
 print(f"\nTop-level components ({len(comps)}):")
 for i, (cid, kind, name) in enumerate(comps):
-    src = c.execute('SELECT source_text FROM canon_source_segments WHERE component_id=?', (cid,)).fetchone()
-    text = src[0] if src else "(no source)"
-    preview = text[:50].replace('\n', '\\n') if src else ""
+    text = segments.get(cid)
+    preview = text[:50].replace('\n', '\\n') if text is not None else "(no source)"
     print(f"  {i+1}. [{kind}] {name}: {preview}...")
 
 # Rebuild
 rebuilt = []
-for (cid,) in c.execute('''
-    SELECT component_id FROM canon_components 
-    WHERE file_id=? AND parent_id IS NULL ORDER BY order_index
-''', (fid,)):
-    src_row = c.execute(
-        'SELECT source_text FROM canon_source_segments WHERE component_id=?', (cid,)
-    ).fetchone()
-    if src_row:
-        rebuilt.append(src_row[0])
+for cid, _kind, _name in comps:
+    if cid in segments:
+        rebuilt.append(segments[cid])
     else:
         print(f"WARNING: No source for {cid}")
 
@@ -1,12 +1,29 @@
 #!/usr/bin/env python3
-"""Phase 4 verification: prove DB AST == disk AST for latest file."""
+"""Phase 4 verification: prove DB AST == disk AST.
 
+Usage:
+    python workflows/workflow_verify.py                 # newest file on disk
+    python workflows/workflow_verify.py --all           # every file in canon_files
+    python workflows/workflow_verify.py --all --force --workers 8 --report verify.json
+
+``--all`` hashes files in a process pool, skips files whose mtime and size
+are unchanged since their last proof (unless ``--force``), writes all
+``equivalence_proofs`` in one transaction and prints a summary with the
+slowest files.
+"""
+
+import argparse
 import ast
 import hashlib
+import json
+import os
 import sys
+import time
 import uuid
 import datetime
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from core.canon_db import init_db
 
@@ -15,6 +32,138 @@ def sha256(s: str) -> str:
     return hashlib.sha256(s.encode()).hexdigest()
 
 
+def _hash_file(path: str, raw: bool = False) -> Tuple[Optional[str], Optional[str], float]:
+    """Worker: return (ast_hash, error, seconds). With ``raw`` the file's bytes are hashed instead."""
+    start = time.perf_counter()
+    try:
+        if raw:
+            with open(path, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest(), None, time.perf_counter() - start
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        tree = ast.parse(source)
+        return sha256(ast.dump(tree, include_attributes=False)), None, time.perf_counter() - start
+    except (OSError, UnicodeDecodeError, SyntaxError, ValueError) as e:
+        return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+def _stored_as_raw(path: str, raw_hash: Optional[str], ast_hash: Optional[str]) -> bool:
+    """Assets registered by workflow_polyglot store their byte hash as the AST hash; ingest parses everything else."""
+    if raw_hash:
+        return raw_hash == ast_hash
+    return not path.endswith(".py")
+
+
+def verify_all(conn, workers: Optional[int] = None, force: bool = False) -> Dict[str, object]:
+    """
+    Verify every file in canon_files; returns the summary (also used for --report).
+
+    ``conn`` comes from ``init_db``, which also creates ``verify_state``.
+    """
+    sweep_start = time.perf_counter()
+    rows = conn.execute(
+        """
+        SELECT f.file_id, f.repo_path, f.raw_hash_sha256, f.ast_hash_sha256, s.mtime_ns, s.byte_size
+        FROM canon_files f
+        LEFT JOIN verify_state s ON s.file_id = f.file_id
+        """
+    ).fetchall()
+
+    summary: Dict[str, object] = {"total": len(rows), "verified": 0, "drift": 0,
+                                  "skipped": 0, "missing": 0, "errors": 0}
+    pending: List[Tuple[str, str, str, int, int]] = []
+    raw_modes: List[bool] = []
+    for file_id, repo_path, raw_hash, stored_hash, last_mtime, last_size in rows:
+        try:
+            st = os.stat(repo_path)
+        except OSError:
+            summary["missing"] += 1
+            continue
+        if not force and last_mtime == st.st_mtime_ns and last_size == st.st_size:
+            summary["skipped"] += 1
+            continue
+        pending.append((file_id, repo_path, stored_hash, st.st_mtime_ns, st.st_size))
+        raw_modes.append(_stored_as_raw(repo_path, raw_hash, stored_hash))
+
+    now = datetime.datetime.utcnow().isoformat()
+    proofs = []
+    states = []
+    timings = []
+    failures = []
+    paths = [p[1] for p in pending]
+    chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for (file_id, path, stored_hash, mtime_ns, size), (current_hash, error, seconds) in zip(
+            pending, pool.map(_hash_file, paths, raw_modes, chunksize=chunksize)
+        ):
+            timings.append((seconds, path))
+            if error:
+                summary["errors"] += 1
+                failures.append({"path": path, "error": error})
+                continue
+            match = current_hash == stored_hash
+            status = "VERIFIED" if match else "DRIFT_DETECTED"
+            summary["verified" if match else "drift"] += 1
+            if not match:
+                failures.append({"path": path, "error": status})
+            proof_id = str(uuid.uuid4())
+            proofs.append((proof_id, file_id, stored_hash, current_hash,
+                           int(match), int(match), status, now))
+            states.append((file_id, mtime_ns, size, proof_id, status, now))
+
+    conn.executemany(
+        """
+        INSERT INTO equivalence_proofs
+        (proof_id, file_id, original_ast_hash, rebuilt_ast_hash,
+         ast_match, semantic_equivalent, proof_status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        proofs,
+    )
+    # Only stamp VERIFIED files so drifted ones are re-checked on the next sweep
+    conn.executemany(
+        "INSERT OR REPLACE INTO verify_state VALUES (?, ?, ?, ?, ?, ?)",
+        [s for s in states if s[4] == "VERIFIED"],
+    )
+    conn.commit()
+
+    timings.sort(reverse=True)
+    summary["elapsed_seconds"] = round(time.perf_counter() - sweep_start, 3)
+    summary["failures"] = failures
+    summary["timings"] = [{"path": p, "seconds": round(t, 4)} for t, p in timings]
+    return summary
+
+
+def main_all(args) -> int:
+    print("\n" + "=" * 60)
+    print("PHASE 4: BULK SYSTEM VERIFICATION")
+    print("=" * 60)
+
+    conn = init_db()
+    summary = verify_all(conn, workers=args.workers, force=args.force)
+    if not summary["total"]:
+        print("[!] No files found. Run ingest first.")
+        return 1
+
+    for key in ("total", "verified", "drift", "skipped", "missing", "errors", "elapsed_seconds"):
+        print(f"    {key:16}: {summary[key]}")
+    slowest = summary["timings"][: args.top]
+    if slowest:
+        print(f"\n[*] Slowest {len(slowest)} files:")
+        for item in slowest:
+            print(f"    {item['seconds'] * 1000:9.1f} ms  {item['path']}")
+    for failure in summary["failures"]:
+        print(f"[WARNING] {failure['path']}: {failure['error']}")
+
+    if args.report:
+        Path(args.report).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        print(f"[*] Report written: {args.report}")
+
+    if summary["errors"]:
+        return 1
+    return 2 if summary["drift"] else 0
+
+
 def main() -> int:
     print("\n" + "=" * 60)
     print("PHASE 4: SYSTEM VERIFICATION")
@@ -99,5 +248,16 @@ def main() -> int:
     return 0 if match else 2
 
 
+def cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify canon.db AST hashes against files on disk")
+    parser.add_argument("--all", action="store_true", help="verify every file in canon_files")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-verify files unchanged since their last proof")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest files to print")
+    parser.add_argument("--report", help="write the JSON summary (with per-file timings) here")
+    args = parser.parse_args(argv)
+    return main_all(args) if args.all else main()
+
+
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(cli())
@@ -0,0 +1 @@
+"""Boundary-aware text chunking."""
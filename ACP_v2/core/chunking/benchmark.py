@@ -0,0 +1,187 @@
+"""
+Chunker Benchmark
+
+Chunks a fixture corpus (by default this repository's docs/ and core/
+trees) with the legacy fixed character window and with the boundary-aware
+chunker, and reports per strategy:
+
+  - throughput:        chunks/sec and MB/sec
+  - mid_word_cuts:     share of chunk ends that split a word
+  - sentences_intact:  share of prose sentences contained whole in some chunk
+  - defs_intact:       share of Python top-level/class-level definitions that
+                       fit the budget and are contained whole in some chunk
+  - hit@k:             lexical retrieval (idf-weighted term overlap) of
+                       sampled sentences; a hit is a top-k chunk containing the
+                       whole sentence
+
+Usage:
+    python -m core.chunking.benchmark [--corpus DIR ...] [--size 500] [--overlap 50] [--tokenizer chars]
+"""
+
+import argparse
+import ast
+import math
+import random
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from .chunker import CODE, LINE, SENTENCE, Chunker, python_anchors, resolve_tokenizer
+
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_CORPUS = [ROOT / "docs", ROOT / "core"]
+PROSE_SUFFIXES = {".md", ".txt", ".rst"}
+TERM = re.compile(r"[A-Za-z_][A-Za-z0-9_]+")
+
+Span = Tuple[int, int]
+
+
+def load_corpus(roots: Sequence[Path], max_files: int) -> List[Tuple[Path, str]]:
+    files = sorted(
+        p for root in roots for p in Path(root).rglob("*")
+        if p.is_file() and p.suffix.lower() in PROSE_SUFFIXES | {".py"} and "__pycache__" not in p.parts
+    )
+    corpus = []
+    for path in files[:max_files]:
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        if text.strip():
+            corpus.append((path, text))
+    return corpus
+
+
+def legacy_windows(text: str, size: int, overlap: int) -> Iterator[Span]:
+    """The fixed character window the processors used before the shared chunker."""
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        text[start:end]  # materialized like the chunk content was
+        yield start, end
+        start += size - overlap
+
+
+def sentences(text: str) -> List[Span]:
+    spans, start = [], 0
+    for match in SENTENCE.finditer(text):
+        spans.append((start, match.start() + 1))
+        start = match.end()
+    # sentences do not span paragraphs (headings, list items)
+    return [(s, e) for s, e in spans if 40 <= e - s <= 400 and "\n\n" not in text[s:e]]
+
+
+def definitions(text: str, budget: int) -> List[Span]:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+    line_starts = [0] + [m.end() for m in LINE.finditer(text)]
+    spans = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.end_lineno:
+            start = line_starts[min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1]
+            end = line_starts[node.end_lineno] if node.end_lineno < len(line_starts) else len(text)
+            if end - start <= budget:
+                spans.append((start, end))
+    return spans
+
+
+def contained(target: Span, chunks: List[Span]) -> bool:
+    return any(s <= target[0] and target[1] <= e for s, e in chunks)
+
+
+def evaluate(name: str, corpus, split, size: int, probes: int, k: int, seed: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    chunked = [(path, text, list(split(path, text))) for path, text in corpus]
+    elapsed = time.perf_counter() - started
+    total_chunks = sum(len(spans) for *_, spans in chunked)
+    total_chars = sum(len(text) for _, text, _ in chunked)
+
+    cuts = mid_word = 0
+    sentence_total = sentence_ok = def_total = def_ok = 0
+    for path, text, spans in chunked:
+        for _, end in spans:
+            if end < len(text):
+                cuts += 1
+                mid_word += text[end - 1].isalnum() and text[end].isalnum()
+        if path.suffix.lower() == ".py":
+            for span in definitions(text, size):
+                def_total += 1
+                def_ok += contained(span, spans)
+        else:
+            for span in sentences(text):
+                sentence_total += 1
+                sentence_ok += contained(span, spans)
+
+    # Lexical retrieval over every chunk of the corpus
+    documents = [(i, s, e, Counter(TERM.findall(text[s:e].lower())))
+                 for i, (_, text, spans) in enumerate(chunked) for s, e in spans]
+    doc_freq: Counter = Counter()
+    for *_, terms in documents:
+        doc_freq.update(terms.keys())
+    idf = {t: math.log(len(documents) / df) for t, df in doc_freq.items()}
+    candidates = [(i, span) for i, (path, text, _) in enumerate(chunked)
+                  if path.suffix.lower() in PROSE_SUFFIXES for span in sentences(text)]
+    random.Random(seed).shuffle(candidates)
+    hits = 0
+    for file_index, (s, e) in candidates[:probes]:
+        query = set(TERM.findall(chunked[file_index][1][s:e].lower()))
+        ranked = sorted(documents, key=lambda d: -sum(idf[t] for t in query if t in d[3]))[:k]
+        hits += any(i == file_index and cs <= s and e <= ce for i, cs, ce, _ in ranked)
+    evaluated = min(probes, len(candidates))
+
+    stats = {
+        "chunks": total_chunks,
+        "chunks_per_sec": total_chunks / elapsed if elapsed else float("inf"),
+        "mb_per_sec": total_chars / 1e6 / elapsed if elapsed else float("inf"),
+        "mid_word_cuts": mid_word / cuts if cuts else 0.0,
+        "sentences_intact": sentence_ok / sentence_total if sentence_total else 0.0,
+        "defs_intact": def_ok / def_total if def_total else 0.0,
+        f"hit@{k}": hits / evaluated if evaluated else 0.0,
+    }
+    print(f"    {name:9}: {total_chunks:6d} chunks  {stats['chunks_per_sec']:9.0f} chunks/sec  "
+          f"{stats['mb_per_sec']:6.2f} MB/sec")
+    print(f"    {'':9}  mid-word cuts {stats['mid_word_cuts']:6.1%}   sentences intact {stats['sentences_intact']:6.1%}   "
+          f"defs intact {stats['defs_intact']:6.1%}   hit@{k} {stats[f'hit@{k}']:6.1%}")
+    return stats
+
+
+def run(corpus_roots: Sequence[Path] = DEFAULT_CORPUS, size: int = 500, overlap: int = 50, tokenizer: str = "chars",
+        max_files: int = 400, probes: int = 200, k: int = 3, seed: int = 7) -> Dict[str, Dict[str, float]]:
+    corpus = load_corpus(corpus_roots, max_files)
+    print(f"Corpus: {len(corpus)} files, {sum(len(t) for _, t in corpus) / 1e6:.2f} MB "
+          f"(size={size}, overlap={overlap}, tokenizer={tokenizer})")
+    count = resolve_tokenizer(tokenizer)
+    prose = Chunker(size, overlap, tokenizer=count)
+    code = Chunker(size, overlap, tokenizer=count, boundaries=CODE, overlap_snap=LINE)
+
+    def boundary(path: Path, text: str) -> Iterator[Span]:
+        if path.suffix.lower() == ".py":
+            chunks = code.split(text, str(path), anchors=python_anchors(text))
+        else:
+            chunks = prose.split(text, str(path))
+        return ((c.start, c.end) for c in chunks)
+
+    results = {}
+    if count is None:
+        # the legacy window only understands characters
+        results["window"] = evaluate("window", corpus, lambda p, t: legacy_windows(t, size, overlap), size, probes, k, seed)
+    results["boundary"] = evaluate("boundary", corpus, boundary, size, probes, k, seed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunker throughput and retrieval-quality benchmark")
+    parser.add_argument("--corpus", nargs="*", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--tokenizer", default="chars", help="chars | words | tiktoken:<encoding>")
+    parser.add_argument("--max-files", type=int, default=400)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+    run(args.corpus, args.size, args.overlap, args.tokenizer, args.max_files, args.probes, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Shared chunking engine for the PDF, codebase and context-manager paths.
+
+The chunker works on character offsets into the source text: budgets,
+boundary searches (``str.find``/compiled regexes with ``pos``/``endpos``)
+and overlap are computed without copying, and each emitted chunk is sliced
+out exactly once.
+
+  - Sizing: ``max_size``/``overlap`` are characters by default, or tokens
+    when a ``tokenizer`` (``str -> token count``) is given.
+    ``resolve_tokenizer("words")`` / ``"tiktoken:<encoding>"`` build one
+    from a settings string.
+  - Boundaries: a chunk ends at the strongest break found in the last half
+    of its budget window. PROSE prefers paragraph > sentence > line > word,
+    CODE prefers blank line > line > word; ``anchors`` (e.g. Python AST node
+    starts from ``python_anchors``) outrank both. Only a window with no
+    whitespace at all is cut hard.
+  - Overlap starts on a word boundary (a line boundary with
+    ``overlap_snap=LINE``), so neither end of a chunk splits a word.
+  - Chunk IDs hash (source, offsets, text), so re-chunking unchanged input
+    yields identical IDs.
+
+``split_stream`` chunks a text stream block by block with the same output
+as ``split`` on the whole text.
+"""
+
+import ast
+import bisect
+import hashlib
+import importlib
+import itertools
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+Tokenizer = Callable[[str], int]
+
+PARAGRAPH = re.compile(r"\n[ \t]*\n(?:[ \t]*\n)*")
+SENTENCE = re.compile(r"[.!?][\"')\]]*\s+")
+LINE = re.compile(r"\n")
+WORD = re.compile(r"\s+")
+
+PROSE: Tuple[re.Pattern, ...] = (PARAGRAPH, SENTENCE, LINE, WORD)
+CODE: Tuple[re.Pattern, ...] = (PARAGRAPH, LINE, WORD)
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    start: int
+    end: int
+    index: int
+    chunk_id: str
+
+
+def chunk_id(source: str, start: int, end: int, text: str) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(f"{source}\x00{start}\x00{end}\x00".encode("utf-8"))
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def resolve_tokenizer(name: Optional[str]) -> Optional[Tokenizer]:
+    """``"chars"``/empty -> None (character budget), ``"words"``, or ``"tiktoken:<encoding>"``."""
+    if not name or name == "chars":
+        return None
+    if name == "words":
+        return count_words
+    if name.startswith("tiktoken:"):
+        try:
+            tiktoken = importlib.import_module("tiktoken")
+        except ImportError as e:
+            raise ValueError(f"Tokenizer {name!r} requires the 'tiktoken' package") from e
+        encoding = tiktoken.get_encoding(name.split(":", 1)[1])
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    raise ValueError(f"Unknown tokenizer {name!r}")
+
+
+def python_anchors(source: str) -> List[int]:
+    """Offsets of the lines where module- and class-level statements start (decorators included)."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    line_starts = [0] + [m.end() for m in LINE.finditer(source)]
+    anchors = set()
+    bodies = [tree.body]
+    while bodies:
+        for node in bodies.pop():
+            decorators = getattr(node, "decorator_list", None) or []
+            lineno = min([node.lineno] + [d.lineno for d in decorators])
+            anchors.add(line_starts[lineno - 1])
+            if isinstance(node, ast.ClassDef):
+                bodies.append(node.body)
+    anchors.discard(0)
+    return sorted(anchors)
+
+
+class Chunker:
+    """Splits text into overlapping, boundary-aligned chunks within a size budget."""
+
+    def __init__(
+        self,
+        max_size: int = 500,
+        overlap: int = 50,
+        tokenizer: Optional[Tokenizer] = None,
+        boundaries: Sequence[re.Pattern] = PROSE,
+        min_fill: float = 0.5,
+        overlap_snap: re.Pattern = WORD,
+    ):
+        if max_size <= overlap:
+            raise ValueError("Chunk size must be greater than overlap size.")
+        self.max_size = max_size
+        self.overlap = overlap
+        self.tokenizer = tokenizer
+        self.boundaries = tuple(boundaries)
+        self.min_fill = min_fill
+        # the overlap starts just after the first match of this in the overlap region
+        self.overlap_snap = overlap_snap
+
+    # ---------------- public API ----------------
+
+    def split(self, text: str, source: str = "", anchors: Sequence[int] = ()) -> Iterator[Chunk]:
+        """Chunks of ``text``; ``anchors`` are preferred break offsets (sorted)."""
+        yield from self._emit(text, 0, 0, True, source, list(anchors), itertools.count())
+
+    def split_stream(self, stream: TextIO, source: str = "", block_size: int = STREAM_BLOCK_SIZE) -> Iterator[Chunk]:
+        """Chunks of a text stream; only the unconsumed tail of the text is buffered."""
+        buffer = ""
+        base = 0  # offset of buffer[0] in the stream
+        start = 0
+        counter = itertools.count()
+        eof = False
+        while not eof:
+            block = stream.read(block_size)
+            eof = not block
+            buffer += block
+            start = yield from self._emit(buffer, start, base, eof, source, [], counter)
+            if start:
+                buffer = buffer[start:]
+                base += start
+                start = 0
+
+    def spans(self, text: str, anchors: Sequence[int] = ()) -> List[Tuple[int, int]]:
+        """(start, end) offsets only."""
+        return [(c.start, c.end) for c in self.split(text, anchors=anchors)]
+
+    def measure(self, text: str, start: int, end: int) -> int:
+        if self.tokenizer is None:
+            return end - start
+        return self.tokenizer(text[start:end])
+
+    # ---------------- engine ----------------
+
+    def _emit(self, text: str, start: int, base: int, final: bool, source: str,
+              anchors: List[int], counter) -> Iterator[Chunk]:
+        """Yield chunks from ``start``; returns where to resume once more text is available."""
+        n = len(text)
+        while start < n:
+            limit = self._limit(text, start, n)
+            if limit >= n and not final:
+                return start  # the window may extend into text not read yet
+            end = n if limit >= n else self._cut(text, start, limit, anchors)
+            piece = text[start:end]
+            if not piece.isspace():
+                yield Chunk(piece, base + start, base + end, next(counter),
+                            chunk_id(source, base + start, base + end, piece))
+            if end >= n:
+                return n
+            start = self._next_start(text, start, end)
+        return start
+
+    def _limit(self, text: str, start: int, n: int) -> int:
+        """Furthest end offset whose span fits the budget."""
+        end = min(n, start + self.max_size)
+        if self.tokenizer is None:
+            return end
+
+        def fits(e: int) -> bool:
+            return self.tokenizer(text[start:e]) <= self.max_size
+
+        if fits(end):
+            # Tokens usually span several characters: gallop, then bisect
+            lo = hi = end
+            while hi < n:
+                hi = min(n, start + 2 * (hi - start))
+                if not fits(hi):
+                    break
+                lo = hi
+            if lo >= n:
+                return n
+        else:
+            lo, hi = start + 1, end
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if fits(mid):
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    def _cut(self, text: str, start: int, limit: int, anchors: List[int]) -> int:
+        """Strongest boundary in the last part of the window, else the last one anywhere in it."""
+        floor = start + max(1, int((limit - start) * self.min_fill))
+        if anchors:
+            i = bisect.bisect_right(anchors, limit) - 1
+            if i >= 0 and anchors[i] > floor:
+                return anchors[i]
+        for lowest in (floor, start + 1):
+            for pattern in self.boundaries:
+                last = None
+                for last in pattern.finditer(text, lowest, limit):
+                    pass
+                if last is not None and last.end() > start:
+                    return last.end()
+        return limit  # no whitespace in the window: hard cut
+
+    def _next_start(self, text: str, start: int, end: int) -> int:
+        if not self.overlap:
+            return end
+        if self.tokenizer is None:
+            back = self.overlap
+        else:
+            # Token overlap converted at this chunk's chars-per-token ratio
+            back = self.overlap * (end - start) // max(1, self.measure(text, start, end))
+        next_start = max(start + 1, end - back)
+        if not text[next_start - 1].isspace():
+            gap = self.overlap_snap.search(text, next_start, end) or WORD.search(text, next_start, end)
+            if gap is not None:
+                next_start = gap.end()
+            elif text[end - 1].isspace() or text[end].isspace():
+                # the overlap would be a word fragment: drop it
+                next_start = end
+        return next_start
+
@@ -1,17 +1,27 @@
+import json
 import logging
-from typing import Any
 import os
 import subprocess
+import threading
+import time
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 # Initialize module-level logger
 logger = logging.getLogger("Sentinel")
 
+DEFAULT_CACHE_PATH = ".sentinel_cache.json"
+
+
 class SentinelGatekeeper:
     """
     Workflow I: The Sentinel Gatekeeper.
     Acts as the mandatory pre-condition validator for the Orchestrator.
+
+    Hygiene results are cached per directory and keyed by the directory's
+    mtime (which changes whenever an entry is added or removed), so an
+    unchanged tree costs one stat per directory instead of a full listing.
+    Binary validations persist in ``sentinel.cache_path`` across restarts.
     """
 
     def __init__(self, config: Dict):
@@ -19,15 +29,54 @@ class SentinelGatekeeper:
         self.sentinel_cfg = config.get("sentinel", {})
         self.binary_paths = self.sentinel_cfg.get("binary_paths", {})
         self.enforce_typing = self.sentinel_cfg.get("enforce_typing", False)
+        self.cache_path = Path(self.sentinel_cfg.get("cache_path", DEFAULT_CACHE_PATH))
         self._validated_binaries: Dict[str, Any] = {}
+        self._binary_cache = self._load_binary_cache()
+
+        # directory -> (mtime_ns, subdirectories) as of its last hygiene check
+        self._hygiene_cache: Dict[Path, Tuple[int, Tuple[Path, ...]]] = {}
+        self._lock = threading.Lock()
+        self.metrics: Dict[str, float] = {
+            "audits": 0,
+            "passed": 0,
+            "rejected": 0,
+            "audit_seconds_total": 0.0,
+            "audit_seconds_max": 0.0,
+            "hygiene_dirs_listed": 0,
+            "hygiene_dirs_cached": 0,
+        }
+
+    # ---------------- binaries ----------------
+
+    def _load_binary_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f).get("binaries", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_binary_cache(self):
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"binaries": self._binary_cache}, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"[SENTINEL] Could not persist binary cache to {self.cache_path}: {e}")
+
+    @staticmethod
+    def _binary_signature(path_obj: Path) -> Dict:
+        st = path_obj.stat()
+        return {"path": str(path_obj), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
 
     def validate_environment(self) -> bool:
         """
-        Checks if the host environment has the required 'physical' dependencies 
+        Checks if the host environment has the required 'physical' dependencies
         (Poppler, Tesseract) to handle multimodal ingestion.
         """
         all_passed = True
-        
+        cache_changed = False
+
         for name, bin_path in self.binary_paths.items():
             # Cache success to avoid subprocess overhead on every file
             if self._validated_binaries.get(name):
@@ -39,53 +88,164 @@ class SentinelGatekeeper:
                 all_passed = False
                 continue
 
+            # Validated by an earlier process and the binary has not been replaced since
+            signature = self._binary_signature(path_obj)
+            if self._binary_cache.get(name) == signature:
+                self._validated_binaries[name] = True
+                continue
+
             # Optional: Test execution (lightweight)
             try:
                 cmd = [str(path_obj), "--version"] if "tesseract" in name.lower() or "pdf" in name.lower() else [str(path_obj), "--help"]
                 subprocess.run(cmd, capture_output=True, timeout=2, check=False)
                 self._validated_binaries[name] = True
+                self._binary_cache[name] = signature
+                cache_changed = True
             except Exception as e:
                 logger.error(f"[SENTINEL] FAIL: {name} is present but not executable: {e}")
                 all_passed = False
-        
+
+        if cache_changed:
+            self._save_binary_cache()
         return all_passed
 
+    # ---------------- hygiene ----------------
+
     def enforce_structural_hygiene(self, target_path: Path):
         """
         Enforces project structure rules, such as ensuring 'py.typed' exists
         in packages to satisfy VS Code / Pylance strict modes.
         """
+        self.enforce_structural_hygiene_batch([target_path])
+
+    def enforce_structural_hygiene_batch(self, target_paths: Iterable[Path]):
+        """Hygiene for a burst of files: each affected directory is visited once."""
         if not self.enforce_typing:
             return
 
         # If processing a directory or a file within a package structure
-        scan_root = target_path if target_path.is_dir() else target_path.parent
-        
-        for root, dirs, files in os.walk(scan_root):
-            if "__init__.py" in files:
-                marker = Path(root) / "py.typed"
-                if not marker.exists():
-                    try:
-                        marker.touch()
-                        logger.info(f"[SENTINEL] HYGIENE: Created {marker}")
-                    except Exception as e:
-                        logger.warning(f"[SENTINEL] Could not create py.typed at {root}: {e}")
+        roots = {Path(p) if Path(p).is_dir() else Path(p).parent for p in target_paths}
+        visited: set = set()
+        with self._lock:
+            for scan_root in sorted(roots, key=lambda p: len(p.parts)):
+                self._walk_hygiene(scan_root, visited)
+
+    def _walk_hygiene(self, scan_root: Path, visited: set):
+        stack = [scan_root]
+        while stack:
+            directory = stack.pop()
+            if directory in visited:
+                continue
+            visited.add(directory)
+            try:
+                mtime_ns = directory.stat().st_mtime_ns
+            except OSError:
+                self._hygiene_cache.pop(directory, None)
+                continue
+
+            cached = self._hygiene_cache.get(directory)
+            if cached and cached[0] == mtime_ns:
+                self.metrics["hygiene_dirs_cached"] += 1
+                stack.extend(cached[1])
+                continue
+
+            self.metrics["hygiene_dirs_listed"] += 1
+            try:
+                with os.scandir(directory) as entries:
+                    entries = list(entries)
+            except OSError as e:
+                logger.warning(f"[SENTINEL] Could not scan {directory}: {e}")
+                continue
+            names = {entry.name for entry in entries}
+            subdirs = tuple(Path(entry.path) for entry in entries if entry.is_dir(follow_symlinks=False))
+
+            if "__init__.py" in names and "py.typed" not in names:
+                marker = directory / "py.typed"
+                try:
+                    marker.touch()
+                    logger.info(f"[SENTINEL] HYGIENE: Created {marker}")
+                    # Creating the marker changed the directory's mtime
+                    mtime_ns = directory.stat().st_mtime_ns
+                except Exception as e:
+                    logger.warning(f"[SENTINEL] Could not create py.typed at {directory}: {e}")
+                    # Leave it uncached so the next audit retries
+                    stack.extend(subdirs)
+                    continue
+
+            self._hygiene_cache[directory] = (mtime_ns, subdirs)
+            stack.extend(subdirs)
+
+    # ---------------- audits ----------------
+
+    def _check_file(self, file_path: Path) -> bool:
+        # 3. Validation Logic (Add specific file checks here if needed)
+        if file_path.stat().st_size == 0:
+            logger.warning(f"[SENTINEL] REJECT: File is empty {file_path.name}")
+            return False
+
+        logger.info(f"[SENTINEL] PASS: {file_path.name} cleared for ingestion.")
+        return True
+
+    def _record(self, started: float, passed: bool, count: int = 1):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.metrics["audits"] += count
+            self.metrics["passed" if passed else "rejected"] += count
+            self.metrics["audit_seconds_total"] += elapsed
+            self.metrics["audit_seconds_max"] = max(self.metrics["audit_seconds_max"], elapsed / count)
 
     def audit_file(self, file_path: Path) -> bool:
         """
         Master gatekeeping method. Returns True if the file is cleared for ingestion.
         """
+        started = time.perf_counter()
         # 1. Environmental Check (Binaries)
         if not self.validate_environment():
+            self._record(started, False)
             return False
 
         # 2. Structural Hygiene (Side-effect: fixes missing markers)
         self.enforce_structural_hygiene(file_path)
 
-        # 3. Validation Logic (Add specific file checks here if needed)
-        if file_path.stat().st_size == 0:
-            logger.warning(f"[SENTINEL] REJECT: File is empty {file_path.name}")
-            return False
+        passed = self._check_file(file_path)
+        self._record(started, passed)
+        return passed
 
-        logger.info(f"[SENTINEL] PASS: {file_path.name} cleared for ingestion.")
-        return True
+    def audit_batch(self, file_paths: Iterable[Path]) -> Dict[Path, bool]:
+        """
+        Gatekeeping for an intake burst: binaries and hygiene are checked once
+        for the whole batch, then each file is validated.
+        """
+        file_paths: List[Path] = [Path(p) for p in file_paths]
+        if not file_paths:
+            return {}
+        started = time.perf_counter()
+        if not self.validate_environment():
+            self._record(started, False, len(file_paths))
+            return {p: False for p in file_paths}
+        self.enforce_structural_hygiene_batch(file_paths)
+        shared = time.perf_counter() - started
+
+        results = {}
+        for file_path in file_paths:
+            file_started = time.perf_counter()
+            results[file_path] = self._check_file(file_path)
+            # Each file carries its share of the batch-wide checks
+            self._record(file_started - shared / len(file_paths), results[file_path])
+        return results
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Audit counters plus average latency (seconds)."""
+        with self._lock:
+            metrics = dict(self.metrics)
+        audits = metrics["audits"]
+        metrics["audit_seconds_avg"] = metrics["audit_seconds_total"] / audits if audits else 0.0
+        return metrics
+
+    def invalidate(self, directory: Optional[Path] = None):
+        """Forget cached hygiene results (for one directory, or all)."""
+        with self._lock:
+            if directory is None:
+                self._hygiene_cache.clear()
+            else:
+                self._hygiene_cache.pop(Path(directory), None)
@@ -15,7 +15,7 @@ def init():
         client: Any = pymongo.MongoClient(settings.MONGO_URI)
         db = client[settings.DB_NAME]
 
-        colls = [settings.COLLECTION_TRUTH, settings.COLLECTION_TRACES]
+        colls = [settings.COLLECTION_TRUTH, settings.COLLECTION_TRACES, settings.COLLECTION_SOURCES]
         for c in colls:
             if c not in db.list_collection_names():
                 db.create_collection(c)
@@ -26,6 +26,8 @@ def init():
             [("file_hash", pymongo.ASCENDING), ("chunk_index", pymongo.ASCENDING)],
             unique=True
         )
+        # Content-hash lookups let ingestion skip known chunks before embedding
+        db[settings.COLLECTION_TRUTH].create_index([("content_hash", pymongo.ASCENDING)])
         print("Aletheia Memory initialized successfully.")
         
     except Exception as e:
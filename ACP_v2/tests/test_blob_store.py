@@ -0,0 +1,103 @@
+import ast
+import uuid
+
+import pytest
+
+from tools.analysis.drift_detector import DriftDetector
+from tools.core import blob_store
+from tools.core.canon_db import init_db
+from tools.core.canon_extractor import CanonExtractor
+
+
+SOURCE = '''
+class Service:
+    """A service with a couple of methods."""
+
+    def start(self):
+        return "started " * 20
+
+    def stop(self):
+        return "stopped " * 20
+'''
+
+
+@pytest.fixture
+def conn(tmp_path):
+    connection = init_db(str(tmp_path / "canon.db"))
+    yield connection
+    connection.close()
+
+
+def _extract(conn, src, file_id):
+    conn.execute("DELETE FROM canon_components WHERE file_id=?", (file_id,))
+    CanonExtractor(src, file_id, conn).visit(ast.parse(src))
+    blob_store.release_orphan_segments(conn)
+    conn.commit()
+
+
+def test_nested_components_are_slices_of_their_parent(conn):
+    fid = str(uuid.uuid4())
+    _extract(conn, SOURCE, fid)
+
+    rows = conn.execute(
+        "SELECT c.component_id, c.qualified_name, b.codec FROM canon_components c "
+        "JOIN canon_blobs b ON b.source_hash = c.source_hash"
+    ).fetchall()
+    codecs = {qname: codec for _cid, qname, codec in rows}
+    assert codecs["Service.start"] == "slice"
+    assert codecs["Service"] in ("zlib", "zstd", "raw")
+
+    texts = blob_store.read_segments(conn, [cid for cid, _q, _c in rows])
+    by_name = {qname: texts[cid] for cid, qname, _c in rows}
+    assert by_name["Service.stop"].startswith("def stop(self):")
+    assert by_name["Service.start"] in by_name["Service"]
+
+
+def test_reingest_reuses_blobs_and_releases_unreferenced(conn):
+    fid = str(uuid.uuid4())
+    _extract(conn, SOURCE, fid)
+    before = conn.execute("SELECT COUNT(*) FROM canon_blobs").fetchone()[0]
+
+    _extract(conn, SOURCE, fid)
+    assert conn.execute("SELECT COUNT(*) FROM canon_blobs").fetchone()[0] == before
+    # one reference per segment row plus one per slice pointing into Service
+    assert conn.execute("SELECT SUM(refcount) FROM canon_blobs").fetchone()[0] == 3 + 2
+
+    _extract(conn, "x = 1\n", fid)
+    remaining = conn.execute("SELECT COUNT(*) FROM canon_blobs").fetchone()[0]
+    assert remaining == 1
+
+
+def test_migrate_legacy_inline_segments(conn):
+    conn.execute(
+        "INSERT INTO canon_source_segments (component_id, source_text) VALUES (?, ?)",
+        ("legacy", "def f():\n    return 1\n"),
+    )
+    assert blob_store.migrate_legacy_segments(conn) == 1
+    assert conn.execute(
+        "SELECT source_text FROM canon_source_segments WHERE component_id='legacy'"
+    ).fetchone()[0] is None
+    assert blob_store.read_segment(conn, "legacy") == "def f():\n    return 1\n"
+
+
+def test_pruned_history_releases_old_versions(conn):
+    fid = str(uuid.uuid4())
+    detector = DriftDetector(conn, keep_versions=2)
+    previous = None
+    for number in range(1, 5):
+        _extract(conn, f"def f():\n    return {number}\n", fid)
+        version = str(uuid.uuid4())
+        conn.execute(
+            "INSERT INTO file_versions VALUES (?,?,?,?,?,?,?,?,?)",
+            (version, fid, number, previous, "", "", "", 0, ""),
+        )
+        detector.detect_drift(fid, version)
+        previous = version
+
+    # Versions 3 and 4 keep their history; 1 and 2 were pruned and their text dropped
+    texts = blob_store.get_blobs(conn, [r[0] for r in conn.execute("SELECT source_hash FROM canon_blobs")])
+    assert sorted(texts.values()) == ["def f():\n    return 3", "def f():\n    return 4"]
+    assert conn.execute("SELECT COUNT(DISTINCT file_version_id) FROM component_history").fetchone()[0] == 2
+    # Segment row + history row for v4; the history row for v3
+    assert conn.execute("SELECT SUM(refcount) FROM canon_blobs").fetchone()[0] == 3
+    assert conn.execute("SELECT COUNT(*) FROM file_versions").fetchone()[0] == 4
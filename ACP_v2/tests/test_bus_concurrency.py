@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from core.bus.connection_pool import ConnectionPool
+from core.bus.message_bus import MessageBus
+from core.bus.settings_db import SettingsDB
+
+THREADS = 16
+OPS_PER_THREAD = 100
+
+
+def _run_threads(target):
+    errors = []
+
+    def wrapped(n):
+        try:
+            target(n)
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=wrapped, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+@pytest.mark.parametrize("group_commit_ms", [0, 2])
+def test_concurrent_publish_get_and_state(tmp_path, group_commit_ms):
+    bus = MessageBus(str(tmp_path / "bus.db"), group_commit_ms=group_commit_ms)
+
+    def hammer(n):
+        for i in range(OPS_PER_THREAD):
+            bus.publish_event("stress", f"thread-{n}", {"i": i})
+            bus.set_state(f"thread-{n}", i)
+            bus.get_events(event_type="stress", limit=5)
+            bus.get_state(f"thread-{n}")
+            if i % 10 == 0:
+                bus.publish_many([("stress", f"thread-{n}", {"batch": i})] * 3)
+
+    try:
+        _run_threads(hammer)
+        bus.flush()
+        expected = THREADS * (OPS_PER_THREAD + 3 * (OPS_PER_THREAD // 10))
+        assert bus.conn.execute("SELECT COUNT(*) FROM bus_events").fetchone()[0] == expected
+        state = bus.get_all_state()
+        assert all(state[f"thread-{n}"] == OPS_PER_THREAD - 1 for n in range(THREADS))
+    finally:
+        bus.close()
+
+
+def test_concurrent_settings_writes(tmp_path):
+    settings = SettingsDB(str(tmp_path / "settings.db"))
+
+    def hammer(n):
+        for i in range(OPS_PER_THREAD):
+            settings.set_setting(f"key-{n}", i)
+            settings.set_feature_flag(f"flag-{n}", i % 2 == 0)
+            assert settings.get_setting(f"key-{n}") == i
+            settings.get_all_settings()
+
+    try:
+        _run_threads(hammer)
+        assert all(settings.get_setting(f"key-{n}") == OPS_PER_THREAD - 1 for n in range(THREADS))
+        assert len(settings.get_all_flags()) == THREADS
+    finally:
+        settings.close()
+
+
+def test_failed_write_is_rolled_back_alone(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), group_commit_ms=20)
+    pool.write(lambda conn: conn.execute("CREATE TABLE t (k TEXT PRIMARY KEY)"))
+    try:
+        ok = pool.write(lambda conn: conn.execute("INSERT INTO t VALUES ('a')"), wait=False)
+        dup = pool.write(lambda conn: conn.execute("INSERT INTO t VALUES ('a')"), wait=False)
+        other = pool.write(lambda conn: conn.execute("INSERT INTO t VALUES ('b')"), wait=False)
+        ok.result()
+        other.result()
+        with pytest.raises(Exception):
+            dup.result()
+        rows = pool.reader().execute("SELECT k FROM t ORDER BY k").fetchall()
+        assert [r[0] for r in rows] == ["a", "b"]
+    finally:
+        pool.close()
+
+
+def test_failing_commit_callback_does_not_stall_the_writer(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    pool.write(lambda conn: conn.execute("CREATE TABLE t (k TEXT PRIMARY KEY)"))
+
+    def broken_notify():
+        raise RuntimeError("listener failed")
+
+    try:
+        pool.write(lambda conn: conn.execute("INSERT INTO t VALUES ('a')"), on_commit=broken_notify)
+        pool.write(lambda conn: conn.execute("INSERT INTO t VALUES ('b')"))
+        assert [r[0] for r in pool.reader().execute("SELECT k FROM t ORDER BY k")] == ["a", "b"]
+    finally:
+        pool.close()
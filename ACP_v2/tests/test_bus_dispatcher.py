@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from core.bus.dispatcher import EventDispatcher
+from core.bus.message_bus import MessageBus
+
+RECEIVED = []
+RECEIVED_LOCK = threading.Lock()
+# pytest may import this file under a package-qualified name
+HANDLER_PATH = f"{__name__}:record"
+
+
+def record(event):
+    with RECEIVED_LOCK:
+        RECEIVED.append(event)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def bus(tmp_path):
+    RECEIVED.clear()
+    message_bus = MessageBus(str(tmp_path / "bus.db"))
+    yield message_bus
+    message_bus.close()
+
+
+def test_dispatcher_pushes_new_events_to_imported_handler(bus):
+    bus.publish_event("file.scanned", "scanner", {"path": "before.py"})
+    sid = bus.subscribe("indexer", "file.scanned", HANDLER_PATH)
+
+    with EventDispatcher(bus, poll_interval=0.5):
+        bus.publish_event("file.scanned", "scanner", {"path": "a.py"})
+        bus.publish_event("other.event", "scanner", {})
+        bus.publish_event("file.scanned", "scanner", {"path": "b.py"})
+        # The in-process wakeup beats the 0.5s poll interval by a wide margin
+        assert _wait_for(lambda: len(RECEIVED) == 2, timeout=0.4)
+
+    # Events published before subscribing are not replayed
+    assert [e["payload"]["path"] for e in RECEIVED] == ["a.py", "b.py"]
+    cursor = bus.conn.execute(
+        "SELECT last_rowid FROM bus_subscription_cursors WHERE subscription_id=?", (sid,)
+    ).fetchone()[0]
+    assert cursor == bus.conn.execute("SELECT MAX(rowid) FROM bus_events").fetchone()[0]
+
+
+def test_failing_handler_is_retried_then_dead_lettered(bus):
+    calls = []
+
+    def flaky(event):
+        calls.append(event["payload"]["n"])
+        if event["payload"]["n"] == 1:
+            raise RuntimeError("boom")
+
+    bus.subscribe("flaky", "job", "inprocess:flaky")
+    dispatcher = EventDispatcher(bus, max_attempts=3, retry_backoff=0)
+    dispatcher.register_handler("inprocess:flaky", flaky)
+    with dispatcher:
+        for n in range(3):
+            bus.publish_event("job", "test", {"n": n})
+        assert _wait_for(lambda: 2 in calls)
+
+    assert calls == [0, 1, 1, 1, 2]
+    dead = bus.conn.execute("SELECT attempts, error FROM bus_dead_letters").fetchall()
+    assert [tuple(r) for r in dead] == [(3, "RuntimeError: boom")]
+
+
+def test_undelivered_events_survive_restart(bus):
+    bus.subscribe("late", "job", HANDLER_PATH)
+    for n in range(5):
+        bus.publish_event("job", "test", {"n": n})
+
+    with EventDispatcher(bus, batch_size=2):
+        assert _wait_for(lambda: len(RECEIVED) == 5)
+    assert [e["payload"]["n"] for e in RECEIVED] == [0, 1, 2, 3, 4]
+
+    RECEIVED.clear()
+    with EventDispatcher(bus):
+        bus.publish_event("job", "test", {"n": 5})
+        assert _wait_for(lambda: len(RECEIVED) == 1)
+    assert RECEIVED[0]["payload"]["n"] == 5
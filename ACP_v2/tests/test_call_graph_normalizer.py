@@ -0,0 +1,137 @@
+import ast
+import uuid
+
+import pytest
+
+from tools.core.canon_db import init_db
+from tools.core.canon_extractor import CanonExtractor
+from tools.analysis.call_graph_normalizer import CallGraphNormalizer
+
+
+HELPERS = """
+def helper():
+    return 1
+
+def other():
+    return helper()
+"""
+
+MAIN = """
+from helpers import helper
+
+class Runner:
+    def step(self):
+        return helper()
+
+    def run(self):
+        self.step()
+        len([])
+        return helper()
+
+def orchestrate():
+    Runner().run()
+    helper()
+    local_a()
+    local_b()
+
+def local_a():
+    pass
+
+def local_b():
+    pass
+"""
+
+
+def _ingest(conn, path, src, file_id=None):
+    file_id = file_id or str(uuid.uuid4())
+    row = conn.execute("SELECT 1 FROM canon_files WHERE file_id=?", (file_id,)).fetchone()
+    if row is None:
+        conn.execute(
+            "INSERT INTO canon_files VALUES (?,?,?,?,?,?,?,?)",
+            (file_id, path, "utf-8", "LF", "", "", len(src), ""),
+        )
+    conn.execute("DELETE FROM canon_components WHERE file_id=?", (file_id,))
+    CanonExtractor(src, file_id, conn).visit(ast.parse(src))
+    normalizer = CallGraphNormalizer(conn, file_id=file_id)
+    normalizer.normalize_calls()
+    normalizer.compute_metrics()
+    orchestrators = normalizer.detect_orchestrators()
+    normalizer.build_dependency_dag()
+    return file_id, orchestrators
+
+
+def _component(conn, file_id, qname):
+    return conn.execute(
+        "SELECT component_id FROM canon_components WHERE file_id=? AND qualified_name=?",
+        (file_id, qname),
+    ).fetchone()[0]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    CallGraphNormalizer.reset_index_cache()
+    connection = init_db(str(tmp_path / "canon.db"))
+    yield connection
+    connection.close()
+    CallGraphNormalizer.reset_index_cache()
+
+
+def test_resolves_local_method_builtin_and_pending_imports(conn):
+    main_id, orchestrators = _ingest(conn, "main.py", MAIN)
+    assert "orchestrate" in orchestrators
+
+    run_id = _component(conn, main_id, "Runner.run")
+    edges = conn.execute(
+        "SELECT resolved_name, call_kind, callee_id, is_builtin FROM call_graph_edges WHERE caller_id=?",
+        (run_id,),
+    ).fetchall()
+    by_name = {e[0]: e for e in edges}
+    assert by_name["Runner.step"][1] == "method"
+    assert by_name["Runner.step"][2] == _component(conn, main_id, "Runner.step")
+    assert by_name["len"][3] == 1
+    # helpers.py is not ingested yet: the import stays external
+    assert by_name["helpers.helper"][2] is None
+
+    # Ingesting the helpers module attaches the pending edges without touching main.py
+    helpers_id, _ = _ingest(conn, "helpers.py", HELPERS)
+    helper_id = _component(conn, helpers_id, "helper")
+    linked = conn.execute(
+        "SELECT COUNT(*) FROM call_graph_edges WHERE callee_id=? AND is_internal=1", (helper_id,)
+    ).fetchone()[0]
+    assert linked == 4  # Runner.step, Runner.run, orchestrate, other
+
+    fan_in = conn.execute(
+        "SELECT fan_in FROM call_graph_metrics WHERE component_id=?", (helper_id,)
+    ).fetchone()[0]
+    assert fan_in == 4
+
+
+def test_reingest_replaces_edges_and_reattaches_callers(conn):
+    main_id, _ = _ingest(conn, "main.py", MAIN)
+    helpers_id, _ = _ingest(conn, "helpers.py", HELPERS)
+    total = conn.execute("SELECT COUNT(*) FROM call_graph_edges").fetchone()[0]
+
+    # Re-ingest helpers.py: new component IDs, same names
+    _ingest(conn, "helpers.py", HELPERS, file_id=helpers_id)
+    assert conn.execute("SELECT COUNT(*) FROM call_graph_edges").fetchone()[0] == total
+
+    helper_id = _component(conn, helpers_id, "helper")
+    assert conn.execute(
+        "SELECT COUNT(*) FROM call_graph_edges WHERE callee_id=?", (helper_id,)
+    ).fetchone()[0] == 4
+    dangling = conn.execute(
+        """
+        SELECT COUNT(*) FROM call_graph_edges e
+        LEFT JOIN canon_components c ON c.component_id = e.callee_id
+        WHERE e.callee_id IS NOT NULL AND c.component_id IS NULL
+        """
+    ).fetchone()[0]
+    assert dangling == 0
+    stale_metrics = conn.execute(
+        """
+        SELECT COUNT(*) FROM call_graph_metrics m
+        LEFT JOIN canon_components c ON c.component_id = m.component_id
+        WHERE c.component_id IS NULL
+        """
+    ).fetchone()[0]
+    assert stale_metrics == 0
@@ -0,0 +1,81 @@
+import io
+
+from core.bridge.context_manager import chunk_text_with_overlap
+from core.chunking.chunker import CODE, LINE, Chunker, count_words, python_anchors
+
+PROSE_TEXT = "\n\n".join(
+    " ".join(f"Sentence {p}.{s} talks about topic number {p * 10 + s}." for s in range(6)) for p in range(12)
+)
+
+PYTHON_SOURCE = '''import os
+
+
+def first(x):
+    """First helper."""
+    total = 0
+    for i in range(x):
+        total += i
+    return total
+
+
+class Thing:
+    @property
+    def name(self):
+        return "thing"
+
+    def size(self):
+        return len(self.name) * 2
+
+
+def last():
+    return first(3)
+'''
+
+
+def test_chunks_end_on_boundaries_and_respect_the_budget():
+    chunker = Chunker(200, 30)
+    chunks = list(chunker.split(PROSE_TEXT, "doc.md"))
+    assert len(chunks) > 5
+    for chunk in chunks:
+        assert chunk.text == PROSE_TEXT[chunk.start:chunk.end]
+        assert len(chunk.text) <= 200
+        if chunk.end < len(PROSE_TEXT):
+            # every cut follows a full stop (sentence or paragraph break)
+            assert PROSE_TEXT[:chunk.end].rstrip().endswith(".")
+        if chunk.start:
+            assert PROSE_TEXT[chunk.start - 1].isspace()
+    # consecutive chunks overlap
+    assert all(b.start < a.end for a, b in zip(chunks, chunks[1:]))
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+
+
+def test_chunk_ids_are_deterministic_and_source_specific():
+    chunker = Chunker(200, 30)
+    first = [c.chunk_id for c in chunker.split(PROSE_TEXT, "doc.md")]
+    assert first == [c.chunk_id for c in Chunker(200, 30).split(PROSE_TEXT, "doc.md")]
+    assert len(set(first)) == len(first)
+    assert not set(first) & {c.chunk_id for c in chunker.split(PROSE_TEXT, "other.md")}
+
+
+def test_stream_and_token_budget():
+    chunker = Chunker(25, 5, tokenizer=count_words)
+    whole = list(chunker.split(PROSE_TEXT, "doc.md"))
+    assert all(count_words(c.text) <= 25 for c in whole)
+    streamed = list(chunker.split_stream(io.StringIO(PROSE_TEXT), "doc.md", block_size=97))
+    assert streamed == whole
+
+
+def test_python_definitions_are_kept_whole():
+    chunker = Chunker(160, 20, boundaries=CODE, overlap_snap=LINE)
+    chunks = list(chunker.split(PYTHON_SOURCE, "mod.py", anchors=python_anchors(PYTHON_SOURCE)))
+    starts = [PYTHON_SOURCE[c.end:].split("\n", 1)[0] for c in chunks[:-1]]
+    assert all(s.startswith(("def ", "class ", "    @property", "    def ")) for s in starts)
+    assert any("def first(x):" in c.text and "return total" in c.text for c in chunks)
+
+
+def test_context_manager_keeps_its_contract():
+    chunks = chunk_text_with_overlap("A" * 10000, chunk_size=5000, overlap_size=1000)
+    assert [len(c) for c in chunks] == [5000, 5000, 2000]
+    assert chunks[0][-1000:] == chunks[1][:1000]
+    words = chunk_text_with_overlap(PROSE_TEXT, chunk_size=300, overlap_size=40)
+    assert all(len(c) <= 300 and c[0].isalnum() for c in words)
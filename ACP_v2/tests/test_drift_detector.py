@@ -0,0 +1,93 @@
+import ast
+import uuid
+
+import pytest
+
+from tools.core.canon_db import init_db
+from tools.core.canon_extractor import CanonExtractor
+from tools.analysis.drift_detector import DriftDetector
+
+
+V1 = """
+def calculate(x, y):
+    return x + y
+
+def process_data(data):
+    return [d * 2 for d in data]
+
+class Legacy:
+    def helper(self):
+        return 42
+
+class DataProcessor:
+    pass
+"""
+
+V2 = """
+def calculate(x, y, operation="add"):
+    return x + y if operation == "add" else x * y
+
+def process_data(data):
+    return [d * 2 for d in data]
+
+class Modern:
+    def helper(self):
+        return 42
+
+def new_helper():
+    return 7
+"""
+
+
+def _ingest_version(conn, file_id, src, number, previous_version_id):
+    conn.execute("DELETE FROM canon_components WHERE file_id=?", (file_id,))
+    version_id = str(uuid.uuid4())
+    conn.execute(
+        "INSERT INTO file_versions VALUES (?,?,?,?,?,?,?,?,?)",
+        (version_id, file_id, number, previous_version_id, "", "", "", 0, ""),
+    )
+    CanonExtractor(src, file_id, conn).visit(ast.parse(src))
+    return version_id, DriftDetector(conn).detect_drift(file_id, version_id)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    connection = init_db(str(tmp_path / "canon.db"))
+    yield connection
+    connection.close()
+
+
+def test_detect_drift_classifies_components(conn):
+    fid = str(uuid.uuid4())
+    v1, stats = _ingest_version(conn, fid, V1, 1, None)
+    assert stats["added"] == 0
+    assert conn.execute(
+        "SELECT change_summary FROM file_versions WHERE version_id=?", (v1,)
+    ).fetchone()[0].startswith("baseline")
+
+    v2, stats = _ingest_version(conn, fid, V2, 2, v1)
+    # Legacy -> Modern is a rename (ADDED + REMOVED); its method body is a MOVE
+    assert stats == {"added": 2, "removed": 2, "modified": 1, "moved": 1, "unchanged": 1}
+
+    events = dict(conn.execute(
+        "SELECT qualified_name, drift_category FROM drift_events"
+    ).fetchall())
+    assert events == {
+        "calculate": "MODIFIED",
+        "Modern": "ADDED",
+        "Legacy": "REMOVED",
+        "Modern.helper": "MOVED",
+        "new_helper": "ADDED",
+        "DataProcessor": "REMOVED",
+    }
+    summary = conn.execute(
+        "SELECT change_summary FROM file_versions WHERE version_id=?", (v2,)
+    ).fetchone()[0]
+    assert summary == "2 added, 2 removed, 1 modified, 1 moved"
+
+
+def test_diff_handles_repeated_block_names():
+    previous = [("a", "block_expr", "h1", "h1"), ("b", "block_expr", "h2", "h2")]
+    current = [("c", "block_expr", "h2", "h2"), ("d", "block_expr", "h3", "h3")]
+    kinds = sorted(t for t, _old, _new in DriftDetector.diff(previous, current))
+    assert kinds == ["MODIFIED", "UNCHANGED"]
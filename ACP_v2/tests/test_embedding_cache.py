@@ -0,0 +1,41 @@
+import threading
+
+from tools.common.embedding_cache import EmbeddingCache, text_hash
+
+
+def test_vectors_round_trip_as_float16_and_survive_reopen(tmp_path):
+    db = str(tmp_path / "emb.db")
+    cache = EmbeddingCache(db, "nomic-embed-text-v1.5", "search_document: ")
+    cache.put_many({text_hash("alpha"): [0.125, -0.5, 0.3333]})
+    cache.close()
+
+    reopened = EmbeddingCache(db, "nomic-embed-text-v1.5", "search_document: ")
+    vector = reopened.get("alpha")
+    assert vector[:2] == [0.125, -0.5]
+    assert abs(vector[2] - 0.3333) < 1e-3
+    assert reopened.get("beta") is None
+
+    # Same text under another model or prefix is a different entry
+    assert EmbeddingCache(db, "other-model", "search_document: ").get("alpha") is None
+    assert EmbeddingCache(db, "nomic-embed-text-v1.5", "search_query: ").get("alpha") is None
+
+
+def test_get_many_is_thread_safe(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "emb.db"), "m")
+    cache.put_many({text_hash(str(n)): [float(n)] for n in range(200)})
+    errors = []
+
+    def read():
+        try:
+            found = cache.get_many(text_hash(str(n)) for n in range(250))
+            assert len(found) == 200
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert cache.hits == 8 * 200 and cache.misses == 8 * 50
@@ -0,0 +1,102 @@
+import sqlite3
+
+from core.canon.canonical_code_platform_port.graph_snapshot import GraphSnapshot, record_change
+from tools.core.canon_db import bump_generation, init_db
+
+
+def _add_component(conn, component_id, file_id, calls=None):
+    conn.execute(
+        "INSERT INTO canon_components (component_id, file_id, kind, name, qualified_name, order_index) "
+        "VALUES (?, ?, 'function', ?, ?, 0)",
+        (component_id, file_id, component_id, f"{file_id}.{component_id}"),
+    )
+    conn.execute(
+        "INSERT INTO canon_variables (variable_id, component_id, name, is_param) VALUES (?, ?, 'x', 1)",
+        (f"{component_id}:x", component_id),
+    )
+    if calls:
+        conn.execute(
+            "INSERT INTO call_graph_edges (edge_id, caller_id, callee_id, call_kind) VALUES (?, ?, ?, 'direct')",
+            (f"{component_id}->{calls}", component_id, calls),
+        )
+
+
+def _graph_db(tmp_path):
+    db_path = tmp_path / "canon.db"
+    conn = init_db(str(db_path))
+    _add_component(conn, "a1", "a.py")
+    _add_component(conn, "b1", "b.py", calls="a1")
+    bump_generation(conn, ["a.py", "b.py"])
+    return db_path, conn
+
+
+def test_unchanged_generation_keeps_etag_and_skips_queries(tmp_path):
+    db_path, conn = _graph_db(tmp_path)
+    snapshot = GraphSnapshot(db_path)
+    generation = snapshot.refresh()
+    etag = snapshot.etag("nodes", None)
+    nodes = snapshot.all_nodes()
+
+    statements = []
+    snapshot._conn.set_trace_callback(statements.append)
+    assert snapshot.refresh() == generation
+    # Same ETag: a client sending it as If-None-Match gets a 304
+    assert snapshot.etag("nodes", None) == etag
+    assert snapshot.all_nodes() is nodes
+    assert statements == ["SELECT MAX(generation) FROM canon_generations"]
+    conn.close()
+
+
+def test_refresh_reloads_only_the_changed_file(tmp_path):
+    db_path, conn = _graph_db(tmp_path)
+    snapshot = GraphSnapshot(db_path)
+    snapshot.refresh()
+    etag = snapshot.etag("nodes", None)
+    untouched = snapshot.nodes["a1"]
+
+    _add_component(conn, "b2", "b.py", calls="b1")
+    bump_generation(conn, ["b.py"])
+    snapshot.refresh()
+
+    assert snapshot.etag("nodes", None) != etag
+    assert snapshot.nodes["a1"] is untouched
+    assert sorted(node["id"] for node in snapshot.file_nodes("b.py")) == ["b1", "b2"]
+    assert snapshot.nodes["b2"]["data"]["parameters"][0]["name"] == "x"
+    assert {(e["source"], e["target"]) for e in snapshot.all_edges()} == {("b1", "a1"), ("b2", "b1")}
+    reachable = snapshot.neighborhood("b2", depth=2, direction="out")
+    assert sorted(node["id"] for node in reachable["nodes"]) == ["a1", "b1", "b2"]
+    conn.close()
+
+
+def test_file_with_more_components_than_the_parameter_limit(tmp_path):
+    db_path = tmp_path / "canon.db"
+    conn = init_db(str(db_path))
+    for n in range(1200):
+        _add_component(conn, f"c{n}", "big.py")
+    bump_generation(conn, ["big.py"])
+
+    snapshot = GraphSnapshot(db_path)
+    snapshot._conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    snapshot.refresh()
+
+    nodes = snapshot.file_nodes("big.py")
+    assert len(nodes) == 1200
+    assert all(node["data"]["parameters"] for node in nodes)
+    conn.close()
+
+
+def test_pre_generation_db_falls_back_to_data_version(tmp_path):
+    db_path, conn = _graph_db(tmp_path)
+    conn.execute("DROP TABLE canon_generations")
+    conn.commit()
+    snapshot = GraphSnapshot(db_path)
+    generation = snapshot.refresh()
+
+    _add_component(conn, "a2", "a.py")
+    # Nothing to log on such a DB; the commit itself is what the snapshot notices
+    assert record_change(conn, "a.py") is False
+    conn.commit()
+
+    assert snapshot.refresh() == generation + 1
+    assert "a2" in snapshot.nodes
+    conn.close()
@@ -0,0 +1,104 @@
+import json
+
+from core.chunking.chunker import Chunker
+from tools.analysis.hydrate_memory import ScanHydrator
+
+
+class Embedder:
+    def __init__(self):
+        self.texts = []
+
+    def embed_many(self, texts):
+        self.texts.extend(texts)
+        return [[float(len(t)), 1.0, 0.0] for t in texts]
+
+    def get_embedding(self, text):
+        return [0.0, 0.0, 0.0]
+
+
+class Truth:
+    def __init__(self):
+        self.docs = {}
+        self.inserts = 0
+
+    def find(self, selector, projection=None):
+        return [d for d in self.docs.values() if d["content_hash"] in selector["content_hash"]["$in"]]
+
+    def insert_many(self, docs, ordered=False):
+        self.inserts += 1
+        for doc in docs:
+            self.docs[(doc["file_hash"], doc["chunk_index"])] = doc
+
+
+class Index:
+    def __init__(self):
+        self.vectors = {}
+        self.adds = 0
+
+    def get(self, ids=None, limit=None, include=()):
+        if ids is None:
+            return {"ids": list(self.vectors)[:limit], "embeddings": list(self.vectors.values())[:limit]}
+        return {"ids": [i for i in ids if i in self.vectors]}
+
+    def add(self, ids, embeddings, metadatas, documents):
+        assert len(set(ids)) == len(ids) and not set(ids) & set(self.vectors)
+        self.adds += 1
+        self.vectors.update(zip(ids, embeddings))
+
+
+def split(text, path):
+    chunker = Chunker(40, 0)
+    return [{"content": c.text, "metadata": {"file_name": path, "chunk_index": c.index}} for c in chunker.split(text, path)]
+
+
+def _scan(tmp_path):
+    scan = tmp_path / "SCN_1"
+    (scan / "chunks").mkdir(parents=True)
+    long_text = "First paragraph of the design notes.\n\nSecond paragraph, also long enough."
+    files = [
+        {"file_id": "file_0000", "path": "small.py", "content": "x = 1\n"},
+        {"file_id": "file_0001", "path": "notes.md", "content": long_text},
+        {"file_id": "file_0002", "path": "logo.png", "content": "", "vision_base64": "iVBOR"},
+    ]
+    (scan / "chunks" / "chunk_01.json").write_text(json.dumps({"data": files[:2]}))
+    (scan / "chunks" / "chunk_02.json").write_text(json.dumps({"data": files[2:]}))
+    entries = [{"file_id": f["file_id"], "embedding": [9.0, 9.0, 9.0]} for f in files[:2]]
+    index = {"embedding_model": "test-embed", "document_prefix": "", "entries": entries}
+    (scan / "embeddings_index.json").write_text(json.dumps(index))
+    return scan
+
+
+def test_hydrate_reuses_scan_vectors_batches_writes_and_is_idempotent(tmp_path):
+    scan = _scan(tmp_path)
+    truth, index, embedder = Truth(), Index(), Embedder()
+
+    stats = ScanHydrator(truth, index, embedder, split, batch_size=100, embedding_model="test-embed").hydrate(scan)
+    assert stats == {"files": 2, "chunks_new": 3, "chunks_skipped": 0, "vectors_reused": 1,
+                     "vectors_embedded": 2, "chunks_failed": 0}
+    # the single-chunk file kept its scan vector; the split file's chunks were embedded
+    assert [9.0, 9.0, 9.0] in index.vectors.values()
+    assert "x = 1\n" not in embedder.texts and len(embedder.texts) == 2
+    assert truth.inserts == 1 and index.adds == 1
+    assert {doc["metadata"]["file_name"] for doc in truth.docs.values()} == {"small.py", "notes.md"}
+
+    embedder.texts.clear()
+    stats = ScanHydrator(truth, index, embedder, split, batch_size=2, embedding_model="test-embed").hydrate(scan)
+    assert stats["chunks_new"] == 0 and stats["chunks_skipped"] == 3
+    assert embedder.texts == [] and index.adds == 1 and len(truth.docs) == 3
+
+
+def test_scan_vectors_of_another_dimension_are_not_reused(tmp_path):
+    scan = _scan(tmp_path)
+    index = Index()
+    index.vectors["existing"] = [1.0, 2.0]
+    stats = ScanHydrator(Truth(), index, Embedder(), split, embedding_model="test-embed").hydrate(scan)
+    assert stats["vectors_reused"] == 0 and stats["vectors_embedded"] == 3
+
+
+def test_scan_vectors_from_another_model_or_prefix_are_not_reused(tmp_path):
+    scan = _scan(tmp_path)
+    for model, prefix in (("nomic-embed-text-v1.5", ""), ("test-embed", "search_document: "), (None, "")):
+        stats = ScanHydrator(Truth(), Index(), Embedder(), split, embedding_model=model, document_prefix=prefix).hydrate(
+            scan
+        )
+        assert stats["vectors_reused"] == 0 and stats["vectors_embedded"] == 3
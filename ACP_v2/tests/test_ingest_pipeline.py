@@ -0,0 +1,195 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from tools.ingest.pipeline import IngestPipeline
+
+
+class StubEmbedder:
+    """Local stand-in for the LM Studio client."""
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def embed_many(self, texts):
+        with self.lock:
+            self.batches.append(len(texts))
+        return [None if "skip" in t else [float(len(t)), 1.0] for t in texts]
+
+
+class FakeBulkWriteError(Exception):
+    def __init__(self, details):
+        super().__init__("batch op errors occurred")
+        self.details = details
+
+
+class MemoryCollection:
+    """insert_many with a unique (file_hash, chunk_index) key, like the truth collection."""
+
+    def __init__(self):
+        self.docs = {}
+        self.inserts = 0
+        self.finds = 0
+
+    def find(self, selector, projection=None):
+        self.finds += 1
+        ((field, condition),) = selector.items()
+        return [doc for doc in self.docs.values() if doc.get(field) in condition["$in"]]
+
+    def insert_many(self, docs, ordered=False):
+        self.inserts += 1
+        errors = []
+        for i, doc in enumerate(docs):
+            key = (doc["file_hash"], doc["chunk_index"])
+            if key in self.docs:
+                errors.append({"index": i, "code": 11000, "errmsg": "duplicate key"})
+            else:
+                self.docs[key] = doc
+        if errors:
+            raise FakeBulkWriteError({"writeErrors": errors})
+
+
+class MemoryIndex:
+    def __init__(self):
+        self.ids = []
+
+    def add(self, ids, embeddings, metadatas, documents):
+        assert len(set(ids)) == len(ids)
+        self.ids.extend(ids)
+
+    def get(self, ids, include):
+        return {"ids": [i for i in ids if i in self.ids]}
+
+
+class MemorySources:
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, selector, projection=None):
+        return [{"_id": digest} for digest in selector["_id"]["$in"] if digest in self.docs]
+
+    def update_one(self, selector, update, upsert=False):
+        self.docs[selector["_id"]] = update["$set"]
+
+
+def fake_extract(path):
+    text = Path(path).read_text()
+    if not text:
+        return []
+    return [{"content": line, "metadata": {"file_name": Path(path).name}} for line in text.splitlines()]
+
+
+def _pipeline(**options):
+    done = []
+    pipeline = IngestPipeline(
+        StubEmbedder(),
+        MemoryCollection(),
+        MemoryIndex(),
+        on_file_done=lambda path, ok: done.append((path.name, ok)),
+        extract_fn=fake_extract,
+        extract_executor=ThreadPoolExecutor(2),
+        **options,
+    )
+    return pipeline, done
+
+
+def test_pipeline_batches_across_files_and_reports_each_file(tmp_path):
+    files = []
+    for n in range(20):
+        f = tmp_path / f"doc{n}.txt"
+        f.write_text("\n".join(f"doc{n} line {i}" for i in range(7)))
+        files.append(f)
+    (tmp_path / "empty.txt").write_text("")
+    (tmp_path / "partial.txt").write_text("keep me\nskip me")
+    files += [tmp_path / "empty.txt", tmp_path / "partial.txt"]
+
+    pipeline, done = _pipeline(embed_batch_size=16, write_batch_size=50, embed_workers=3, queue_size=2)
+    results = pipeline.run(files)
+
+    assert results[tmp_path / "empty.txt"] is False
+    assert all(results[f] for f in files if f.name != "empty.txt")
+    assert sorted(done) == sorted((f.name, f.name != "empty.txt") for f in files)
+
+    truth = pipeline.collection_truth
+    assert len(truth.docs) == 20 * 7 + 1  # the chunk without a vector is skipped
+    assert truth.inserts < 20  # bulk writes span files
+    assert max(pipeline.embedder.batches) == 16
+
+    metrics = pipeline.metrics()
+    assert metrics["extract"]["items"] == 22
+    assert metrics["embed"]["items"] == 20 * 7 + 2
+    assert metrics["write"]["items"] == 20 * 7 + 1
+    assert metrics["queue_high_water"]["embed_queue"] <= 2
+
+
+def test_reingest_counts_duplicates_as_success(tmp_path):
+    f = tmp_path / "a.md"
+    f.write_text("one\ntwo\nthree")
+    pipeline, done = _pipeline()
+    assert pipeline.run([f]) == {f: True}
+    assert pipeline.run([f]) == {f: True}
+    assert len(pipeline.collection_truth.docs) == 3
+    assert done == [("a.md", True), ("a.md", True)]
+
+
+def test_chunks_are_embedded_while_extraction_is_still_running(tmp_path):
+    f = tmp_path / "manual.pdf"
+    f.write_text("")
+    broken = tmp_path / "broken.pdf"
+    broken.write_text("")
+    first_batch_embedded = threading.Event()
+
+    class SignallingEmbedder(StubEmbedder):
+        def embed_many(self, texts):
+            first_batch_embedded.set()
+            return super().embed_many(texts)
+
+    def pages(path):
+        for page in range(1, 41):
+            if page == 21:
+                # later pages wait until earlier ones have reached the embedder
+                assert first_batch_embedded.wait(5)
+                if path.endswith("broken.pdf"):
+                    raise RuntimeError("corrupt page")
+            yield {"content": f"{Path(path).name} page {page}", "metadata": {"file_name": Path(path).name}}
+
+    pipeline, done = _pipeline(embed_batch_size=4, collection_sources=MemorySources())
+    pipeline.embedder = SignallingEmbedder()
+    pipeline.extract_fn = pages
+    results = pipeline.run([f, broken])
+
+    assert results == {f: True, broken: False}
+    assert len([key for key in pipeline.collection_truth.docs if key[0] == "manual.pdf"]) == 40
+    # chunks streamed before the failure are still persisted
+    assert len([key for key in pipeline.collection_truth.docs if key[0] == "broken.pdf"]) == 20
+    # only the complete file is remembered; the truncated one is extracted again next time
+    assert [doc["file_name"] for doc in pipeline.collection_sources.docs.values()] == ["manual.pdf"]
+
+
+def test_known_files_and_chunks_are_skipped_before_extraction_and_embedding(tmp_path):
+    a = tmp_path / "a.md"
+    a.write_text("shared header\nonly in a\nshared header")
+    b = tmp_path / "b.md"
+    b.write_text("shared header\nonly in b")
+    extracted = []
+
+    def tracking_extract(path):
+        extracted.append(Path(path).name)
+        return fake_extract(path)
+
+    pipeline, done = _pipeline(collection_sources=MemorySources())
+    pipeline.extract_fn = tracking_extract
+    assert pipeline.run([a]) == {a: True}
+    # the repeated line is embedded and stored once
+    assert pipeline.embedder.batches == [2]
+    assert len(pipeline.collection_truth.docs) == 2
+    assert pipeline.metrics()["dedup"] == {"files_skipped": 0, "chunks_skipped": 1, "chunks_new": 2}
+
+    results = pipeline.run([a, b])
+    assert results == {a: True, b: True}
+    assert extracted == ["a.md", "b.md"]  # a.md was not extracted again
+    assert pipeline.embedder.batches == [2, 1]  # only "only in b" was embedded
+    assert pipeline.metrics()["dedup"] == {"files_skipped": 1, "chunks_skipped": 2, "chunks_new": 3}
+    assert len(pipeline.collection_index.ids) == 3
+    assert sorted(done) == [("a.md", True), ("a.md", True), ("b.md", True)]
@@ -0,0 +1,23 @@
+from tools.common.latency import LatencyTracker, percentile
+
+
+def test_percentiles_use_nearest_rank():
+    samples = [float(n) for n in range(1, 101)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_tracker_reports_per_stage_window():
+    tracker = LatencyTracker(window=10)
+    for n in range(20):
+        tracker.record("fetch", n / 1000.0)
+    with tracker.time("total"):
+        pass
+    stats = tracker.stats()
+    assert stats["fetch"]["count"] == 20
+    # only the last 10 samples (10..19 ms) are kept
+    assert stats["fetch"]["p50_ms"] == 14.0
+    assert stats["fetch"]["p99_ms"] == 19.0
+    assert stats["total"]["count"] == 1
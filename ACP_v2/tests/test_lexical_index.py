@@ -0,0 +1,93 @@
+import os
+
+from tools.common.lexical_index import (
+    LexicalIndex,
+    is_symbol_query,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+DOCS = {
+    "embed_0": "def get_embedding(self, text):\n    return self.embed_many([text])[0]",
+    "embed_1": "class EmbeddingClient:\n    '''Interface for local LM Studio embeddings.'''",
+    "bus_0": "def publish_event(self, event_type, payload):\n    self._write(apply)",
+    "docs_0": "The message bus stores every event in SQLite before dispatching it.",
+    "error_0": "raise KeyError(\"'data' key missing in embedding response\")",
+}
+
+
+def _index(path=None):
+    index = LexicalIndex(str(path) if path else None)
+    index.add_many((key, text, {"n": n}) for n, (key, text) in enumerate(DOCS.items()))
+    return index
+
+
+def test_tokenizer_indexes_whole_identifiers_and_their_parts():
+    assert tokenize("getEmbedding get_embedding HTTPServer") == [
+        "getembedding", "get", "embedding", "get_embedding", "get", "embedding", "httpserver", "http", "server",
+    ]
+    assert is_symbol_query("get_embedding") and is_symbol_query("RetrievalController.query")
+    assert is_symbol_query("KeyError") and is_symbol_query("publish_event()")
+    assert not is_symbol_query("embedding") and not is_symbol_query("how does the bus work")
+
+
+def test_bm25_ranks_exact_symbols_and_prose():
+    index = _index()
+    assert index.search("get_embedding", k=1)[0][0] == "embed_0"
+    assert index.search("EmbeddingClient", k=1)[0][0] == "embed_1"
+    assert index.search("message bus event", k=1)[0][0] == "docs_0"
+    assert index.search("KeyError missing", k=1)[0][0] == "error_0"
+    assert index.search("nonexistent_symbol") == []
+
+
+def test_save_load_replace_and_cache_invalidation(tmp_path):
+    path = tmp_path / "lexical.bin"
+    index = _index(path)
+    index.save()
+
+    loaded = LexicalIndex.open(str(path))
+    assert len(loaded) == len(DOCS)
+    assert loaded.meta("bus_0") == {"n": 2}
+    assert loaded.search("publish_event", k=1)[0][0] == "bus_0"
+
+    # replacing a document drops its old postings, also in the cached result
+    # symbol queries match the whole identifier, falling back to its parts
+    assert [key for key, _ in loaded.search("publish_event")] == ["bus_0"]
+    loaded.add("bus_0", "def subscribe(self, listener): pass")
+    assert [key for key, _ in loaded.search("publish_event")] == ["docs_0"]
+    loaded.add("new_0", "def publish_event_batch(events): pass")
+    loaded.save()
+
+    reloaded = LexicalIndex.open(str(path))
+    assert len(reloaded) == len(DOCS) + 1
+    assert reloaded.search("subscribe", k=1)[0][0] == "bus_0"
+    assert [key for key, _ in reloaded.search("publish event")] == ["new_0", "docs_0"]
+    assert reloaded.refresh() is False
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+    assert [key for key, _ in fused] == ["a", "c", "b", "d"]
+
+
+def test_concurrent_writers_merge_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "lexical.bin")
+    _index(path).save()
+    ingest = LexicalIndex.open(path)
+    hydrate = LexicalIndex.open(path)
+
+    ingest.add("pdf_0", "chunk from a staged manual")
+    ingest.save()
+    # hydrate loaded before that save; its own changes are replayed onto it
+    hydrate.add("scan_0", "def scan_directory(root): pass")
+    hydrate.remove("docs_0")
+    hydrate.save()
+
+    merged = LexicalIndex.open(path)
+    assert "pdf_0" in merged and "scan_0" in merged and "docs_0" not in merged
+    assert len(merged) == len(DOCS) + 1
+    assert merged.search("scan_directory", k=1)[0][0] == "scan_0"
+    assert not os.path.exists(path + ".lock")
+
+    assert ingest.refresh() is True
+    assert "scan_0" in ingest
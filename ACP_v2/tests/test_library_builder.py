@@ -0,0 +1,129 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from tools.common import library_builder
+from tools.common.library_builder import build_library
+
+
+def fake_pdf(path):
+    text = Path(path).read_text()
+    if text == "corrupt":
+        raise RuntimeError("cannot open document")
+    if "slow" in text:
+        time.sleep(0.05)  # finishes after later documents
+    for page, line in enumerate(text.splitlines(), 1):
+        yield {"content": line, "metadata": {"file_name": Path(path).name, "page_number": page}}
+
+
+def ocr_mode_pdf(path):
+    yield {"content": os.environ.get("OCR_INLINE", "pool"), "metadata": {"file_name": Path(path).name, "page_number": 1}}
+
+
+def _build(library, **options):
+    return build_library(str(library), "out", extract_fn=fake_pdf, executor=ThreadPoolExecutor(3), workers=3, **options)
+
+
+def _chunk_sources(bundle):
+    return [json.loads(line)["metadata"]["source"] for line in open(bundle / "out_chunks.jsonl")]
+
+
+def test_documents_are_written_in_order_and_rerun_skips_them(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "a.pdf").write_text("slow\na2")
+    (library / "b.pdf").write_text("b1\nb2\nb3")
+    (library / "c.pdf").write_text("corrupt")
+    (library / "d.pdf").write_text("d1")
+
+    bundle = _build(library)
+    assert _chunk_sources(bundle) == ["a.pdf"] * 2 + ["b.pdf"] * 3 + ["d.pdf"]
+    md = (bundle / "out.md").read_text()
+    assert md.index("# DOC 1: a.pdf") < md.index("# DOC 2: b.pdf") < md.index("# DOC 4: d.pdf")
+    index = json.loads((bundle / "out_index.json").read_text())
+    assert index["completed"] and index["total_chunks"] == 6
+    assert [d["processed_successfully"] for d in index["documents"]] == [True, True, False, True]
+
+    # fix the broken document and add one: only those two are processed
+    (library / "c.pdf").write_text("c1")
+    (library / "e.pdf").write_text("e1\ne2")
+    assert _build(library) == bundle
+    assert _chunk_sources(bundle) == ["a.pdf"] * 2 + ["b.pdf"] * 3 + ["d.pdf", "c.pdf", "e.pdf", "e.pdf"]
+    index = json.loads((bundle / "out_index.json").read_text())
+    assert index["total_chunks"] == 9
+    assert [d["filename"] for d in index["documents"]] == ["a.pdf", "b.pdf", "d.pdf", "c.pdf", "e.pdf"]
+    assert (bundle / "out.md").read_text().count("# DOC ") == 5
+
+
+def test_resume_drops_output_of_an_interrupted_document(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "a.pdf").write_text("a1")
+    (library / "b.pdf").write_text("b1")
+    bundle = _build(library)
+
+    # a crash while the next document was being appended: torn output and checkpoint line
+    (library / "c.pdf").write_text("c1")
+    with open(bundle / "out_chunks.jsonl", "a") as f:
+        f.write('{"id": "torn')
+    with open(bundle / "out.md", "a") as f:
+        f.write("# DOC 3: c.pdf\n## Meta")
+    with open(bundle / "out_checkpoint.jsonl", "a") as f:
+        f.write('{"order": 3, "file')
+
+    assert _build(library) == bundle
+    assert _chunk_sources(bundle) == ["a.pdf", "b.pdf", "c.pdf"]
+    md = (bundle / "out.md").read_text()
+    assert md.count("# DOC 3: c.pdf") == 1 and "## Meta\n" not in md.replace("## Metadata", "")
+    assert len((bundle / "out_checkpoint.jsonl").read_text().splitlines()) == 3
+
+    fresh = _build(library, fresh=True)
+    assert fresh != bundle and _chunk_sources(fresh) == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_missing_directory_returns_none(tmp_path):
+    assert build_library(str(tmp_path / "missing"), extract_fn=fake_pdf) is None
+
+
+def test_pool_workers_ocr_inline(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "a.pdf").write_text("scan a")
+    (library / "b.pdf").write_text("scan b")
+
+    # Real process pool: each worker must not start an OCR pool of its own
+    bundle = build_library(str(library), "out", extract_fn=ocr_mode_pdf, workers=2)
+    contents = [json.loads(line)["text"] for line in open(bundle / "out_chunks.jsonl")]
+    assert contents == ["1", "1"]
+
+
+def test_failure_while_appending_leaves_consistent_output(tmp_path, monkeypatch):
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "a.pdf").write_text("a1")
+    (library / "b.pdf").write_text("b1\nb2")
+    (library / "c.pdf").write_text("c1")
+
+    append = library_builder._append_document
+
+    def failing_append(md_stream, chunk_stream, order, filename, spool, summary):
+        if filename == "c.pdf":
+            md_stream.write(b"# DOC 3: c.pdf\n" + b"x" * 150)
+            chunk_stream.write(b'{"id": "half')
+            raise OSError("disk full")
+        append(md_stream, chunk_stream, order, filename, spool, summary)
+
+    monkeypatch.setattr(library_builder, "_append_document", failing_append)
+    bundle = _build(library)
+    checkpoint = [json.loads(line) for line in open(bundle / "out_checkpoint.jsonl")]
+    assert checkpoint[-1]["md_size"] == (bundle / "out.md").stat().st_size
+    assert checkpoint[-1]["chunks_size"] == (bundle / "out_chunks.jsonl").stat().st_size
+
+    # Resuming after the failed (last) entry retries c.pdf without padding the bundle
+    monkeypatch.setattr(library_builder, "_append_document", append)
+    assert _build(library) == bundle
+    md = (bundle / "out.md").read_bytes()
+    assert b"\x00" not in md and b"x" * 150 not in md
+    assert _chunk_sources(bundle) == ["a.pdf", "b.pdf", "b.pdf", "c.pdf"]
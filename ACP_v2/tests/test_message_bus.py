@@ -0,0 +1,169 @@
+import gzip
+import json
+import sqlite3
+import time
+
+import pytest
+
+from core.bus.message_bus import MessageBus
+from core.bus.retention import EventRetention, main
+from core.bus.settings_db import SettingsDB
+
+
+@pytest.fixture
+def bus(tmp_path):
+    message_bus = MessageBus(str(tmp_path / "bus.db"))
+    yield message_bus
+    message_bus.close()
+
+
+def test_publish_many_and_ack_many(bus):
+    ids = bus.publish_many(
+        [("scan", "scanner", {"n": 0}), {"event_type": "scan", "source": "scanner", "payload": {"n": 1}}]
+    )
+    assert len(ids) == 2
+    assert bus.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    assert bus.ack_many(ids) == 2
+    assert bus.get_events(unprocessed_only=True) == []
+    payloads = sorted(e["payload_json"] for e in bus.get_events(event_type="scan"))
+    assert payloads == ['{"n": 0}', '{"n": 1}']
+
+
+def test_group_commit_coalesces_and_flushes(tmp_path):
+    db_path = str(tmp_path / "bus.db")
+    bus = MessageBus(db_path, group_commit_ms=50)
+    other = sqlite3.connect(db_path)
+    try:
+        for n in range(10):
+            bus.publish_event("burst", "test", {"n": n})
+        # Still inside the window: another connection cannot see the burst yet
+        assert other.execute("SELECT COUNT(*) FROM bus_events").fetchone()[0] == 0
+
+        deadline = time.time() + 2
+        while time.time() < deadline:
+            if other.execute("SELECT COUNT(*) FROM bus_events").fetchone()[0] == 10:
+                break
+            time.sleep(0.01)
+        assert other.execute("SELECT COUNT(*) FROM bus_events").fetchone()[0] == 10
+
+        bus.set_state("last", 3)
+    finally:
+        bus.close()
+    # close() flushes whatever is still pending
+    assert other.execute("SELECT state_value FROM bus_state WHERE state_key='last'").fetchone()[0] == "3"
+    other.close()
+
+
+def test_settings_defaults_and_batch_write(tmp_path):
+    settings = SettingsDB(str(tmp_path / "settings.db"))
+    try:
+        assert settings.get_setting("ui_port") == 8501
+        settings.set_settings({"ui_port": 9000, "theme": "dark"}, {"theme": "UI theme"})
+        assert settings.get_setting("ui_port") == 9000
+        assert settings.get_all_settings()["theme"] == "dark"
+    finally:
+        settings.close()
+
+
+@pytest.mark.parametrize("group_commit_ms", [0, 50])
+def test_retention_archives_and_keeps_undelivered(tmp_path, group_commit_ms):
+    # With group commit each batch's delete must land before the next batch is selected
+    bus = MessageBus(str(tmp_path / "bus.db"), group_commit_ms=group_commit_ms)
+    try:
+        old = "2020-01-01T00:00:00"
+        bus.publish_many([("audit", "test", {"n": n}) for n in range(5)])
+        bus.publish_many([("job", "test", {"n": n}) for n in range(3)])
+        bus._pool.write(lambda conn: conn.execute("UPDATE bus_events SET timestamp = ?", (old,)))
+        # A subscriber that has not seen the job events yet
+        sid = bus.subscribe("worker", "job", "unused:handler")
+        bus._pool.write(
+            lambda conn: conn.execute(
+                "UPDATE bus_subscription_cursors SET last_rowid = 0 WHERE subscription_id = ?", (sid,)
+            )
+        )
+        bus.publish_event("audit", "test", {"n": "fresh"})
+
+        retention = EventRetention(bus, retention_days=1, archive_dir=str(tmp_path / "archive"), batch_size=2)
+        assert retention.run_once()["pruned"] == 5
+
+        remaining = sorted(r[0] for r in bus.conn.execute("SELECT event_type FROM bus_events"))
+        assert remaining == ["audit", "job", "job", "job"]
+        with gzip.open(tmp_path / "archive" / "bus_events-2020-01-01.jsonl.gz", "rt") as f:
+            archived = [json.loads(line) for line in f]
+        assert [a["payload"]["n"] for a in archived] == [0, 1, 2, 3, 4]
+        assert bus.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+        retention.snapshot(str(tmp_path / "snapshot.db"))
+        assert (tmp_path / "snapshot.db").exists()
+    finally:
+        bus.close()
+
+
+def test_settings_cache_serves_lookups_and_sees_other_writers(tmp_path):
+    db_path = str(tmp_path / "settings.db")
+    reader = SettingsDB(db_path)
+    writer = SettingsDB(db_path)  # stands in for another process
+    try:
+        assert reader.is_feature_enabled("rag") is False
+
+        statements = []
+        reader.conn.set_trace_callback(statements.append)
+        for _ in range(50):
+            reader.is_feature_enabled("rag")
+            reader.get_setting("ui_port")
+        # Cache hits only look at PRAGMA data_version, never at the tables
+        assert set(statements) == {"PRAGMA data_version"}
+
+        writer.set_feature_flag("rag", True)
+        writer.set_setting("ui_port", 9100)
+        assert reader.is_feature_enabled("rag") is True
+        assert reader.get_setting("ui_port") == 9100
+
+        reader.set_setting("prefs", {"theme": "dark"})
+        reader.get_setting("prefs")["theme"] = "mutated"
+        assert reader.get_setting("prefs") == {"theme": "dark"}
+        assert writer.get_setting("prefs") == {"theme": "dark"}
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_convert_keeps_subscription_cursors_valid(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    # A bus_events table from before ``seq``: implicit rowids that VACUUM may renumber
+    legacy = sqlite3.connect(db_path, isolation_level=None)
+    legacy.execute(
+        "CREATE TABLE bus_events (event_id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, event_type TEXT NOT NULL, "
+        "source TEXT NOT NULL, payload_json TEXT NOT NULL, processed INTEGER DEFAULT 0)"
+    )
+    legacy.executemany(
+        "INSERT INTO bus_events (event_id, timestamp, event_type, source, payload_json) VALUES (?, ?, 'job', 't', ?)",
+        [(f"e{n}", f"2024-01-01T00:00:{n:02d}", json.dumps({"n": n})) for n in range(10)],
+    )
+    legacy.execute("DELETE FROM bus_events WHERE event_id IN ('e0', 'e1', 'e2', 'e5')")  # pruned gaps
+    legacy.close()
+
+    bus = MessageBus(db_path)
+    sid = bus.subscribe("worker", "job", "unused:handler")
+    bus._pool.write(
+        lambda conn: conn.execute(
+            "UPDATE bus_subscription_cursors SET last_rowid = 7 WHERE subscription_id = ?", (sid,)
+        )
+    )  # delivered up to e6
+    bus.close()
+
+    main(["convert", db_path])
+
+    bus = MessageBus(db_path)
+    try:
+        assert bus.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        columns = [row[1] for row in bus.conn.execute("PRAGMA table_info(bus_events)")]
+        assert columns[0] == "seq"
+        bus.publish_event("job", "t", {"n": 10})
+        cursor = bus.get_active_subscriptions()[0]["last_rowid"]
+        undelivered = bus.get_events_since(cursor, "job")
+        assert [json.loads(e["payload_json"])["n"] for e in undelivered] == [7, 8, 9, 10]
+        assert [e["rowid"] for e in undelivered] == [e["seq"] for e in undelivered]
+    finally:
+        bus.close()
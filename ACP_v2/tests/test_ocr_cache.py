@@ -0,0 +1,16 @@
+from tools.common.ocr_cache import OCRPageCache, page_hash
+
+
+def test_page_text_persists_by_image_hash(tmp_path):
+    db = str(tmp_path / "ocr.db")
+    scan = b"\x89PNG fake page image"
+    cache = OCRPageCache(db)
+    assert cache.get(page_hash(scan)) is None
+    cache.put(page_hash(scan), "Recovered text")
+    cache.close()
+
+    reopened = OCRPageCache(db)
+    assert reopened.get(page_hash(scan)) == "Recovered text"
+    # Empty OCR output is cached too, so blank scans are not retried
+    reopened.put(page_hash(b"blank"), "")
+    assert reopened.get(page_hash(b"blank")) == ""
@@ -0,0 +1,147 @@
+import pytest
+
+from core.canon.canonical_code_platform_port.orchestrator.rag_index import FileIndexState, IndexPlan, apply_index_plan
+from tools.core.canon_db import init_db
+
+
+def _set_file(conn, file_id, components):
+    """Replace ``file_id``'s components as ingest does (fresh ids on every run)."""
+    conn.execute(
+        "DELETE FROM canon_source_segments WHERE component_id IN "
+        "(SELECT component_id FROM canon_components WHERE file_id = ?)",
+        (file_id,),
+    )
+    conn.execute("DELETE FROM canon_components WHERE file_id = ?", (file_id,))
+    for order, (component_id, qualified_name, source) in enumerate(components):
+        source_hash = f"h:{source}"
+        conn.execute(
+            "INSERT INTO canon_components (component_id, file_id, kind, name, qualified_name, order_index, source_hash) "
+            "VALUES (?, ?, 'function', ?, ?, ?, ?)",
+            (component_id, file_id, qualified_name, qualified_name, order, source_hash),
+        )
+        conn.execute(
+            "INSERT INTO canon_source_segments (component_id, source_text, source_hash) VALUES (?, ?, ?)",
+            (component_id, source, source_hash),
+        )
+    conn.commit()
+
+
+@pytest.fixture
+def canon(tmp_path):
+    conn = init_db(str(tmp_path / "canon.db"))
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def index(tmp_path, canon):
+    state = FileIndexState(str(tmp_path / "canon.db"), str(tmp_path / "state.db"))
+    yield state
+    state.close()
+
+
+def test_analysis_memo_is_served_until_the_index_changes(canon, index):
+    _set_file(canon, "a.py", [("a1", "a.f", "def f(): pass")])
+    _set_file(canon, "b.py", [("b1", "b.g", "def g(): pass")])
+    for file_id in ("a.py", "b.py"):
+        index.commit(index.plan(file_id))
+
+    index.store_analyses({"a1": {"recommendations": ["b.g"]}, "unindexed": {"recommendations": []}})
+    assert index.cached_analyses(["a1", "b1", "unindexed"]) == {"a1": {"recommendations": ["b.g"]}}
+
+    # Re-running an unchanged file keeps the memo
+    index.commit(index.plan("b.py"))
+    assert "a1" in index.cached_analyses(["a1"])
+
+    # Any other file changing can change a1's neighbors and recommendations
+    _set_file(canon, "b.py", [("b2", "b.g", "def g(): return 1")])
+    index.commit(index.plan("b.py"))
+    assert index.cached_analyses(["a1"]) == {}
+
+
+def test_rename_invalidates_and_memo_follows_the_new_id(canon, index):
+    _set_file(canon, "a.py", [("a1", "a.f", "def f(): pass")])
+    index.commit(index.plan("a.py"))
+    index.store_analyses({"a1": {"summary": "f"}})
+
+    # Same content under a fresh component id: the rename still invalidates
+    # (ids in recommendations change), and the memo is keyed by content afterwards
+    _set_file(canon, "a.py", [("a9", "a.f", "def f(): pass")])
+    index.commit(index.plan("a.py"))
+    assert index.cached_analyses(["a9"]) == {}
+    index.store_analyses({"a9": {"summary": "f"}})
+    assert index.cached_analyses(["a9"]) == {"a9": {"summary": "f"}}
+
+
+class KeyedDB:
+    def __init__(self, rename=True):
+        self.calls = []
+        if rename:
+            self.rename_components = lambda pairs: self.calls.append(("rename", pairs))
+
+    def upsert_components(self, components):
+        self.calls.append(("upsert", [c["component_id"] for c in components]))
+
+    def delete_components(self, ids):
+        self.calls.append(("delete", ids))
+
+
+def test_plan_diffs_one_file_and_commit_records_it(canon, index):
+    _set_file(canon, "a.py", [("a1", "a.f", "def f(): pass"), ("a2", "a.g", "def g(): pass")])
+    _set_file(canon, "b.py", [("b1", "b.h", "def h(): pass")])
+
+    plan = index.plan("a.py")
+    assert [c["component_id"] for c in plan.upserts] == ["a1", "a2"]
+    assert plan.upserts[0]["source_text"] == "def f(): pass"
+    assert plan.deletes == [] and plan.renames == []
+    index.commit(plan)
+    assert sorted(index.components_for_file("a.py")) == ["a1", "a2"]
+    assert index.components_for_file("b.py") == []  # other files are untouched
+
+    again = index.plan("a.py")
+    assert again.is_noop and again.unchanged == 2
+
+
+def test_reingest_renames_unchanged_content_and_diffs_the_rest(canon, index):
+    _set_file(
+        canon, "a.py", [("a1", "a.f", "def f(): pass"), ("a2", "a.g", "def g(): pass"), ("a3", "a.k", "def k(): pass")]
+    )
+    index.commit(index.plan("a.py"))
+
+    # Ingest assigns fresh ids: f unchanged, g edited, k removed, n added
+    _set_file(canon, "a.py", [("x1", "a.f", "def f(): pass"), ("x2", "a.g", "def g(): return 1"), ("x4", "a.n", "n = 1")])
+    plan = index.plan("a.py")
+    assert [(old, c["component_id"]) for old, c in plan.renames] == [("a1", "x1")]
+    assert sorted(c["component_id"] for c in plan.upserts) == ["x2", "x4"]
+    assert sorted(plan.deletes) == ["a2", "a3"]
+
+    index.commit(plan)
+    assert sorted(index.components_for_file("a.py")) == ["x1", "x2", "x4"]
+    assert index.plan("a.py").is_noop
+
+
+def test_apply_index_plan_uses_keyed_operations_or_rebuilds(canon, index):
+    _set_file(canon, "a.py", [("a1", "a.f", "def f(): pass"), ("a2", "a.g", "def g(): pass")])
+    index.commit(index.plan("a.py"))
+    _set_file(canon, "a.py", [("x1", "a.f", "def f(): pass"), ("x2", "a.g", "def g(): return 1")])
+    plan = index.plan("a.py")
+    rebuilds = []
+
+    def rebuild_all():
+        rebuilds.append(1)
+        return 42
+
+    db = KeyedDB()
+    assert apply_index_plan(db, plan, rebuild_all) == 1
+    assert db.calls == [("rename", [("a1", "x1")]), ("delete", ["a2"]), ("upsert", ["x2"])]
+
+    # Without rename support the renamed component is re-embedded under its new id
+    db = KeyedDB(rename=False)
+    assert apply_index_plan(db, plan, rebuild_all) == 2
+    assert db.calls == [("delete", ["a2", "a1"]), ("upsert", ["x2", "x1"])]
+    assert rebuilds == []
+
+    # No keyed operations: one full rebuild, and none for a no-op plan
+    assert apply_index_plan(object(), plan, rebuild_all) == 42
+    assert apply_index_plan(object(), IndexPlan("a.py"), rebuild_all) == 0
+    assert rebuilds == [1]
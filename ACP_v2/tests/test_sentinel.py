@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from core.sentinel import SentinelGatekeeper
+
+
+def _package_tree(root: Path, count: int):
+    for n in range(count):
+        pkg = root / f"pkg{n}"
+        pkg.mkdir()
+        (pkg / "__init__.py").write_text("")
+        (pkg / "mod.py").write_text("x = 1\n")
+
+
+def test_hygiene_is_cached_per_directory_until_it_changes(tmp_path):
+    _package_tree(tmp_path, 3)
+    sentinel = SentinelGatekeeper({"sentinel": {"enforce_typing": True, "cache_path": str(tmp_path / "c.json")}})
+
+    files = [tmp_path / f"pkg{n}" / "mod.py" for n in range(3)]
+    assert all(sentinel.audit_batch(files).values())
+    assert all((tmp_path / f"pkg{n}" / "py.typed").exists() for n in range(3))
+    listed = sentinel.metrics["hygiene_dirs_listed"]
+
+    # Unchanged tree: nothing is listed again
+    assert sentinel.audit_file(files[0])
+    assert sentinel.metrics["hygiene_dirs_listed"] == listed
+
+    # A new package changes its parent's mtime and gets its marker
+    new_pkg = tmp_path / "pkg0" / "sub"
+    new_pkg.mkdir()
+    (new_pkg / "__init__.py").write_text("")
+    sentinel.enforce_structural_hygiene(files[0])
+    assert (new_pkg / "py.typed").exists()
+
+    metrics = sentinel.get_metrics()
+    assert metrics["audits"] == 4 and metrics["passed"] == 4
+    assert metrics["audit_seconds_avg"] > 0
+
+
+def test_binary_validation_persists_across_instances(tmp_path):
+    binary = tmp_path / "fake-tool"
+    binary.write_text("#!/bin/sh\nexit 0\n")
+    binary.chmod(0o755)
+    config = {"sentinel": {"binary_paths": {"tool": str(binary)}, "cache_path": str(tmp_path / "c.json")}}
+
+    assert SentinelGatekeeper(config).validate_environment()
+
+    restarted = SentinelGatekeeper(config)
+    binary.chmod(0o644)  # would fail to execute if it were probed again
+    assert restarted.validate_environment()
+
+    # Replacing the binary invalidates the cached result
+    binary.write_text("#!/bin/sh\nexit 0\n# v2\n")
+    assert not SentinelGatekeeper(config).validate_environment()
@@ -0,0 +1,97 @@
+import time
+
+from tools.analysis.staging_watcher import StagingWatcher
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def test_file_dispatched_only_after_writes_settle(tmp_path):
+    ready = []
+    watcher = StagingWatcher(tmp_path, ready.append, settle_seconds=0.3, poll_interval=0.05, use_events=False)
+    watcher.start()
+    try:
+        target = tmp_path / "upload.txt"
+        with open(target, "w") as f:
+            for n in range(5):
+                f.write(f"chunk {n}\n")
+                f.flush()
+                time.sleep(0.1)
+                # Still being written: must not be handed out yet
+                assert ready == []
+        (tmp_path / "partial.crdownload").write_text("ignored")
+
+        assert _wait_for(lambda: ready == [target])
+        time.sleep(0.3)
+        assert ready == [target]  # dispatched once, not on every scan
+    finally:
+        watcher.stop()
+
+
+def test_file_can_arrive_again_after_it_was_moved_out(tmp_path):
+    ready = []
+    watcher = StagingWatcher(tmp_path, ready.append, settle_seconds=0.05, poll_interval=0.05, use_events=False)
+    (tmp_path / "report.md").write_text("v1")
+    watcher.start()
+    try:
+        assert _wait_for(lambda: len(ready) == 1)
+        (tmp_path / "report.md").unlink()
+        assert _wait_for(lambda: watcher.pending_count == 0 and not watcher._dispatched)
+
+        (tmp_path / "report.md").write_text("v2")
+        assert _wait_for(lambda: len(ready) == 2)
+    finally:
+        watcher.stop()
+
+
+def test_failing_intake_is_logged_and_retried(tmp_path):
+    calls = []
+
+    def on_ready(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise OSError("disk hiccup")
+
+    watcher = StagingWatcher(tmp_path, on_ready, settle_seconds=0.05, poll_interval=0.05, use_events=False, retry_seconds=0.1)
+    (tmp_path / "a.txt").write_text("x")
+    (tmp_path / "b.txt").write_text("y")
+    watcher.start()
+    try:
+        # The watcher thread survives the error and the failed file is handed out again
+        assert _wait_for(lambda: len(calls) == 3)
+        assert calls.count(calls[0]) == 2
+        assert watcher._thread.is_alive()
+    finally:
+        watcher.stop()
+
+
+def test_gate_screens_each_burst_once(tmp_path):
+    bursts, ready = [], []
+
+    def gate(paths):
+        bursts.append(sorted(p.name for p in paths))
+        if len(bursts) == 1:
+            raise RuntimeError("environment not ready")
+        return [p for p in paths if p.suffix == ".txt"]
+
+    for name in ("a.txt", "b.txt", "c.bin"):
+        (tmp_path / name).write_text(name)
+    watcher = StagingWatcher(
+        tmp_path, ready.append, settle_seconds=0.05, poll_interval=0.05, use_events=False, retry_seconds=0.1, gate=gate
+    )
+    watcher.start()
+    try:
+        # The failed gate re-arms the whole burst; the retry screens it again as one burst
+        assert _wait_for(lambda: len(ready) == 2)
+        assert bursts == [["a.txt", "b.txt", "c.bin"]] * 2
+        assert sorted(p.name for p in ready) == ["a.txt", "b.txt"]
+        time.sleep(0.2)
+        assert len(bursts) == 2  # the rejected file stays with the gate
+    finally:
+        watcher.stop()
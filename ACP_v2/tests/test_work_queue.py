@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from core.bus.message_bus import MessageBus
+from core.bus.work_queue import WorkQueue
+
+
+@pytest.fixture
+def bus(tmp_path):
+    message_bus = MessageBus(str(tmp_path / "bus.db"))
+    yield message_bus
+    message_bus.close()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def _statuses(bus, group_id):
+    return {job["command_type"]: job["status"] for job in bus.get_command_group(group_id)}
+
+
+def test_graph_runs_in_dependency_order_with_parallel_branches(bus):
+    queue = WorkQueue(bus, target="staging", workers=4, poll_interval=0.05)
+    order = []
+    both_branches = threading.Barrier(2, timeout=2)
+
+    def step(name, branch=False):
+        def run(payload):
+            order.append(name)
+            if branch:
+                both_branches.wait()  # only returns if the branches overlap
+            return {"step": name, "path": payload["path"]}
+        return run
+
+    queue.register("ingest", step("ingest"))
+    queue.register("cut_analysis", step("cut_analysis", branch=True))
+    queue.register("governance", step("governance", branch=True))
+    queue.register("publish", step("publish"))
+    graph = {"ingest": [], "cut_analysis": ["ingest"], "governance": ["ingest"], "publish": ["cut_analysis", "governance"]}
+
+    ids = queue.enqueue_graph(graph, {"path": "a.py"}, key="a.py:abc")
+    # Same key again: idempotent
+    assert queue.enqueue_graph(graph, {"path": "a.py"}, key="a.py:abc") == ids
+
+    with queue:
+        assert _wait_for(lambda: set(_statuses(bus, "a.py:abc").values()) == {"COMPLETED"})
+    assert order[0] == "ingest" and order[-1] == "publish"
+    assert sorted(order[1:3]) == ["cut_analysis", "governance"]
+    assert len(order) == 4
+
+
+def test_retries_with_backoff_then_cancels_dependents(bus):
+    queue = WorkQueue(bus, target="staging", max_attempts=3, retry_backoff=0.05, poll_interval=0.02)
+    attempts = []
+    settled = []
+    queue.add_listener(lambda job, status: settled.append((job["command_type"], status)))
+
+    def flaky(payload):
+        attempts.append(time.monotonic())
+        if len(attempts) < 2:
+            raise RuntimeError("transient")
+
+    queue.register("ingest", flaky)
+    queue.register("broken", lambda payload: 1 / 0)
+    queue.register("governance", lambda payload: None)
+    queue.enqueue_graph({"ingest": [], "broken": ["ingest"], "governance": ["broken"]}, {}, key="k")
+
+    with queue:
+        assert _wait_for(lambda: _statuses(bus, "k").get("broken") == "FAILED")
+    assert _statuses(bus, "k") == {"ingest": "COMPLETED", "broken": "FAILED", "governance": "CANCELLED"}
+    assert len(attempts) == 2 and attempts[1] - attempts[0] >= 0.05
+    assert settled.count(("broken", "PENDING")) == 2 and ("broken", "FAILED") in settled
+
+    # Re-enqueuing failed work resets it
+    queue.enqueue_graph({"ingest": [], "broken": ["ingest"], "governance": ["broken"]}, {}, key="k")
+    assert _statuses(bus, "k")["broken"] == "PENDING"
+
+
+def test_expired_lease_is_resumed_by_another_worker(bus):
+    crashed = WorkQueue(bus, target="staging", lease_seconds=0.2)
+    crashed.register("ingest", lambda payload: None)
+    crashed.enqueue_graph({"ingest": []}, {"path": "b.py"}, key="b")
+    # The first worker leases the job and then dies without finishing it
+    assert len(bus.lease_commands("staging", crashed.owner, ["ingest"], lease_seconds=0.2)) == 1
+    assert bus.lease_commands("staging", "someone-else", ["ingest"]) == []
+
+    done = []
+    restarted = WorkQueue(bus, target="staging", poll_interval=0.05)
+    restarted.register("ingest", lambda payload: done.append(payload["path"]))
+    with restarted:
+        assert _wait_for(lambda: _statuses(bus, "b") == {"ingest": "COMPLETED"})
+    assert done == ["b.py"]
+    # The dead worker can no longer complete it
+    assert bus.complete_command(bus.get_command_group("b")[0]["command_id"], crashed.owner) is False
+
+
+def test_workflow_reporting_failure_is_retried_by_the_queue(bus):
+    from tools.analysis.orchestrator import BackendOrchestrator, WorkflowRegistry
+
+    # Only the registry is needed to build the queue job
+    orchestrator = BackendOrchestrator.__new__(BackendOrchestrator)
+    orchestrator.registry = WorkflowRegistry()
+    results = [False, True]
+    orchestrator.registry.register("ingest", lambda path: results.pop(0))
+    orchestrator.registry.register("governance", lambda path: None)
+
+    queue = WorkQueue(bus, target="staging", max_attempts=3, retry_backoff=0.01, poll_interval=0.02)
+    for name in ("ingest", "governance"):
+        queue.register(name, orchestrator._workflow_job(name))
+    queue.enqueue_graph({"ingest": [], "governance": ["ingest"]}, {"path": "a.py", "file_name": "a.py"}, key="a")
+
+    with queue:
+        assert _wait_for(lambda: _statuses(bus, "a").get("governance") == "COMPLETED")
+    assert results == []
+    assert [job["attempts"] for job in bus.get_command_group("a") if job["command_type"] == "ingest"] == [2]
@@ -0,0 +1,90 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+from tools.core import canon_db
+
+
+@pytest.fixture
+def workflow_verify(monkeypatch):
+    # The port runs with tools/ as its root, where core.canon_db is tools/core/canon_db
+    monkeypatch.setitem(sys.modules, "core.canon_db", canon_db)
+    return importlib.import_module("core.canon.canonical_code_platform_port.workflows.workflow_verify")
+
+
+def _ingest(conn, workflow_verify, files):
+    for file_id, path in files.items():
+        ast_hash = workflow_verify._hash_file(str(path))[0]
+        conn.execute(
+            "INSERT INTO canon_files (file_id, repo_path, ast_hash_sha256) VALUES (?, ?, ?)",
+            (file_id, str(path), ast_hash),
+        )
+    conn.commit()
+
+
+def test_unchanged_files_are_skipped_and_changed_ones_reverified(tmp_path, workflow_verify):
+    conn = canon_db.init_db(str(tmp_path / "canon.db"))
+    files = {f"f{n}": tmp_path / f"mod{n}.py" for n in range(3)}
+    for n, path in enumerate(files.values()):
+        path.write_text(f"def f{n}():\n    return {n}\n")
+    _ingest(conn, workflow_verify, files)
+
+    first = workflow_verify.verify_all(conn, workers=2)
+    assert (first["verified"], first["skipped"], first["errors"]) == (3, 0, 0)
+
+    second = workflow_verify.verify_all(conn, workers=2)
+    assert (second["verified"], second["skipped"]) == (0, 3)
+
+    # Formatting-only edit: new stat, same AST -> verified again, not skipped
+    files["f0"].write_text("def f0():\n\n    return 0\n")
+    # Real change -> drift, and not stamped, so the next sweep checks it again
+    files["f1"].write_text("def f1():\n    return 100\n")
+    os.utime(files["f1"], ns=(1, 1))
+    third = workflow_verify.verify_all(conn, workers=2)
+    assert (third["verified"], third["drift"], third["skipped"]) == (1, 1, 1)
+    fourth = workflow_verify.verify_all(conn, workers=2)
+    assert (fourth["drift"], fourth["skipped"]) == (1, 2)
+
+    forced = workflow_verify.verify_all(conn, workers=2, force=True)
+    assert forced["skipped"] == 0 and forced["verified"] == 2
+    assert conn.execute("SELECT COUNT(*) FROM equivalence_proofs").fetchone()[0] == 3 + 2 + 1 + 3
+    conn.close()
+
+
+def test_syntax_error_in_a_worker_is_reported_not_raised(tmp_path, workflow_verify):
+    conn = canon_db.init_db(str(tmp_path / "canon.db"))
+    good, bad = tmp_path / "good.py", tmp_path / "bad.py"
+    good.write_text("x = 1\n")
+    bad.write_text("y = 2\n")
+    _ingest(conn, workflow_verify, {"good": good, "bad": bad})
+    bad.write_text("def broken(:\n")
+
+    summary = workflow_verify.verify_all(conn, workers=2)
+    assert (summary["verified"], summary["errors"]) == (1, 1)
+    assert summary["failures"][0]["path"] == str(bad)
+    assert summary["failures"][0]["error"].startswith("SyntaxError")
+    # No proof or stamp for the broken file: it is retried on the next sweep
+    assert [r[0] for r in conn.execute("SELECT file_id FROM verify_state")] == ["good"]
+    assert workflow_verify.verify_all(conn, workers=2)["errors"] == 1
+    conn.close()
+
+
+def test_assets_and_extensionless_scripts_are_hashed_like_ingest(tmp_path, workflow_verify):
+    conn = canon_db.init_db(str(tmp_path / "canon.db"))
+    asset, script = tmp_path / "README.md", tmp_path / "deploy"
+    asset.write_text("# Title\n")
+    script.write_text("print('deploy')\n")
+    # workflow_polyglot stores the byte hash as both hashes; ingest stores an AST hash
+    asset_hash = workflow_verify._hash_file(str(asset), raw=True)[0]
+    script_hash = workflow_verify._hash_file(str(script))[0]
+    conn.executemany(
+        "INSERT INTO canon_files (file_id, repo_path, raw_hash_sha256, ast_hash_sha256) VALUES (?, ?, ?, ?)",
+        [("asset", str(asset), asset_hash, asset_hash), ("script", str(script), "raw", script_hash)],
+    )
+    conn.commit()
+
+    summary = workflow_verify.verify_all(conn, workers=2)
+    assert (summary["verified"], summary["drift"], summary["errors"]) == (2, 0, 0)
+    conn.close()
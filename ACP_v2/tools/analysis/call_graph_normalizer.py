@@ -1,6 +1,493 @@
+"""
+Call Graph Normalizer (Phase 3)
+
+Resolves raw ``canon_calls.call_target`` strings into ``call_graph_edges``
+using an in-memory symbol index built from ``canon_components`` and
+``canon_imports``, then keeps fan-in / fan-out and orchestrator scores in
+``call_graph_metrics`` up to date.
+
+All passes are incremental: when a ``file_id`` is given only the components
+of that file are re-resolved, and only the metrics of components whose edges
+actually changed are recomputed. Calling the passes without a ``file_id``
+rebuilds the whole graph (used for first-time backfills).
+"""
+
+import builtins
+import datetime
+import os
+import sqlite3
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from tools.core.canon_db import init_db
+
+# A component is flagged as an orchestrator when it fans out to at least this
+# many distinct internal components and calls out more than it is called.
+ORCHESTRATOR_MIN_FAN_OUT = 3
+ORCHESTRATOR_MIN_SCORE = 1.0
+
+# Keep IN (...) lists well below SQLite's host parameter limit.
+_SQL_CHUNK = 500
+
+_BUILTINS = frozenset(dir(builtins))
+
+
+def _chunks(items, size=_SQL_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _placeholders(n):
+    return ",".join("?" * n)
+
+
+def module_name_for_path(repo_path: str) -> str:
+    """Convert a repo path (``pkg/sub/mod.py``) into a dotted module name."""
+    path = (repo_path or "").replace("\\", "/")
+    if path.endswith(".py"):
+        path = path[:-3]
+    parts = [p for p in path.split("/") if p and p not in (".", "..")]
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    # Drop a Windows drive letter ("C:") if present
+    if parts and parts[0].endswith(":"):
+        parts = parts[1:]
+    return ".".join(parts)
+
+
+class SymbolIndex:
+    """
+    In-memory index of every canonical component, refreshed one file at a time.
+
+    Lookups:
+      - ``by_file[file_id][qualified_name] -> (component_id, kind)``
+      - ``by_fqn[dotted_name] -> {component_id, ...}`` where dotted names are
+        ``<module suffix>.<qualified_name>`` so that both ``pkg.mod.func`` and
+        ``mod.func`` resolve regardless of how the file path was recorded.
+      - ``aliases[file_id][local_name] -> dotted import target``
+    """
+
+    def __init__(self):
+        self.by_file: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self.by_fqn: Dict[str, Set[str]] = defaultdict(set)
+        self.aliases: Dict[str, Dict[str, str]] = {}
+        self.component_file: Dict[str, str] = {}
+        self.component_qname: Dict[str, str] = {}
+        self._file_keys: Dict[str, Set[str]] = {}
+        self.loaded = False
+
+    # ---------------- loading ----------------
+
+    def load(self, conn: sqlite3.Connection):
+        """Populate the index for every file in one pass per table."""
+        self.__init__()
+        files = conn.execute("SELECT file_id, repo_path FROM canon_files").fetchall()
+        rows_by_file = defaultdict(list)
+        for cid, fid, qname, kind in conn.execute(
+            "SELECT component_id, file_id, qualified_name, kind FROM canon_components"
+        ):
+            rows_by_file[fid].append((cid, qname, kind))
+
+        imports_by_file = defaultdict(list)
+        for fid, module, name, alias in conn.execute(
+            """
+            SELECT c.file_id, i.module, i.name, i.alias
+            FROM canon_imports i
+            JOIN canon_components c ON c.component_id = i.component_id
+            """
+        ):
+            imports_by_file[fid].append((module, name, alias))
+
+        for fid, repo_path in files:
+            self._store_file(fid, repo_path, rows_by_file.get(fid, []), imports_by_file.get(fid, []))
+        self.loaded = True
+
+    def refresh_file(self, conn: sqlite3.Connection, file_id: str) -> Set[str]:
+        """Reload a single file's entries. Returns the file's dotted lookup keys."""
+        row = conn.execute("SELECT repo_path FROM canon_files WHERE file_id=?", (file_id,)).fetchone()
+        components = conn.execute(
+            "SELECT component_id, qualified_name, kind FROM canon_components WHERE file_id=?",
+            (file_id,),
+        ).fetchall()
+        imports = conn.execute(
+            """
+            SELECT i.module, i.name, i.alias
+            FROM canon_imports i
+            JOIN canon_components c ON c.component_id = i.component_id
+            WHERE c.file_id=?
+            """,
+            (file_id,),
+        ).fetchall()
+        self.drop_file(file_id)
+        if row is not None:
+            self._store_file(file_id, row[0], components, imports)
+        return set(self._file_keys.get(file_id, ()))
+
+    def drop_file(self, file_id: str):
+        dropped = set()
+        for cid, _kind in self.by_file.pop(file_id, {}).values():
+            self.component_file.pop(cid, None)
+            self.component_qname.pop(cid, None)
+            dropped.add(cid)
+        for key in self._file_keys.pop(file_id, ()):
+            ids = self.by_fqn.get(key)
+            if ids is None:
+                continue
+            ids.difference_update(dropped)
+            if not ids:
+                del self.by_fqn[key]
+        self.aliases.pop(file_id, None)
+
+    def _store_file(self, file_id, repo_path, components, imports):
+        module_parts = module_name_for_path(repo_path).split(".") if repo_path else []
+        prefixes = [".".join(module_parts[i:]) for i in range(len(module_parts))]
+
+        local: Dict[str, Tuple[str, str]] = {}
+        keys: Set[str] = set()
+        for cid, qname, kind in components:
+            if not qname:
+                continue
+            local[qname] = (cid, kind)
+            self.component_file[cid] = file_id
+            self.component_qname[cid] = qname
+            for prefix in prefixes:
+                key = f"{prefix}.{qname}"
+                self.by_fqn[key].add(cid)
+                keys.add(key)
+
+        aliases: Dict[str, str] = {}
+        for module, name, alias in imports:
+            if name is None:
+                # import pkg.mod [as alias]
+                if not module:
+                    continue
+                if alias:
+                    aliases[alias] = module
+                else:
+                    head = module.split(".")[0]
+                    aliases.setdefault(head, head)
+            else:
+                # from pkg.mod import name [as alias]
+                target = f"{module}.{name}" if module else name
+                aliases[alias or name] = target
+
+        self.by_file[file_id] = local
+        self.aliases[file_id] = aliases
+        self._file_keys[file_id] = keys
+
+    # ---------------- lookups ----------------
+
+    def lookup_fqn(self, dotted: str) -> Optional[str]:
+        ids = self.by_fqn.get(dotted)
+        if ids and len(ids) == 1:
+            return next(iter(ids))
+        return None
+
+
+# One index per database file so that consecutive per-file ingests in the
+# same process (workflow_ingest over a directory) never reload it from disk.
+_INDEX_CACHE: Dict[str, SymbolIndex] = {}
+
+
+def _db_key(conn: sqlite3.Connection) -> Optional[str]:
+    for _seq, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return os.path.abspath(path) if path else None
+    return None
+
 
 class CallGraphNormalizer:
-    def normalize_calls(self): print("    [Stub] Normalizing calls...")
-    def compute_metrics(self): pass
-    def detect_orchestrators(self): pass
-    def build_dependency_dag(self): pass
+    """Builds and incrementally maintains ``call_graph_edges`` and metrics."""
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None, file_id: Optional[str] = None,
+                 db_path: str = "canon.db"):
+        self.conn = conn if conn is not None else init_db(db_path)
+        self.file_id = file_id
+        key = _db_key(self.conn)
+        if key is None:
+            self.index = SymbolIndex()
+        else:
+            self.index = _INDEX_CACHE.setdefault(key, SymbolIndex())
+        # Component IDs whose fan-in / fan-out may have changed in this run
+        self._touched: Set[str] = set()
+        self._file_components: List[str] = []
+        # Files whose edges changed in the last resolution pass (for graph caches)
+        self.touched_files: Set[str] = set()
+
+    @staticmethod
+    def reset_index_cache():
+        """Forget cached symbol indexes (e.g. after another process rewrote canon.db)."""
+        _INDEX_CACHE.clear()
+
+    # ---------------- Phase 3a: resolution ----------------
+
+    def normalize_calls(self, file_id: Optional[str] = None) -> int:
+        """Resolve calls for one file (or every file) into call_graph_edges."""
+        file_id = file_id or self.file_id
+        if file_id is None:
+            return self._normalize_all()
+
+        if not self.index.loaded:
+            self.index.load(self.conn)
+            new_keys = set(self.index._file_keys.get(file_id, ()))
+        else:
+            new_keys = self.index.refresh_file(self.conn, file_id)
+
+        new_ids = [cid for cid, _ in self.index.by_file.get(file_id, {}).values()]
+        old_ids = [
+            r[0] for r in self.conn.execute(
+                "SELECT component_id FROM call_graph_metrics WHERE file_id=?", (file_id,)
+            )
+        ]
+        stale_ids = set(old_ids) - set(new_ids)
+
+        # 1. Drop the file's previous outgoing edges, remembering their callees.
+        for chunk in _chunks(set(old_ids) | set(new_ids)):
+            ph = _placeholders(len(chunk))
+            self._touched.update(
+                r[0] for r in self.conn.execute(
+                    f"SELECT DISTINCT callee_id FROM call_graph_edges WHERE caller_id IN ({ph}) AND callee_id IS NOT NULL",
+                    chunk,
+                )
+            )
+            self.conn.execute(f"DELETE FROM call_graph_edges WHERE caller_id IN ({ph})", chunk)
+
+        # 2. Detach inbound edges from other files that point at replaced components.
+        for chunk in _chunks(stale_ids):
+            ph = _placeholders(len(chunk))
+            self._touched.update(
+                r[0] for r in self.conn.execute(
+                    f"SELECT DISTINCT caller_id FROM call_graph_edges WHERE callee_id IN ({ph})", chunk
+                )
+            )
+            self.conn.execute(
+                f"""
+                UPDATE call_graph_edges
+                SET callee_id=NULL, is_internal=0, is_external=1
+                WHERE callee_id IN ({ph})
+                """,
+                chunk,
+            )
+            self.conn.execute(f"DELETE FROM call_graph_metrics WHERE component_id IN ({ph})", chunk)
+
+        # 3. Re-attach pending edges from other files that now resolve here.
+        for chunk in _chunks(new_keys):
+            ph = _placeholders(len(chunk))
+            pending = self.conn.execute(
+                f"SELECT edge_id, caller_id, resolved_name FROM call_graph_edges "
+                f"WHERE is_internal=0 AND resolved_name IN ({ph})",
+                chunk,
+            ).fetchall()
+            updates = []
+            for edge_id, caller_id, resolved_name in pending:
+                callee = self.index.lookup_fqn(resolved_name)
+                if callee is None:
+                    continue
+                updates.append((callee, edge_id))
+                self._touched.update((caller_id, callee))
+            self.conn.executemany(
+                "UPDATE call_graph_edges SET callee_id=?, is_internal=1, is_external=0 WHERE edge_id=?",
+                updates,
+            )
+
+        # 4. Resolve this file's own call sites.
+        count = self._resolve_components(file_id, new_ids)
+        self._file_components = new_ids
+        self._touched.update(new_ids)
+        self.touched_files = {
+            self.index.component_file[cid] for cid in self._touched if cid in self.index.component_file
+        } | {file_id}
+        self.conn.commit()
+        print(f"    [*] Resolved {count} call sites ({len(stale_ids)} replaced components)")
+        return count
+
+    def _normalize_all(self) -> int:
+        self.conn.execute("DELETE FROM call_graph_edges")
+        self.conn.execute("DELETE FROM call_graph_metrics")
+        self.index.load(self.conn)
+        count = 0
+        for file_id, local in self.index.by_file.items():
+            ids = [cid for cid, _ in local.values()]
+            count += self._resolve_components(file_id, ids)
+            self._touched.update(ids)
+        self._file_components = list(self.index.component_file)
+        self.touched_files = set(self.index.by_file)
+        self.conn.commit()
+        print(f"    [*] Resolved {count} call sites across {len(self.index.by_file)} files")
+        return count
+
+    def _resolve_components(self, file_id: str, component_ids: Iterable[str]) -> int:
+        local = self.index.by_file.get(file_id, {})
+        qname_by_id = {cid: qname for qname, (cid, _kind) in local.items()}
+        rows = []
+        for chunk in _chunks(component_ids):
+            ph = _placeholders(len(chunk))
+            for caller_id, target, lineno in self.conn.execute(
+                f"SELECT component_id, call_target, lineno FROM canon_calls WHERE component_id IN ({ph})",
+                chunk,
+            ):
+                callee_id, call_kind, resolved = self._resolve(file_id, qname_by_id.get(caller_id, ""), target)
+                is_internal = 1 if callee_id else 0
+                is_builtin = 1 if call_kind == "builtin" else 0
+                rows.append((
+                    str(uuid.uuid4()), caller_id, callee_id, call_kind,
+                    is_internal, 0 if (is_internal or is_builtin) else 1, is_builtin,
+                    lineno, resolved,
+                ))
+                if callee_id:
+                    self._touched.add(callee_id)
+        self.conn.executemany("INSERT INTO call_graph_edges VALUES (?,?,?,?,?,?,?,?,?)", rows)
+        return len(rows)
+
+    def _resolve(self, file_id: str, caller_qname: str, target: str) -> Tuple[Optional[str], str, str]:
+        """Return (callee_id, call_kind, resolved_name) for one call target."""
+        if not target:
+            return None, "unresolved", target
+        local = self.index.by_file.get(file_id, {})
+
+        # Manually connected edges (api /api/action/connect) store component IDs.
+        if target in self.index.component_file:
+            return target, "direct", target
+
+        head, _, rest = target.partition(".")
+
+        # self.method() / cls.method() -> enclosing class
+        if head in ("self", "cls") and rest and "." not in rest:
+            scope = caller_qname.split(".")
+            while scope:
+                candidate = local.get(".".join(scope))
+                if candidate and candidate[1] == "class":
+                    hit = local.get(f"{'.'.join(scope)}.{rest}")
+                    if hit:
+                        return hit[0], "method", f"{'.'.join(scope)}.{rest}"
+                    break
+                scope.pop()
+            return None, "method", target
+
+        # Lexical lookup in the same file, innermost scope first.
+        scope = caller_qname.split(".")[:-1] if caller_qname else []
+        while True:
+            qname = ".".join(scope + [target])
+            hit = local.get(qname)
+            if hit:
+                return hit[0], "direct" if not rest else "attribute", qname
+            if not scope:
+                break
+            scope.pop()
+
+        # Imported names: expand the alias and look across the repo.
+        aliases = self.index.aliases.get(file_id, {})
+        if head in aliases:
+            dotted = aliases[head] + (f".{rest}" if rest else "")
+            return self.index.lookup_fqn(dotted), "import", dotted
+
+        if not rest and target in _BUILTINS:
+            return None, "builtin", target
+
+        return None, "attribute" if rest else "unresolved", target
+
+    # ---------------- Phase 3b: metrics ----------------
+
+    def compute_metrics(self, file_id: Optional[str] = None) -> int:
+        """Recompute fan-in / fan-out only for components touched by the last resolution pass."""
+        touched = [cid for cid in self._touched if cid in self.index.component_file]
+        now = datetime.datetime.utcnow().isoformat()
+
+        fan_out: Dict[str, Tuple[int, int]] = {}
+        fan_in: Dict[str, int] = {}
+        for chunk in _chunks(touched):
+            ph = _placeholders(len(chunk))
+            for cid, internal, external in self.conn.execute(
+                f"""
+                SELECT caller_id,
+                       COUNT(DISTINCT callee_id),
+                       COUNT(DISTINCT CASE WHEN is_internal=0 THEN resolved_name END)
+                FROM call_graph_edges WHERE caller_id IN ({ph}) GROUP BY caller_id
+                """,
+                chunk,
+            ):
+                fan_out[cid] = (internal, external)
+            for cid, callers in self.conn.execute(
+                f"""
+                SELECT callee_id, COUNT(DISTINCT caller_id)
+                FROM call_graph_edges WHERE callee_id IN ({ph}) GROUP BY callee_id
+                """,
+                chunk,
+            ):
+                fan_in[cid] = callers
+
+        rows = [
+            (
+                cid,
+                self.index.component_file[cid],
+                self.index.component_qname.get(cid),
+                fan_in.get(cid, 0),
+                *fan_out.get(cid, (0, 0)),
+                now,
+            )
+            for cid in touched
+        ]
+
+        self.conn.executemany(
+            """
+            INSERT INTO call_graph_metrics
+                (component_id, file_id, qualified_name, fan_in, fan_out, external_fan_out,
+                 orchestrator_score, is_orchestrator, updated_at)
+            VALUES (?,?,?,?,?,?,0,0,?)
+            ON CONFLICT(component_id) DO UPDATE SET
+                file_id=excluded.file_id,
+                qualified_name=excluded.qualified_name,
+                fan_in=excluded.fan_in,
+                fan_out=excluded.fan_out,
+                external_fan_out=excluded.external_fan_out,
+                updated_at=excluded.updated_at
+            """,
+            rows,
+        )
+        self.conn.commit()
+        return len(rows)
+
+    def detect_orchestrators(self, file_id: Optional[str] = None) -> List[str]:
+        """Score touched components; returns the qualified names flagged as orchestrators."""
+        touched = list(self._touched)
+        flagged = []
+        updates = []
+        for chunk in _chunks(touched):
+            ph = _placeholders(len(chunk))
+            for cid, qname, f_in, f_out in self.conn.execute(
+                f"SELECT component_id, qualified_name, fan_in, fan_out FROM call_graph_metrics "
+                f"WHERE component_id IN ({ph})",
+                chunk,
+            ):
+                score = round(f_out / (f_in + 1), 3)
+                is_orch = int(f_out >= ORCHESTRATOR_MIN_FAN_OUT and score >= ORCHESTRATOR_MIN_SCORE)
+                updates.append((score, is_orch, cid))
+                if is_orch:
+                    flagged.append(qname or cid)
+        self.conn.executemany(
+            "UPDATE call_graph_metrics SET orchestrator_score=?, is_orchestrator=? WHERE component_id=?",
+            updates,
+        )
+        self.conn.commit()
+        if flagged:
+            print(f"    [*] Orchestrators: {', '.join(sorted(flagged))}")
+        return flagged
+
+    def build_dependency_dag(self, file_id: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Return the internal dependency adjacency (caller -> callees) for the
+        components processed in this run; the stored edges are the source of truth.
+        """
+        dag: Dict[str, List[str]] = defaultdict(list)
+        for chunk in _chunks(self._file_components):
+            ph = _placeholders(len(chunk))
+            for caller, callee in self.conn.execute(
+                f"SELECT DISTINCT caller_id, callee_id FROM call_graph_edges "
+                f"WHERE caller_id IN ({ph}) AND is_internal=1",
+                chunk,
+            ):
+                dag[caller].append(callee)
+        self._touched.clear()
+        return dict(dag)
@@ -1,5 +1,275 @@
+"""
+Drift Detector (Phase 6)
+
+Diffs the component set of a file version against the previous version and
+records the result in ``component_history``, ``drift_events`` and
+``file_versions.change_summary``.
+
+The previous component set is read back from ``component_history`` (ingest
+purges the old ``canon_components`` rows before re-extracting), so a diff is
+one pass over two small row sets hash-joined on ``qualified_name`` and
+``source_hash``. Source text is never loaded unless ``detailed=True``, in
+which case both sides are read from ``canon_blobs`` by hash (history rows
+hold a blob reference, so earlier versions remain diffable).
+
+Only the newest ``keep_versions`` versions of a file keep their history
+rows; older rows are pruned after each run and their blob references
+released, so past source text does not stay pinned in ``canon_blobs``.
+"""
+
+import datetime
+import difflib
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from tools.core.blob_store import acquire, get_blobs, release
+
+ADDED = "ADDED"
+REMOVED = "REMOVED"
+MODIFIED = "MODIFIED"
+MOVED = "MOVED"
+UNCHANGED = "UNCHANGED"
+INITIAL = "INITIAL"
+
+SEVERITY = {
+    REMOVED: "HIGH",
+    MODIFIED: "MEDIUM",
+    MOVED: "LOW",
+    ADDED: "LOW",
+}
+
+# Versions per file whose component_history rows (and source blobs) are kept
+HISTORY_VERSIONS = 5
+
 
 class DriftDetector:
-    def __init__(self, conn): self.conn = conn
-    def detect_drift(self, fid, ver): 
-        return {'added': 0, 'removed': 0, 'modified': 0}
+    def __init__(self, conn, keep_versions: int = HISTORY_VERSIONS):
+        self.conn = conn
+        # The latest version is always kept: the next run diffs against it
+        self.keep_versions = max(1, keep_versions)
+
+    # ---------------- snapshots ----------------
+
+    def _previous_version_id(self, version_id: str) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT previous_version_id FROM file_versions WHERE version_id=?", (version_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _previous_snapshot(self, previous_version_id: Optional[str]) -> List[Tuple[str, str, str, str]]:
+        """(component_id, qualified_name, source_hash, committed_hash) live in the previous version."""
+        if not previous_version_id:
+            return []
+        return self.conn.execute(
+            """
+            SELECT component_id, qualified_name, source_hash, committed_hash
+            FROM component_history
+            WHERE file_version_id=? AND drift_type != ?
+            """,
+            (previous_version_id, REMOVED),
+        ).fetchall()
+
+    def _current_snapshot(self, file_id: str) -> List[Tuple[str, str, str, str]]:
+        return self.conn.execute(
+            """
+            SELECT component_id, qualified_name, source_hash, committed_hash
+            FROM canon_components WHERE file_id=?
+            """,
+            (file_id,),
+        ).fetchall()
+
+    # ---------------- diff ----------------
+
+    @staticmethod
+    def diff(previous, current) -> List[Tuple[str, Optional[tuple], Optional[tuple]]]:
+        """
+        Classify components by hash-joining on ``(qualified_name, source_hash)``.
+
+        Returns ``(drift_type, old_row, new_row)`` tuples. A current component
+        whose name is new but whose ``source_hash`` matches a vanished
+        component is reported as MOVED (rename or relocation) rather than as
+        an ADDED/REMOVED pair.
+        """
+        # Module-level blocks share names (e.g. "block_expr"), so buckets are lists.
+        prev_by_key: Dict[Tuple[str, str], List[tuple]] = {}
+        for row in previous:
+            prev_by_key.setdefault((row[1], row[2]), []).append(row)
+
+        results = []
+        unmatched = []
+        for row in current:
+            bucket = prev_by_key.get((row[1], row[2]))
+            if bucket:
+                results.append((UNCHANGED, bucket.pop(0), row))
+            else:
+                unmatched.append(row)
+
+        # Same name, different hash -> MODIFIED
+        prev_by_name: Dict[str, List[tuple]] = {}
+        for bucket in prev_by_key.values():
+            for old in bucket:
+                prev_by_name.setdefault(old[1], []).append(old)
+        unmatched_new = []
+        for row in unmatched:
+            bucket = prev_by_name.get(row[1])
+            if bucket:
+                results.append((MODIFIED, bucket.pop(0), row))
+            else:
+                unmatched_new.append(row)
+
+        # Whatever is left vanished; index it by content hash
+        vanished_by_hash: Dict[str, List[tuple]] = {}
+        for bucket in prev_by_name.values():
+            for old in bucket:
+                vanished_by_hash.setdefault(old[2], []).append(old)
+
+        for row in unmatched_new:
+            candidates = vanished_by_hash.get(row[2])
+            if candidates:
+                results.append((MOVED, candidates.pop(0), row))
+            else:
+                results.append((ADDED, None, row))
+
+        for leftovers in vanished_by_hash.values():
+            results.extend((REMOVED, old, None) for old in leftovers)
+        return results
+
+    # ---------------- main entry ----------------
+
+    def detect_drift(self, fid: str, ver: str, detailed: bool = False) -> Dict[str, int]:
+        """
+        Record drift for file ``fid`` at version ``ver``.
+
+        With ``detailed=True`` a unified diff of each MODIFIED component is
+        stored in the drift event's ``description``; otherwise only hashes are
+        compared and no source text is read.
+        """
+        now = datetime.datetime.utcnow().isoformat()
+        previous_version_id = self._previous_version_id(ver)
+        previous = self._previous_snapshot(previous_version_id)
+        current = self._current_snapshot(fid)
+
+        stats = {"added": 0, "removed": 0, "modified": 0, "moved": 0, "unchanged": 0}
+
+        if not previous:
+            # First version (or legacy history): record a baseline, no drift.
+            self.conn.executemany(
+                "INSERT INTO component_history VALUES (?,?,?,?,?,?,?,?,?)",
+                [
+                    (str(uuid.uuid4()), cid, qname, ver, None, INITIAL, shash, chash, now)
+                    for cid, qname, shash, chash in current
+                ],
+            )
+            acquire(self.conn, [row[2] for row in current])
+            self._write_summary(ver, stats, baseline=len(current))
+            self.prune_history(fid)
+            self.conn.commit()
+            return stats
+
+        changes = self.diff(previous, current)
+        diffs = self._detailed_diffs(changes) if detailed else {}
+
+        history_rows = []
+        event_rows = []
+        for drift_type, old, new in changes:
+            stats[drift_type.lower()] += 1
+            row = new or old
+            history_rows.append((
+                str(uuid.uuid4()),
+                row[0],
+                row[1],
+                ver,
+                old[0] if old else None,
+                drift_type,
+                row[2],
+                row[3],
+                now,
+            ))
+            if drift_type == UNCHANGED:
+                continue
+            event_rows.append((
+                str(uuid.uuid4()),
+                row[0],
+                row[1],
+                drift_type,
+                SEVERITY[drift_type],
+                diffs.get(row[0]) or self._describe(drift_type, old, new),
+                (old[1] if drift_type == MOVED else old[2]) if old else None,
+                (new[1] if drift_type == MOVED else new[2]) if new else None,
+                now,
+            ))
+
+        self.conn.executemany(
+            "INSERT INTO component_history VALUES (?,?,?,?,?,?,?,?,?)", history_rows
+        )
+        # History rows keep their source text alive in canon_blobs
+        acquire(self.conn, [row[6] for row in history_rows])
+        self.conn.executemany(
+            "INSERT INTO drift_events VALUES (?,?,?,?,?,?,?,?,?)", event_rows
+        )
+        self._write_summary(ver, stats)
+        self.prune_history(fid)
+        self.conn.commit()
+        return stats
+
+    def prune_history(self, fid: str) -> int:
+        """
+        Drop history rows of all but the newest ``keep_versions`` versions of
+        ``fid`` and release their blob references. Returns rows deleted.
+
+        ``file_versions`` rows (and their change summaries) are kept.
+        """
+        stale = (
+            "file_version_id IN (SELECT version_id FROM file_versions WHERE file_id=? "
+            "ORDER BY version_number DESC LIMIT -1 OFFSET ?)"
+        )
+        params = (fid, self.keep_versions)
+        hashes = [row[0] for row in self.conn.execute(f"SELECT source_hash FROM component_history WHERE {stale}", params)]
+        if hashes:
+            self.conn.execute(f"DELETE FROM component_history WHERE {stale}", params)
+            release(self.conn, hashes)
+        return len(hashes)
+
+    # ---------------- helpers ----------------
+
+    @staticmethod
+    def _describe(drift_type, old, new) -> str:
+        if drift_type == ADDED:
+            return f"Component {new[1]} added"
+        if drift_type == REMOVED:
+            return f"Component {old[1]} removed"
+        if drift_type == MOVED:
+            return f"Component {old[1]} moved to {new[1]}"
+        return f"Component {new[1]} source changed"
+
+    def _write_summary(self, ver: str, stats: Dict[str, int], baseline: int = 0):
+        if baseline:
+            summary = f"baseline ({baseline} components)"
+        else:
+            parts = [f"{stats[k]} {k}" for k in ("added", "removed", "modified", "moved") if stats[k]]
+            summary = ", ".join(parts) if parts else "no changes"
+        self.conn.execute(
+            "UPDATE file_versions SET change_summary=? WHERE version_id=?", (summary, ver)
+        )
+
+    def _detailed_diffs(self, changes) -> Dict[str, str]:
+        """Unified diffs for MODIFIED components, resolved by source_hash from canon_blobs."""
+        wanted = {}
+        for drift_type, old, new in changes:
+            if drift_type == MODIFIED:
+                wanted[new[0]] = (old[2], new[2])
+        if not wanted:
+            return {}
+
+        texts = get_blobs(self.conn, [h for pair in wanted.values() for h in pair])
+        diffs = {}
+        for new_id, (old_hash, new_hash) in wanted.items():
+            if old_hash not in texts or new_hash not in texts:
+                continue
+            diffs[new_id] = "".join(difflib.unified_diff(
+                texts[old_hash].splitlines(keepends=True),
+                texts[new_hash].splitlines(keepends=True),
+                fromfile="previous",
+                tofile="current",
+            ))
+        return diffs
@@ -1,20 +1,262 @@
-import sys
-import os
+"""
+Bulk-load a bundler scan into the memory used by ``RetrievalController``.
+
+    python -m tools.analysis.hydrate_memory <scan_dir> [--batch-size 256]
+
+``chunks/chunk_*.json`` are streamed one file at a time. Each scanned file's
+text is split as ``CodebaseProcessor`` splits that file type. Chunks are
+written in batches to the truth collection (MongoDB) and the
+``aletheia_index`` Chroma collection, with one ``insert_many`` and one
+``add`` per batch. Documents have the same shape as ingested ones.
+
+  - Vectors: the bundler embeds whole files. A file that hydrates as a
+    single chunk reuses its vector from the scan's ``embeddings_index.json``
+    only when the index records the same embedding model and document
+    prefix as ``settings`` (and the dimension matches the collection); a
+    matching dimension alone does not mean the same vector space. Other
+    chunks are embedded in batches through the shared, cached embedding
+    client.
+  - Idempotent: chunk ids are content hashes (``tools.ingest.dedup``).
+    Chunks already stored are skipped before any embedding, so a re-run
+    writes nothing.
+"""
+
+import argparse
 import json
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from tools.ingest.dedup import content_hash, known_chunks
+from tools.ingest.pipeline import DUPLICATE_KEY_ERROR
+
+logger = logging.getLogger(__name__)
+
+SplitFn = Callable[[str, str], Iterable[Dict[str, Any]]]
+
+
+def entry_text(entry: Dict[str, Any]) -> str:
+    """The text the bundler embeds for a file entry (content, else its structured preview)."""
+    text = entry.get("content") or ""
+    if not text and entry.get("structured_preview"):
+        text = json.dumps(entry["structured_preview"])
+    return text
+
+
+def iter_scan_files(scan_dir: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(chunk file name, file entry) for every scanned file; one chunk file is loaded at a time."""
+    for chunk_file in sorted((scan_dir / "chunks").glob("chunk_*.json")):
+        with open(chunk_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for entry in data.get("data", []):
+            yield chunk_file.name, entry
+
+
+def load_scan_vectors(scan_dir: Path, model: Optional[str], prefix: str) -> Dict[str, List[float]]:
+    """
+    file_id -> vector from the scan's embeddings_index.json.
 
-# Add Ingest Pipeline to path
-sys.path.append(os.path.join(os.getcwd(), "LCD_port", "Ingest_pipeline_V4r"))
-from core.retrieval_controller import RetrievalController
+    Empty when the index is missing or unreadable, or was embedded with
+    another model or document prefix than ``model`` / ``prefix``.
+    """
+    index_path = scan_dir / "embeddings_index.json"
+    if not index_path.exists():
+        return {}
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable {index_path.name}: {e}")
+        return {}
+    if not model or index.get("embedding_model") != model or index.get("document_prefix") != prefix:
+        logger.info(
+            f"Not reusing scan vectors: embedded with {index.get('embedding_model')!r} / "
+            f"prefix {index.get('document_prefix')!r}, memory uses {model!r} / {prefix!r}"
+        )
+        return {}
+    return {
+        entry["file_id"]: entry["embedding"]
+        for entry in index.get("entries", [])
+        if entry.get("file_id") and entry.get("embedding")
+    }
+
+
+@dataclass
+class _Pending:
+    digest: str
+    file_hash: str
+    chunk: Dict[str, Any]
+    vector: Optional[List[float]] = None
+
+
+class ScanHydrator:
+    """Writes a scan's chunks to the truth collection and the vector index in batches."""
+
+    def __init__(
+        self,
+        collection_truth: Any,
+        collection_index: Any,
+        embedder: Any,
+        split_fn: SplitFn,
+        batch_size: int = 256,
+        lexical_index: Any = None,
+        embedding_model: Optional[str] = None,
+        document_prefix: str = "",
+    ):
+        self.collection_truth = collection_truth
+        self.collection_index = collection_index
+        self.embedder = embedder
+        self.split_fn = split_fn
+        self.batch_size = batch_size
+        self.lexical_index = lexical_index
+        # What the embedder produces; scan vectors are reused only when they match
+        self.embedding_model = embedding_model
+        self.document_prefix = document_prefix
+        self.stats = {
+            "files": 0,
+            "chunks_new": 0,
+            "chunks_skipped": 0,
+            "vectors_reused": 0,
+            "vectors_embedded": 0,
+            "chunks_failed": 0,
+        }
+
+    def hydrate(self, scan_dir: Path) -> Dict[str, int]:
+        scan_vectors = load_scan_vectors(scan_dir, self.embedding_model, self.document_prefix)
+        dimension = self._index_dimension() if scan_vectors else None
+        pending: List[_Pending] = []
+        for chunk_file, entry in iter_scan_files(scan_dir):
+            text = entry_text(entry)
+            if not text:
+                continue  # binary / vision-only entries
+            self.stats["files"] += 1
+            path = entry.get("path") or entry.get("file_id", "unknown")
+            file_hash = content_hash(text)
+            chunks = list(self.split_fn(text, path))
+            vector = scan_vectors.get(entry.get("file_id", ""))
+            # The scan vector embeds the whole text: reusable only for a single-chunk file
+            whole = len(chunks) == 1 and chunks[0]["content"] == text
+            if vector and (not whole or (dimension and len(vector) != dimension)):
+                vector = None
+            for chunk in chunks:
+                chunk["metadata"].update(file_id=entry.get("file_id"), scan_chunk=chunk_file, source="bundler_scan")
+                pending.append(_Pending(content_hash(chunk["content"]), file_hash, chunk, vector))
+                if len(pending) >= self.batch_size:
+                    self._flush(pending)
+                    pending = []
+        self._flush(pending)
+        if self.lexical_index is not None:
+            self.lexical_index.save()
+        return dict(self.stats)
+
+    def _index_dimension(self) -> Optional[int]:
+        """Vector size the collection expects: from a stored vector, else from the embedder."""
+        try:
+            stored = self.collection_index.get(limit=1, include=["embeddings"]).get("embeddings")
+            if stored is not None and len(stored):
+                return len(stored[0])
+        except Exception as e:
+            logger.warning(f"Could not read a stored vector: {e}")
+        probe = self.embedder.get_embedding("dimension probe")
+        return len(probe) if probe else None
 
-def hydrate(scan_path_str):
+    def _flush(self, pending: List[_Pending]):
+        if not pending:
+            return
+        try:
+            known = known_chunks(self.collection_truth, self.collection_index, [p.digest for p in pending])
+        except Exception as e:
+            logger.warning(f"Chunk lookup failed, writing the whole batch: {e}")
+            known = set()
+        new: Dict[str, _Pending] = {}
+        for p in pending:
+            if p.digest in known or p.digest in new:
+                self.stats["chunks_skipped"] += 1
+            else:
+                new[p.digest] = p
+        self.stats["vectors_reused"] += sum(1 for p in new.values() if p.vector)
+        to_embed = [p for p in new.values() if not p.vector]
+        if to_embed:
+            vectors = self.embedder.embed_many([p.chunk["content"] for p in to_embed])
+            for p, vector in zip(to_embed, vectors):
+                p.vector = vector
+            self.stats["vectors_embedded"] += sum(1 for vector in vectors if vector)
+        records = [p for p in new.values() if p.vector]
+        self.stats["chunks_failed"] += len(new) - len(records)
+        if not records:
+            return
+
+        mongo_docs = []
+        for p in records:
+            meta = p.chunk["metadata"]
+            mongo_docs.append({
+                "file_hash": p.file_hash,
+                "chunk_index": meta["chunk_index"],
+                "content_hash": p.digest,
+                "content": p.chunk["content"],
+                "metadata": meta,
+                "ingested_at": datetime.utcnow().isoformat(),
+            })
+        duplicate_rows = set()
+        try:
+            self.collection_truth.insert_many(mongo_docs, ordered=False)
+        except Exception as e:
+            # pymongo BulkWriteError
+            write_errors = (getattr(e, "details", None) or {}).get("writeErrors")
+            if write_errors is None:
+                raise
+            duplicate_rows = {err["index"] for err in write_errors if err.get("code") == DUPLICATE_KEY_ERROR}
+            others = len(write_errors) - len(duplicate_rows)
+            if others:
+                logger.warning(f"MongoDB Bulk Write Error ({others} docs): {write_errors[0].get('errmsg', e)}")
+        rows = [row for row in range(len(records)) if row not in duplicate_rows]
+        if rows:
+            try:
+                self.collection_index.add(
+                    ids=[records[row].digest for row in rows],
+                    embeddings=[records[row].vector for row in rows],
+                    metadatas=[
+                        {
+                            "file_hash": mongo_docs[row]["file_hash"],
+                            "chunk_index": mongo_docs[row]["chunk_index"],
+                            "page": 0,
+                            "file_name": mongo_docs[row]["metadata"]["file_name"],
+                        }
+                        for row in rows
+                    ],
+                    documents=[mongo_docs[row]["content"] for row in rows],
+                )
+            except Exception as e:
+                logger.warning(f"ChromaDB Write Warning ({len(rows)} chunks): {e}")
+        if self.lexical_index is not None:
+            self.lexical_index.add_many(
+                (doc["content_hash"], doc["content"], {"file_hash": doc["file_hash"], "chunk_index": doc["chunk_index"]})
+                for doc in mongo_docs
+            )
+        self.stats["chunks_new"] += len(rows)
+        self.stats["chunks_skipped"] += len(duplicate_rows)
+
+
+def hydrate(scan_path_str: str, batch_size: int = 256) -> Dict[str, int]:
     scan_path = Path(scan_path_str).resolve()
     print(f"🌊 Hydrating from: {scan_path.name}")
-    
-    if not scan_path.exists():
-        print(f"❌ Path not found: {scan_path}")
+
+    if not (scan_path / "chunks").is_dir():
+        print(f"❌ No bundler chunks found in: {scan_path}")
         sys.exit(1)
 
+    # Imported here: these read settings and open the stores
+    from config.settings import settings
+    from tools.common.codebase_processor import CodebaseProcessor
+    from tools.common.retrieval_controller import RetrievalController
+
     try:
         mem = RetrievalController()
         print("   - Vector DB Connection: OK")
@@ -22,35 +264,30 @@ def hydrate(scan_path_str):
         print(f"❌ Vector DB Error: {e}")
         sys.exit(1)
 
-    # Load file manifest or tree
-    # Looking for 'tree.json' or 'scan_DIRECTORY_MAP...'
-    tree_file = scan_path / "tree.json"
-    if not tree_file.exists():
-        # Fallback to manifest
-        tree_file = scan_path / "manifest.json"
-    
-    if not tree_file.exists():
-        print("❌ No tree.json or manifest.json found in scan.")
-        return
-
-    with open(tree_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Simplified Ingestion Logic
-    # In a real run, this would iterate 'data' and add_document()
-    # For now, we confirm connection and readiness
-    print(f"   - Identified {len(data)} items for memory.")
-    
-    # Example insertion of metadata
-    mem.add_document(
-        source="system_scan",
-        content=f"System scan completed at {scan_path.name}. Contains {len(data)} files.",
-        metadata={"type": "scan_summary"}
+    hydrator = ScanHydrator(
+        mem.collection_truth,
+        mem.collection_index,
+        mem.embedding_client,
+        CodebaseProcessor().process_text,
+        batch_size=batch_size,
+        lexical_index=mem.lexical,
+        embedding_model=settings.EMBEDDING_MODEL,
+        document_prefix=settings.NOMIC_PREFIX,
+    )
+    stats = hydrator.hydrate(scan_path)
+    print(
+        f"   - {stats['files']} files: {stats['chunks_new']} new chunks, {stats['chunks_skipped']} already stored "
+        f"({stats['vectors_reused']} scan vectors reused, {stats['vectors_embedded']} embedded)"
     )
+    if stats["chunks_failed"]:
+        print(f"   - ⚠ {stats['chunks_failed']} chunks could not be embedded; re-run to retry them.")
     print("✅ Hydration successful.")
+    return stats
+
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python hydrate_memory.py <path_to_scan_folder>")
-        sys.exit(1)
-    hydrate(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Load a bundler scan into the retrieval memory")
+    parser.add_argument("scan_dir", help="Path to the scan folder (contains chunks/)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per database write")
+    args = parser.parse_args()
+    hydrate(args.scan_dir, args.batch_size)
@@ -1,16 +1,24 @@
 
+import hashlib
 import json
+import os
 import time
 import shutil
 import importlib
 import sys
+import threading
 from pathlib import Path
-from typing import Dict, Callable
+from typing import Dict, Callable, List, Optional
 
 # Add root to path for tool imports
 ROOT_DIR = Path(__file__).resolve().parents[2]
 sys.path.append(str(ROOT_DIR))
 
+from core.bus.message_bus import MessageBus
+from core.bus.work_queue import WorkQueue
+from core.sentinel import SentinelGatekeeper
+from tools.analysis.staging_watcher import StagingWatcher
+
 # Utility logging
 def log(msg):
     print(f"[ORCHESTRATOR] {msg}")
@@ -19,20 +27,34 @@ class WorkflowRegistry:
     """Maps string names from config to actual Python functions"""
     def __init__(self):
         self.workflows: Dict[str, Callable] = {}
+        # Optional per-workflow concurrency caps (workers beyond the cap wait)
+        self.limits: Dict[str, threading.BoundedSemaphore] = {}
 
     def register(self, name: str, func: Callable):
         self.workflows[name] = func
 
+    def set_limit(self, name: str, max_concurrent: int):
+        self.limits[name] = threading.BoundedSemaphore(max(1, int(max_concurrent)))
+
     def execute(self, name: str, target_file: Path):
+        """Run a workflow; it fails if it raises or returns False (None counts as success)"""
         if name in self.workflows:
+            limit = self.limits.get(name)
+            if limit is not None:
+                limit.acquire()
             log(f"🚀 Triggering Workflow: {name} on {target_file.name}")
             try:
                 # Dynamic execution wrapper
-                self.workflows[name](str(target_file))
+                if self.workflows[name](str(target_file)) is False:
+                    log(f"❌ Workflow {name} reported failure on {target_file.name}")
+                    return False
                 return True
             except Exception as e:
                 log(f"❌ Workflow {name} Failed: {e}")
                 return False
+            finally:
+                if limit is not None:
+                    limit.release()
         return False
 
 class BackendOrchestrator:
@@ -45,6 +67,7 @@ class BackendOrchestrator:
         # --- REGISTER TOOLS HERE ---
         # We will lazy import these to avoid circular dependency crashes on boot
         self._register_default_workflows()
+        self._setup_workers()
 
     def _load_config(self):
         if not self.config_path.exists():
@@ -64,6 +87,46 @@ class BackendOrchestrator:
             p.mkdir(parents=True, exist_ok=True)
 
 
+    def _setup_workers(self):
+        """Durable job queue on the bus; per-workflow caps come from workflows.concurrency"""
+        workflows = self.config.get("workflows", {})
+        self.max_workers = int(workflows.get("max_concurrent") or os.cpu_count() or 1)
+        for name, cap in workflows.get("concurrency", {}).items():
+            self.registry.set_limit(name, cap)
+
+        self.bus = MessageBus(str(self.root / "orchestrator_bus.db"))
+        self.queue = WorkQueue(
+            self.bus,
+            target="staging",
+            workers=self.max_workers,
+            lease_seconds=workflows.get("lease_seconds", 60),
+            max_attempts=workflows.get("max_attempts", 3),
+            retry_backoff=workflows.get("retry_backoff_seconds", 5),
+        )
+        for name in self.registry.workflows:
+            self.queue.register(name, self._workflow_job(name))
+        self.queue.add_listener(self._on_job_settled)
+
+        self._finalize_lock = threading.Lock()
+        self._metrics = {"processed": 0, "failed": 0}
+        self._watcher: Optional[StagingWatcher] = None
+        self.sentinel = SentinelGatekeeper(self.config)
+
+    def _workflow_job(self, name: str):
+        def run(payload):
+            if not self.registry.execute(name, Path(payload["path"])):
+                raise RuntimeError(f"Workflow {name} failed on {payload['file_name']}")
+        return run
+
+    def workflow_graph(self) -> Dict[str, List[str]]:
+        """auto_run steps -> prerequisites; without workflows.dependencies each step follows the previous one"""
+        workflows = self.config.get("workflows", {})
+        steps = workflows.get("auto_run", [])
+        dependencies = workflows.get("dependencies")
+        if dependencies is None:
+            return {step: steps[i - 1:i] for i, step in enumerate(steps)}
+        return {step: [d for d in dependencies.get(step, []) if d in steps] for step in steps}
+
     def _register_default_workflows(self):
         """Map config strings to actual tool functions"""
         # Real workflow registration
@@ -77,7 +140,8 @@ class BackendOrchestrator:
 
         def ingest_workflow(path):
             log(f"Running real INGEST workflow on {path}")
-            return self._ingest_manager.process_file(Path(path))
+            # The queue retries failures and moves the file once the whole graph settles
+            return self._ingest_manager.process_file(Path(path), move=False)
 
         def cut_analysis_workflow(path):
             log(f"Running real CUT_ANALYSIS workflow on {path}")
@@ -93,46 +157,104 @@ class BackendOrchestrator:
         self.registry.register("cut_analysis", cut_analysis_workflow)
         self.registry.register("governance", governance_workflow)
 
-    def process_file(self, file_path: Path):
-        """Run all auto_run workflows on a file"""
-        workflows = self.config.get("workflows", {}).get("auto_run", [])
-        success = True
-        
-        for wf_name in workflows:
-            if not self.registry.execute(wf_name, file_path):
-                success = False
-                break # Stop chain on failure
-        
-        # Move file based on outcome
+    def audit_burst(self, file_paths: List[Path]) -> List[Path]:
+        """One sentinel pass per intake burst; rejected files go straight to failed/"""
+        if not self.sentinel.validate_environment():
+            # Keep the burst in incoming/ until the binaries are fixed; the watcher retries it
+            raise RuntimeError("Sentinel environment check failed")
+        cleared = []
+        for file_path, passed in self.sentinel.audit_batch(file_paths).items():
+            if passed:
+                cleared.append(file_path)
+                continue
+            log(f"🛑 Sentinel blocked {file_path.name}")
+            with self._finalize_lock:
+                if file_path.exists():
+                    shutil.move(str(file_path), str(self.failed / file_path.name))
+                    self._metrics["failed"] += 1
+        return cleared
+
+    def submit(self, file_path: Path):
+        """Enqueue the workflow graph for a settled file (idempotent per name + content)"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        key = f"{file_path.name}:{digest.hexdigest()}"
+        payload = {"path": str(file_path), "file_name": file_path.name, "content_hash": digest.hexdigest()}
+        self.queue.enqueue_graph(self.workflow_graph(), payload, key)
+        # Already finished before a restart: just move it
+        self._finalize(key, file_path)
+
+    def _on_job_settled(self, job: Dict, status: str):
+        if status in ("COMPLETED", "FAILED"):
+            self._finalize(job["group_id"], Path(json.loads(job["payload_json"])["path"]))
+
+    def _finalize(self, group_id: str, file_path: Path):
+        """Move the file once every job of its graph has settled"""
+        statuses = [job["status"] for job in self.bus.get_command_group(group_id)]
+        if not statuses or any(s in ("PENDING", "RUNNING") for s in statuses):
+            return
+        success = all(s == "COMPLETED" for s in statuses)
         dest = self.processed if success else self.failed
-        shutil.move(str(file_path), str(dest / file_path.name))
+        with self._finalize_lock:
+            if not file_path.exists():
+                return
+            shutil.move(str(file_path), str(dest / file_path.name))
+            self._metrics["processed" if success else "failed"] += 1
         log(f"Moved {file_path.name} to {dest.name}")
 
 
     def _write_heartbeat(self, status="Online"):
         """Write a heartbeat status file for API/status checks"""
         heartbeat_path = self.root / "orchestrator.status.json"
+        with self._finalize_lock:
+            metrics = dict(self._metrics)
+        jobs = self.bus.count_commands("staging")
         data = {
             "status": status,
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "watcher": self._watcher.mode if self._watcher else None,
+            "workers": self.max_workers,
+            "queue_depth": jobs.get("PENDING", 0),
+            "settling": self._watcher.pending_count if self._watcher else 0,
+            "active": jobs.get("RUNNING", 0),
+            "processed": metrics["processed"],
+            "failed": metrics["failed"],
+            "sentinel": self.sentinel.get_metrics(),
         }
-        with open(heartbeat_path, "w") as f:
+        # Write-then-rename so readers never see a half-written file
+        tmp_path = heartbeat_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
             json.dump(data, f)
+        os.replace(tmp_path, heartbeat_path)
 
     def run_loop(self):
-        interval = self.config.get("staging", {}).get("scan_interval_seconds", 5)
-        log(f"👀 Watching {self.incoming} (Interval: {interval}s)")
+        staging = self.config.get("staging", {})
+        interval = staging.get("scan_interval_seconds", 5)
+        # Resumes jobs left RUNNING by a previous process once their leases expire
+        self.queue.start()
+        self._watcher = StagingWatcher(
+            self.incoming,
+            on_ready=self.submit,
+            gate=self.audit_burst,
+            settle_seconds=staging.get("settle_seconds", 2),
+            # Only used without watchdog
+            poll_interval=interval,
+        )
+        self._watcher.start()
+        log(f"👀 Watching {self.incoming} ({self._watcher.mode}, {self.max_workers} workers)")
         try:
             while True:
-                # Scan for files
-                for item in self.incoming.iterdir():
-                    if item.is_file():
-                        self.process_file(item)
                 self._write_heartbeat(status="Online")
                 time.sleep(interval)
         except KeyboardInterrupt:
-            self._write_heartbeat(status="Offline")
             log("🛑 Orchestrator shutting down.")
+            self._watcher.stop()
+            self.queue.stop()
+            self._ingest_manager.flush_lexical_index()
+            self._write_heartbeat(status="Offline")
+            self.bus.close()
 
 if __name__ == "__main__":
     orchestrator = BackendOrchestrator()
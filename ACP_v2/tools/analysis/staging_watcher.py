@@ -0,0 +1,228 @@
+"""
+Staging Watcher
+
+Event-driven intake for the staging folder:
+
+  - With ``watchdog`` installed, filesystem events mark files as candidates;
+    otherwise the directory is rescanned every ``poll_interval`` seconds.
+  - A candidate is handed to ``on_ready`` only once its size and mtime have
+    not changed for ``settle_seconds``, so half-copied files are never
+    picked up.
+  - Each file is dispatched once; it becomes eligible again only after it
+    has left the directory (the orchestrator moves it to processed/failed).
+  - An optional ``gate`` sees every burst of files that settled together
+    and returns the ones cleared for ``on_ready``; rejected files are left
+    to the gate (the orchestrator moves them to failed).
+  - If ``on_ready`` (or the gate) raises, the error is logged and the
+    file(s) re-armed: they are retried after ``retry_seconds`` and the
+    watcher keeps running.
+
+Usage:
+    watcher = StagingWatcher(Path("staging/incoming"), on_ready=submit, settle_seconds=2)
+    watcher.start()
+    ...
+    watcher.stop()
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # polling fallback
+    FileSystemEventHandler = object  # type: ignore
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+# Partial downloads / editor temp files
+IGNORED_SUFFIXES = {".tmp", ".part", ".partial", ".crdownload", ".swp"}
+
+
+def _is_candidate(path: Path) -> bool:
+    return not path.name.startswith(".") and path.suffix.lower() not in IGNORED_SUFFIXES
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "StagingWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.touch(Path(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.touch(Path(event.src_path))
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.forget(Path(event.src_path))
+            self.watcher.touch(Path(event.dest_path))
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.watcher.forget(Path(event.src_path))
+
+
+class StagingWatcher:
+    """Debounced file intake for one directory (non-recursive)."""
+
+    def __init__(
+        self,
+        directory: Path,
+        on_ready: Callable[[Path], None],
+        settle_seconds: float = 2.0,
+        poll_interval: float = 1.0,
+        use_events: bool = True,
+        retry_seconds: float = 30.0,
+        gate: Optional[Callable[[List[Path]], Iterable[Path]]] = None,
+    ):
+        self.directory = Path(directory)
+        self.on_ready = on_ready
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_events = use_events and Observer is not None
+        self.retry_seconds = retry_seconds
+        self.gate = gate
+
+        # path -> ((size, mtime_ns), monotonic time of last change)
+        self._pending: Dict[Path, Tuple[Tuple[int, int], float]] = {}
+        self._dispatched: Set[Path] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+
+    @property
+    def mode(self) -> str:
+        return "watchdog" if self.use_events else "polling"
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    # ---------------- intake ----------------
+
+    def touch(self, path: Path):
+        """Mark ``path`` as changed; it is dispatched once it settles."""
+        if path.parent != self.directory or not _is_candidate(path):
+            return
+        with self._lock:
+            if path in self._dispatched:
+                return
+            # Signature is filled in by the next settle pass
+            self._pending[path] = ((-1, -1), time.monotonic())
+
+    def forget(self, path: Path):
+        with self._lock:
+            self._pending.pop(path, None)
+            self._dispatched.discard(path)
+
+    def scan(self):
+        """Pick up files already present (and, when polling, new ones)."""
+        present = set()
+        for item in self.directory.iterdir():
+            if item.is_file():
+                present.add(item)
+                with self._lock:
+                    known = item in self._pending or item in self._dispatched
+                if not known:
+                    self.touch(item)
+        with self._lock:
+            # Dispatched files that were moved away may arrive again
+            self._dispatched &= present
+
+    def check_settled(self):
+        """Dispatch every pending file whose size and mtime stopped changing."""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, (signature, changed_at) in list(self._pending.items()):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    del self._pending[path]
+                    continue
+                current = (st.st_size, st.st_mtime_ns)
+                if current != signature:
+                    self._pending[path] = (current, now)
+                elif now - changed_at >= self.settle_seconds:
+                    del self._pending[path]
+                    self._dispatched.add(path)
+                    ready.append(path)
+        if ready and self.gate is not None:
+            ready = self._screen(ready)
+        for path in ready:
+            self._dispatch(path)
+
+    def _screen(self, burst: List[Path]) -> List[Path]:
+        try:
+            cleared = set(self.gate(burst))
+        except Exception:
+            logger.exception(f"Intake gate failed for {len(burst)} file(s); retrying in {self.retry_seconds:g}s")
+            for path in burst:
+                self._rearm(path)
+            return []
+        return [path for path in burst if path in cleared]
+
+    def _dispatch(self, path: Path):
+        try:
+            self.on_ready(path)
+        except Exception:
+            logger.exception(f"Intake failed for {path.name}; retrying in {self.retry_seconds:g}s")
+            self._rearm(path)
+
+    def _rearm(self, path: Path):
+        with self._lock:
+            self._dispatched.discard(path)
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                return
+            # Settles again only after the retry delay has passed
+            self._pending[path] = ((st.st_size, st.st_mtime_ns), time.monotonic() + self.retry_seconds)
+
+    # ---------------- lifecycle ----------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        if self.use_events:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), str(self.directory), recursive=False)
+            self._observer.start()
+        self.scan()
+
+        # Events only need a short settle tick; polling also rescans each tick
+        tick = min(self.poll_interval, max(self.settle_seconds / 4, 0.05)) if self.use_events else self.poll_interval
+
+        def loop():
+            while not self._stop.wait(tick):
+                try:
+                    if not self.use_events:
+                        self.scan()
+                    self.check_settled()
+                except Exception:
+                    # e.g. the directory vanished or a stat was denied; try again next tick
+                    logger.exception("Staging watcher tick failed")
+
+        self._thread = threading.Thread(target=loop, name="staging-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
@@ -71,6 +71,7 @@ import logging
 
 # Import security utilities
 from tools.common.security_utils import SecurityValidator
+from tools.common.lexical_index import LexicalIndex, is_symbol_query, reciprocal_rank_fusion
 try:
     from tools.analysis.bundler_constants import (
         DEFAULT_IGNORE_DIRS,
@@ -291,6 +292,7 @@ class EnhancedDeepScanner:
                 chunk_01.json      # Grouped content for processing
                 chunk_02.json
                 ...
+            lexical_index.bin      # BM25 index over file contents
     
     Security:
         - Validates all paths to prevent directory traversal
@@ -312,6 +314,8 @@ class EnhancedDeepScanner:
         self.current_chunk_files: List[Dict[str, Any]] = []
         self.chunk_count: int = 0
         self.total_processed_size: float = 0.0
+        # BM25 over file contents for exact-term / symbol retrieval
+        self.lexical_index = LexicalIndex(os.path.join(scan_dir, "lexical_index.bin"))
         
         # PHASE 3: Global labels system for cross-file tracking
         self.labels: Dict[str, Any] = {
@@ -525,6 +529,14 @@ class EnhancedDeepScanner:
                 current_chunk_size += file_size_mb
                 self.total_processed_size += file_size_mb
 
+                lexical_text = raw_content or (json.dumps(structured_preview) if structured_preview else "")
+                if lexical_text:
+                    self.lexical_index.add(file_id, lexical_text, {
+                        "path": relative_path,
+                        "chunk": f"chunk_{self.chunk_count:02d}.json",
+                        "preview": lexical_text[:500]
+                    })
+
                 # Progress Update for the API/UI
                 if progress_callback:
                     progress_callback(idx + 1, total_files, "indexing")
@@ -537,6 +549,7 @@ class EnhancedDeepScanner:
         # Save the final chunk
         if self.current_chunk_files:
             self._save_chunk(self.current_chunk_files, self.chunk_count)
+        self.lexical_index.save()
 
         # 3. Generate the UI-ready Tree
         self._generate_tree_json(base_path, files_to_scan)
@@ -1075,6 +1088,8 @@ class LMStudioIntegration:
         self.current_persona = "default"
         self.embedding_model = EMBEDDING_MODEL_NAME
         self.similarity_threshold = SIMILARITY_THRESHOLD
+        # scan dir lexical_index.bin path -> open index, kept across queries
+        self._lexical_indexes: Dict[str, LexicalIndex] = {}
         
     def set_config(self, system_prompt=None, temperature=None, max_tokens=None, persona=None):
         """Configure LM Studio parameters"""
@@ -1101,6 +1116,15 @@ class LMStudioIntegration:
         base_url = self.url.replace('/v1/chat/completions', '')
         return EmbeddingsClient(base_url=base_url, model=getattr(self, "embedding_model", EMBEDDING_MODEL_NAME))
 
+    def _lexical_index(self, path: str) -> LexicalIndex:
+        """Open ``path`` once; later queries reuse its decoded postings and result cache (reloaded if rewritten)."""
+        index = self._lexical_indexes.get(path)
+        if index is None:
+            index = self._lexical_indexes[path] = LexicalIndex.open(path)
+        else:
+            index.refresh()
+        return index
+
     def build_embeddings_index(self, chunked_files: List[str]) -> Optional[str]:
         if not chunked_files:
             return None
@@ -1134,27 +1158,47 @@ class LMStudioIntegration:
                     })
 
         if index_entries:
-            EmbeddingsClient.save_index(index_path, {"entries": index_entries})
+            # Lets consumers (tools.analysis.hydrate_memory) tell whether the vectors fit their model
+            EmbeddingsClient.save_index(
+                index_path, {"embedding_model": client.model, "document_prefix": "", "entries": index_entries}
+            )
             return index_path
         return None
 
     def retrieve_context(self, query: str, chunked_files: List[str], top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Top files for ``query``: cosine similarity over the embeddings index,
+        fused with the scan's BM25 index (lexical_index.bin) by reciprocal
+        rank fusion. Code-symbol queries found in the BM25 index are answered
+        from it alone, without an embedding call.
+        """
         if not query:
             return []
 
         scan_dir = os.path.dirname(os.path.dirname(chunked_files[0])) if chunked_files else None
+        lexical_path = os.path.join(scan_dir, "lexical_index.bin") if scan_dir else None
+        lexical_hits: List[Dict[str, Any]] = []
+        if lexical_path and os.path.exists(lexical_path):
+            lexical = self._lexical_index(lexical_path)
+            lexical_hits = [
+                {"score": score, "file_id": file_id, **(lexical.meta(file_id) or {})}
+                for file_id, score in lexical.search(query, top_k)
+            ]
+            if lexical_hits and is_symbol_query(query):
+                return lexical_hits
+
         index_path = os.path.join(scan_dir, "embeddings_index.json") if scan_dir else None
         index = EmbeddingsClient.load_index(index_path) if index_path else None
         if index is None:
             index_path = self.build_embeddings_index(chunked_files)
             index = EmbeddingsClient.load_index(index_path) if index_path else None
         if not index or "entries" not in index:
-            return []
+            return lexical_hits
 
         client = self._get_embeddings_client()
         query_embedding = client.get_embedding(query)
         if not query_embedding:
-            return []
+            return lexical_hits
 
         threshold = getattr(self, "similarity_threshold", SIMILARITY_THRESHOLD)
         scored = []
@@ -1164,7 +1208,13 @@ class LMStudioIntegration:
                 scored.append({"score": score, **{k: v for k, v in entry.items() if k != "embedding"}})
 
         scored.sort(key=lambda x: x.get("score", 0), reverse=True)
-        return scored[:top_k]
+        if not lexical_hits:
+            return scored[:top_k]
+
+        entries = {hit["file_id"]: hit for hit in lexical_hits}
+        entries.update({entry["file_id"]: entry for entry in scored})
+        fused = reciprocal_rank_fusion([[e["file_id"] for e in scored], [h["file_id"] for h in lexical_hits]])
+        return [{**entries[file_id], "score": score} for file_id, score in fused[:top_k]]
     
     def _lmstudio_chat(self, messages: List[Dict[str, str]]) -> str:
         """Perform chat inference using LM Studio and return response content."""
@@ -1,61 +1,80 @@
 import logging
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List
 from config.settings import settings
+from core.chunking.chunker import CODE, LINE, Chunk, Chunker, python_anchors, resolve_tokenizer
 
 # Module-level annotation
 documents: List[Any] = []
 
 logger = logging.getLogger(__name__)
 
+PROSE_SUFFIXES = {".md", ".txt", ".rst"}
+# larger Python files are streamed without AST boundaries
+AST_MAX_BYTES = 4 * 1024 * 1024
+
 class CodebaseProcessor:
     """
     Handles processing of text-based files (Python, JSON, Markdown, etc.).
     """
     def __init__(self):
         self.settings = settings
+        tokenizer = resolve_tokenizer(settings.CHUNK_TOKENIZER)
+        self.prose_chunker = Chunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, tokenizer=tokenizer)
+        self.code_chunker = Chunker(
+            settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, tokenizer=tokenizer, boundaries=CODE, overlap_snap=LINE
+        )
 
     from config.settings import settings
-    def process_file(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Reads text/code files directly and chunks them."""
-        documents: List[Any] = []
+    def process_file(self, file_path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Reads text/code files and yields boundary-aligned chunks.
+
+        Python sources are split at module/class-level statements; other
+        files at paragraph, line or sentence breaks. Files are read
+        incrementally (Python sources up to AST_MAX_BYTES are parsed whole),
+        so memory stays bounded regardless of file size. Read errors are
+        raised after the chunks already yielded (the file is incomplete).
+        """
         try:
+            chunker = self.prose_chunker if file_path.suffix.lower() in PROSE_SUFFIXES else self.code_chunker
             # Use errors='ignore' to prevent crashing on non-UTF-8 binary artifacts
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                raw_text = f.read()
-            
-            if raw_text.strip():
-                return self._chunk_text(raw_text, str(file_path), file_path.name)
+                if file_path.suffix.lower() == ".py" and file_path.stat().st_size <= AST_MAX_BYTES:
+                    text = f.read()
+                    chunks = chunker.split(text, source=str(file_path), anchors=python_anchors(text))
+                else:
+                    chunks = chunker.split_stream(f, source=str(file_path))
+                yield from self._to_documents(chunks, str(file_path), file_path.name)
         except Exception as e:
             logger.error(f"Error processing text file {file_path.name}: {e}")
-        return documents
+            raise
+
+    def process_text(self, text: str, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Chunks of already-loaded text, split the way ``process_file`` splits a file at ``file_path``."""
+        suffix = Path(file_path).suffix.lower()
+        chunker = self.prose_chunker if suffix in PROSE_SUFFIXES else self.code_chunker
+        anchors = python_anchors(text) if suffix == ".py" and len(text) <= AST_MAX_BYTES else ()
+        chunks = chunker.split(text, source=file_path, anchors=anchors)
+        yield from self._to_documents(chunks, file_path, Path(file_path).name)
 
     def _chunk_text(self, text: str, file_path: str, file_name: str) -> List[Dict[str, Any]]:
-        """Splits text into sliding window chunks."""
-        chunk_size = self.settings.CHUNK_SIZE
-        overlap = self.settings.CHUNK_OVERLAP
-        chunks = []
-        
-        text_len = len(text)
-        start = 0
-        chunk_idx = 0
-        
-        while start < text_len:
-            end = min(start + chunk_size, text_len)
-            chunk_content = text[start:end]
-            
-            chunks.append({
-                "content": chunk_content,
+        """Splits text into boundary-aligned chunks."""
+        return list(self._to_documents(self.prose_chunker.split(text, source=file_path), file_path, file_name))
+
+    @staticmethod
+    def _to_documents(chunks: Iterable[Chunk], file_path: str, file_name: str) -> Iterator[Dict[str, Any]]:
+        for chunk in chunks:
+            yield {
+                "content": chunk.text,
                 "metadata": {
                     "file_path": file_path,
                     "file_name": file_name,
                     "page_number": 0, # Not applicable for flat text files
-                    "chunk_index": chunk_idx,
+                    "chunk_index": chunk.index,
+                    "chunk_id": chunk.chunk_id,
+                    "char_start": chunk.start,
+                    "char_end": chunk.end,
                     "file_type": "codebase"
                 }
-            })
-            
-            start += (chunk_size - overlap)
-            chunk_idx += 1
-            
-        return chunks
\ No newline at end of file
+            }
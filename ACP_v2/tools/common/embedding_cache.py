@@ -0,0 +1,103 @@
+"""
+Persistent embedding cache.
+
+Vectors are stored in SQLite keyed by (model, prefix, sha256(text)), as
+little-endian float16 blobs (half the size of float32; cosine similarity
+is unaffected in practice). Re-ingesting unchanged documents is served
+entirely from here, with no model calls.
+"""
+
+import hashlib
+import sqlite3
+import struct
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    return struct.pack(f"<{len(vector)}e", *vector)
+
+
+def unpack_vector(blob: bytes, dim: int) -> List[float]:
+    return list(struct.unpack(f"<{dim}e", blob))
+
+
+class EmbeddingCache:
+    """SQLite-backed vector cache for one (model, prefix) pair; safe to share across threads."""
+
+    def __init__(self, db_path: str, model: str, prefix: str = ""):
+        self.db_path = db_path
+        self.model = model
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model TEXT NOT NULL,
+                prefix TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (model, prefix, text_hash)
+            ) WITHOUT ROWID
+        """
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Cached vectors for the given text hashes (missing ones are absent)."""
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"""
+                    SELECT text_hash, dim, vector FROM embedding_cache
+                    WHERE model = ? AND prefix = ? AND text_hash IN ({placeholders})
+                """,
+                    (self.model, self.prefix, *chunk),
+                )
+                for h, dim, blob in rows:
+                    found[h] = unpack_vector(blob, dim)
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def get(self, text: str) -> Optional[List[float]]:
+        h = text_hash(text)
+        return self.get_many([h]).get(h)
+
+    def put_many(self, vectors: Dict[str, List[float]]):
+        now = datetime.utcnow().isoformat()
+        rows = [
+            (self.model, self.prefix, h, len(v), pack_vector(v), now) for h, v in vectors.items() if v
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def clear(self):
+        """Drop every cached vector for this model/prefix."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM embedding_cache WHERE model = ? AND prefix = ?", (self.model, self.prefix)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,27 +1,46 @@
 import requests
 import logging
+import threading
 import time
-from typing import List, Optional
-from functools import lru_cache
+from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
 from config.settings import settings
+from tools.common.embedding_cache import EmbeddingCache, text_hash
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingClient:
     """
     Interface for local LM Studio embeddings with caching and resource awareness.
+
+    ``embed_many`` sends texts to /v1/embeddings in batches over one pooled
+    HTTP session. Vectors are cached on disk by (model, prefix, sha256(text)),
+    so unchanged documents never reach the model again.
     """
     def __init__(self):
         # Use OpenAI-compatible endpoint for LM Studio
         # Ensure base_url is just host:port, endpoint is /v1/embeddings
         self.base_url = f"{settings.LM_STUDIO_BASE_URL}/v1/embeddings"
         self.last_activity = time.time()
+        self.batch_size = settings.EMBEDDING_BATCH_SIZE
+
+        # Keep-alive connections shared by every (concurrent) request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.EMBEDDING_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.cache: Optional[EmbeddingCache] = None
+        if settings.EMBEDDING_CACHE_PATH:
+            self.cache = EmbeddingCache(
+                str(settings.EMBEDDING_CACHE_PATH), settings.EMBEDDING_MODEL, settings.NOMIC_PREFIX
+            )
 
         # Automatically prime LM Studio model for embeddings
         try:
             load_url = f"{settings.LM_STUDIO_BASE_URL}/api/v1/models/load"
             payload = {"model": settings.EMBEDDING_MODEL}
-            resp = requests.post(load_url, json=payload, timeout=30)
+            resp = self.session.post(load_url, json=payload, timeout=30)
             if resp.status_code == 200:
                 logger.info(f"LM Studio model primed: {settings.EMBEDDING_MODEL}")
             else:
@@ -38,45 +57,92 @@ class EmbeddingClient:
         # In a JIT strategy, we could ping a custom management script here
         pass
 
-    @lru_cache(maxsize=2048) # Increased cache size for better performance
     def get_embedding(self, text: str) -> Optional[List[float]]:
         """
-        Generates a vector with LRU caching.
+        Generates a vector (served from the persistent cache when possible).
         Note: Nomic models require the 'search_document: ' prefix.
         """
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Vectors for ``texts`` in order (None where the API kept failing).
+        Cached and duplicate texts cost no model calls.
+        """
+        hashes = [text_hash(t) for t in texts]
+        vectors: Dict[str, Optional[List[float]]] = {}
+        if self.cache is not None:
+            vectors.update(self.cache.get_many(hashes))
+
+        missing: Dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in vectors:
+                missing.setdefault(h, text)
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            fresh = self._request([text for _, text in batch])
+            computed = {h: v for (h, _), v in zip(batch, fresh)}
+            vectors.update(computed)
+            if self.cache is not None:
+                self.cache.put_many({h: v for h, v in computed.items() if v})
+
+        return [vectors.get(h) for h in hashes]
+
+    def _request(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """One /v1/embeddings call for a batch, with short exponential-backoff retries."""
         self._check_resource_status()
-        
-        prefixed_text = f"{settings.NOMIC_PREFIX}{text}"
-        payload = {"input": prefixed_text, "model": settings.EMBEDDING_MODEL}
-        
+
+        payload = {"input": [f"{settings.NOMIC_PREFIX}{t}" for t in texts], "model": settings.EMBEDDING_MODEL}
+
         # Implement internal retry logic
         for attempt in range(3):
+            response = None
             try:
-                response = requests.post(self.base_url, json=payload, timeout=30)
+                response = self.session.post(self.base_url, json=payload, timeout=30)
                 response.raise_for_status()
                 resp_json = response.json()
                 if "data" not in resp_json:
                     logger.error(f"Embedding API response missing 'data' key: {resp_json}")
                     raise KeyError("'data' key missing in embedding response")
-                if not isinstance(resp_json["data"], list) or not resp_json["data"]:
-                    logger.error(f"Embedding API response 'data' is not a non-empty list: {resp_json}")
-                    raise ValueError("'data' key is not a non-empty list")
-                embedding = resp_json["data"][0].get("embedding")
-                if not isinstance(embedding, list):
-                    logger.error(f"Embedding API response missing 'embedding' in first data element: {resp_json}")
-                    raise KeyError("'embedding' key missing in first data element")
-                return embedding
+                if not isinstance(resp_json["data"], list) or len(resp_json["data"]) != len(texts):
+                    logger.error(f"Embedding API returned {len(resp_json.get('data') or [])} vectors for {len(texts)} inputs")
+                    raise ValueError("'data' does not match the batch size")
+                # Results carry their input position; do not rely on response order
+                ordered = sorted(resp_json["data"], key=lambda d: d.get("index", 0))
+                embeddings = [d.get("embedding") for d in ordered]
+                if not all(isinstance(e, list) for e in embeddings):
+                    raise KeyError("'embedding' key missing in a data element")
+                return embeddings
             except Exception as e:
-                wait = (attempt + 1) * 2
-                logger.warning(f"Embedding failed (Attempt {attempt+1}): {e}. Retrying in {wait}s...")
+                wait = 0.5 * (2 ** attempt)
+                logger.warning(f"Embedding batch of {len(texts)} failed (Attempt {attempt+1}): {e}. Retrying in {wait}s...")
                 try:
-                    logger.debug(f"Full embedding API response: {response.text if 'response' in locals() else 'No response'}")
+                    logger.debug(f"Full embedding API response: {response.text if response is not None else 'No response'}")
                 except Exception:
                     pass
                 time.sleep(wait)
-        logger.error(f"Failed to retrieve embedding after retries for text snippet.")
-        return None
+        logger.error(f"Failed to retrieve embeddings after retries for a batch of {len(texts)}.")
+        return [None] * len(texts)
 
     def clear_cache(self):
         """Clears the embedding cache."""
-        self.get_embedding.cache_clear()
\ No newline at end of file
+        if self.cache is not None:
+            self.cache.clear()
+
+
+_shared_client: Optional[EmbeddingClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_embedding_client() -> EmbeddingClient:
+    """
+    Process-wide client: one pooled session, cache handle and model priming
+    call per process instead of one per controller.
+    """
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = EmbeddingClient()
+        return _shared_client
@@ -0,0 +1,59 @@
+"""
+Rolling latency percentiles.
+
+``LatencyTracker`` keeps the last ``window`` samples per stage and reports
+count / mean / p50 / p99 in milliseconds, e.g. for the retrieval path
+(embed -> index search -> canonical fetch).
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_samples) + 0.5 - 1e-9)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+class LatencyTracker:
+    """Per-stage rolling latency samples; safe to share across threads."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            samples = self._samples.setdefault(stage, deque(maxlen=self.window))
+            samples.append(seconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {stage: sorted(samples) for stage, samples in self._samples.items()}
+            counts = dict(self._counts)
+        return {
+            stage: {
+                "count": counts[stage],
+                "mean_ms": round(1000 * sum(samples) / len(samples), 3),
+                "p50_ms": round(1000 * percentile(samples, 50), 3),
+                "p99_ms": round(1000 * percentile(samples, 99), 3),
+            }
+            for stage, samples in snapshot.items()
+        }
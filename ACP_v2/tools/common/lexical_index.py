@@ -0,0 +1,388 @@
+"""
+Local BM25 inverted index for exact-term and code-symbol retrieval.
+
+Text is tokenized code-aware: every identifier is indexed whole
+(``get_embedding``) and by its snake/camel-case parts (``get``,
+``embedding``), so symbol lookups hit exactly and partial names still match.
+
+On-disk format (one file, written atomically):
+
+    b"BM25IDX1" | u32 header length | header JSON | postings blob
+
+The header holds the document table (key, length, metadata) and the term
+dictionary (term -> offset, size, document frequency). Each posting list is
+a zlib-compressed little-endian uint32 array of document-number gaps
+followed by the term frequencies. Lists are decoded on first use only, so
+opening an index costs one header parse.
+
+Documents added after loading live in memory until ``save()``, which merges
+them into a new file and drops replaced documents. Several processes may
+share one file: ``save()`` holds a ``<path>.lock`` file and, if another
+process saved since this one loaded, replays its own additions and removals
+onto the newer file instead of overwriting it. Search results are cached
+per query until the index changes. ``reciprocal_rank_fusion`` combines a
+BM25 ranking with a vector ranking.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+MAGIC = b"BM25IDX1"
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+WORD_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+SYMBOL_QUERY = re.compile(r"[A-Za-z_][\w]*(?:(?:\.|::)[A-Za-z_]\w*)*(?:\(\))?")
+CAMEL = re.compile(r"[a-z0-9][A-Z]")
+
+
+def tokenize(text: str, parts: bool = True) -> List[str]:
+    """Lowercased identifiers/numbers, each followed by its word parts unless ``parts=False``."""
+    tokens = []
+    for match in IDENTIFIER.finditer(text):
+        word = match.group()
+        if len(word) > 1:
+            tokens.append(word.lower())
+        if parts:
+            pieces = WORD_PART.findall(word)
+            if len(pieces) > 1:
+                tokens.extend(piece.lower() for piece in pieces if len(piece) > 1)
+    return tokens
+
+
+def is_symbol_query(query: str) -> bool:
+    """A single identifier-like token: snake_case, CamelCase, dotted or ``name()``."""
+    query = query.strip()
+    if not SYMBOL_QUERY.fullmatch(query):
+        return False
+    return "_" in query or "." in query or "::" in query or query.endswith("()") or bool(CAMEL.search(query))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuse several best-first rankings: score(d) = sum(1 / (k + rank))."""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _encode(doc_ids: List[int], tfs: List[int]) -> bytes:
+    values = array("I", [doc_ids[0]] + [b - a for a, b in zip(doc_ids, doc_ids[1:])])
+    values.extend(tfs)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return zlib.compress(values.tobytes())
+
+
+def _decode(blob: bytes) -> Tuple[List[int], array]:
+    values = array("I")
+    values.frombytes(zlib.decompress(blob))
+    if sys.byteorder == "big":
+        values.byteswap()
+    half = len(values) // 2
+    return list(accumulate(values[:half])), values[half:]
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class _FileLock:
+    """Exclusive lock file held while saving; a lock older than ``stale_seconds`` is taken over."""
+
+    def __init__(self, path: str, timeout: float = 30.0, stale_seconds: float = 120.0):
+        self.path = path
+        self.timeout = timeout
+        self.stale_seconds = stale_seconds
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return self
+            except FileExistsError:
+                pass
+            try:
+                if time.time() - os.stat(self.path).st_mtime > self.stale_seconds:
+                    os.unlink(self.path)  # left behind by a crashed writer
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for {self.path}")
+            time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class LexicalIndex:
+    """BM25 over string-keyed documents; safe to share across threads."""
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75, cache_size: int = 1024):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._keys: List[str] = []
+        self._lengths: List[int] = []
+        self._meta: List[Optional[Dict[str, Any]]] = []
+        self._doc_of: Dict[str, int] = {}
+        self._deleted: set = set()
+        self._live_length = 0
+        # loaded segment: term -> (offset, size, df); decoded lists are cached
+        self._terms: Dict[str, Tuple[int, int, int]] = {}
+        self._blob: Any = b""
+        self._decoded: "OrderedDict[str, Tuple[List[int], array]]" = OrderedDict()
+        # documents added since loading: term -> ([doc], [tf])
+        self._added: Dict[str, Tuple[List[int], List[int]]] = {}
+        # changes since loading, replayed if another process saved meanwhile:
+        # key -> (length, meta, term counts), or None for a removal
+        self._pending: Dict[str, Optional[Tuple[int, Optional[Dict[str, Any]], Dict[str, int]]]] = {}
+        self._results: "OrderedDict[Tuple[Tuple[str, ...], int], List[Tuple[str, float]]]" = OrderedDict()
+        self.cache_size = cache_size
+        self._dirty = False
+        self._loaded_stamp: Optional[Tuple[int, int, int]] = None
+
+    # ---------------- persistence ----------------
+
+    @classmethod
+    def open(cls, path: str, **options) -> "LexicalIndex":
+        index = cls(path, **options)
+        if os.path.exists(path):
+            index._load()
+        return index
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+            st = os.fstat(f.fileno())
+            self._loaded_stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a lexical index")
+        (header_len,) = struct.unpack_from("<I", data, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(data[start:start + header_len].decode("utf-8"))
+        self._blob = memoryview(data)[start + header_len:]
+        self._keys, self._lengths, self._meta = [], [], []
+        for key, length, meta in header["docs"]:
+            self._doc_of[key] = len(self._keys)
+            self._keys.append(key)
+            self._lengths.append(length)
+            self._meta.append(meta)
+        self._live_length = sum(self._lengths)
+        self._terms = {term: tuple(entry) for term, entry in header["terms"].items()}
+
+    def save(self, path: Optional[str] = None):
+        """Merge in-memory additions, drop replaced documents and write atomically."""
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to save the lexical index to")
+        with self._lock, _FileLock(f"{path}.lock"):
+            if path == self.path and _file_stamp(path) != self._loaded_stamp:
+                self._rebase()
+            live = [doc for doc in range(len(self._keys)) if doc not in self._deleted]
+            renumber = {doc: new for new, doc in enumerate(live)}
+            blob = bytearray()
+            terms: Dict[str, List[int]] = {}
+            for term in sorted(set(self._terms) | set(self._added)):
+                doc_ids, tfs = self._postings(term)
+                pairs = [(renumber[d], tf) for d, tf in zip(doc_ids, tfs) if d in renumber]
+                if not pairs:
+                    continue
+                encoded = _encode([d for d, _ in pairs], [tf for _, tf in pairs])
+                terms[term] = [len(blob), len(encoded), len(pairs)]
+                blob += encoded
+            header = json.dumps(
+                {
+                    "version": 1,
+                    "docs": [[self._keys[d], self._lengths[d], self._meta[d]] for d in live],
+                    "terms": terms,
+                },
+                separators=(",", ":"),
+            ).encode("utf-8")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(MAGIC + struct.pack("<I", len(header)) + header)
+                f.write(blob)
+            os.replace(tmp_path, path)
+            self.path = path
+            self._reset()
+            self._load()
+
+    def _rebase(self):
+        """Reload the file another process saved and re-apply this index's changes on top."""
+        pending = self._pending
+        self._reset()
+        if os.path.exists(self.path):
+            self._load()
+        for key, entry in pending.items():
+            if entry is None:
+                self._remove(key)
+            else:
+                self._add_doc(key, *entry)
+
+    def refresh(self) -> bool:
+        """Reload if another process saved the file since; returns True when reloaded."""
+        if not self.path or self._dirty:
+            return False
+        stamp = _file_stamp(self.path)
+        if stamp is None or stamp == self._loaded_stamp:
+            return False
+        with self._lock:
+            self._reset()
+            self._load()
+        return True
+
+    def _reset(self):
+        self._keys, self._lengths, self._meta = [], [], []
+        self._doc_of, self._deleted, self._live_length = {}, set(), 0
+        self._terms, self._blob, self._added, self._pending = {}, b"", {}, {}
+        self._decoded.clear()
+        self._results.clear()
+        self._dirty = False
+
+    # ---------------- updates ----------------
+
+    def add(self, key: str, text: str, meta: Optional[Dict[str, Any]] = None):
+        self.add_many([(key, text, meta)])
+
+    def add_many(self, documents: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        """Index (key, text, meta) triples; a known key replaces its document."""
+        with self._lock:
+            for key, text, meta in documents:
+                tokens = tokenize(text)
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                self._add_doc(key, len(tokens), meta, counts)
+                self._pending[key] = (len(tokens), meta, counts)
+            self._changed()
+
+    def remove(self, key: str):
+        with self._lock:
+            self._remove(key)
+            self._pending[key] = None
+            self._changed()
+
+    def _add_doc(self, key: str, length: int, meta: Optional[Dict[str, Any]], counts: Dict[str, int]):
+        self._remove(key)
+        doc = len(self._keys)
+        self._doc_of[key] = doc
+        self._keys.append(key)
+        self._lengths.append(length)
+        self._meta.append(meta)
+        self._live_length += length
+        for term, tf in counts.items():
+            doc_ids, tfs = self._added.setdefault(term, ([], []))
+            doc_ids.append(doc)
+            tfs.append(tf)
+
+    def _remove(self, key: str):
+        doc = self._doc_of.pop(key, None)
+        if doc is not None:
+            self._deleted.add(doc)
+            self._live_length -= self._lengths[doc]
+
+    def _changed(self):
+        self._dirty = True
+        self._results.clear()
+
+    # ---------------- queries ----------------
+
+    def __len__(self) -> int:
+        return len(self._doc_of)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._doc_of
+
+    def meta(self, key: str) -> Optional[Dict[str, Any]]:
+        doc = self._doc_of.get(key)
+        return self._meta[doc] if doc is not None else None
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Top ``k`` (key, BM25 score), best first.
+
+        A symbol query (see ``is_symbol_query``) is scored on its whole
+        identifiers only, which are rare terms with short posting lists; the
+        word parts are used only when the symbol itself is not indexed.
+        """
+        if is_symbol_query(query):
+            results = self._cached_score(tuple(dict.fromkeys(tokenize(query, parts=False))), k)
+            if results:
+                return results
+        return self._cached_score(tuple(dict.fromkeys(tokenize(query))), k)
+
+    def _cached_score(self, terms: Tuple[str, ...], k: int) -> List[Tuple[str, float]]:
+        cache_key = (terms, k)
+        with self._lock:
+            cached = self._results.get(cache_key)
+            if cached is not None:
+                self._results.move_to_end(cache_key)
+                return list(cached)
+            results = self._score(terms, k)
+            self._results[cache_key] = results
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+            return list(results)
+
+    def _score(self, terms: Tuple[str, ...], k: int) -> List[Tuple[str, float]]:
+        live = len(self._doc_of)
+        if not live or not terms:
+            return []
+        avgdl = self._live_length / live or 1.0
+        k1, b = self.k1, self.b
+        lengths, deleted = self._lengths, self._deleted
+        scores: Dict[int, float] = {}
+        for term in terms:
+            doc_ids, tfs = self._postings(term)
+            if not doc_ids:
+                continue
+            idf = math.log(1.0 + (live - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for doc, tf in zip(doc_ids, tfs):
+                if deleted and doc in deleted:
+                    continue
+                norm = tf + k1 * (1.0 - b + b * lengths[doc] / avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1.0) / norm
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self._keys[doc], score) for doc, score in top]
+
+    def _postings(self, term: str) -> Tuple[Sequence[int], Sequence[int]]:
+        doc_ids: Sequence[int] = ()
+        tfs: Sequence[int] = ()
+        entry = self._terms.get(term)
+        if entry is not None:
+            decoded = self._decoded.get(term)
+            if decoded is None:
+                offset, size, _ = entry
+                decoded = _decode(self._blob[offset:offset + size])
+                self._decoded[term] = decoded
+                if len(self._decoded) > self.cache_size:
+                    self._decoded.popitem(last=False)
+            doc_ids, tfs = decoded
+        added = self._added.get(term)
+        if added is not None:
+            doc_ids = list(doc_ids) + added[0]
+            tfs = list(tfs) + added[1]
+        return doc_ids, tfs
@@ -1,18 +1,42 @@
+"""
+Library Builder: a folder of PDFs -> Markdown bundle + chunk JSONL + JSON index.
+
+Documents are processed concurrently in a process pool. Each worker spools
+one document's chunk records and text to part files, and the parent appends
+finished documents to the bundle strictly in input order. The Markdown and
+``*_chunks.jsonl`` therefore read exactly like a sequential build. At most
+``2 * workers`` documents are in flight. Workers OCR scanned pages inline
+(``init_worker``) instead of each starting an OCR pool.
+
+After every document the parent appends one line to ``*_checkpoint.jsonl``
+and rewrites ``*_index.json``. The line holds the file's sha256, its outcome
+and the byte sizes of the Markdown and JSONL outputs at that point. A rerun
+with the same output base resumes the latest bundle:
+
+  - outputs are truncated back to the last checkpoint
+  - documents already recorded (by hash) are skipped
+  - failed ones are retried
+
+``fresh=True`` (``--fresh``) starts a new bundle instead.
+"""
+
 import argparse
+import hashlib
 import importlib
 import json
 import logging
 import os
+import shutil
 import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, cast
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional
 
-try:
-    PDFProcessor = cast(Any, importlib.import_module("tools.common.pdf_processor").PDFProcessor)
-except ImportError:
-    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    PDFProcessor = cast(Any, importlib.import_module("tools.common.pdf_processor").PDFProcessor)
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,123 +46,305 @@ logging.basicConfig(
 logger = logging.getLogger("LibraryBuilder")
 
 
-DEFAULT_OUTPUT_BASE = Path(__file__).resolve().parents[2] / "cli_scans" / "knowledge_bundle"
+DEFAULT_OUTPUT_BASE = PROJECT_ROOT / "cli_scans" / "knowledge_bundle"
+
+ExtractFn = Callable[[str], Iterable[Dict[str, Any]]]
+
+_processor: Any = None
+
+
+def pdf_chunks(file_path: str) -> Iterable[Dict[str, Any]]:
+    """Chunks of one PDF from this process's PDFProcessor (OCR-aware)."""
+    global _processor
+    if _processor is None:
+        _processor = importlib.import_module("tools.common.pdf_processor").PDFProcessor()
+    return _processor.process_file(Path(file_path))
+
+
+def init_worker():
+    """Pool initializer: one document per core already, so PDFProcessor OCRs inline (no nested OCR pool)."""
+    os.environ["OCR_INLINE"] = "1"
+
 
-def build_library(input_dir: str, output_name: str = str(DEFAULT_OUTPUT_BASE)) -> None:
-    """Build a Markdown bundle + JSON index from PDFs using PDFProcessor (OCR-aware)."""
+def build_library(
+    input_dir: str,
+    output_name: str = str(DEFAULT_OUTPUT_BASE),
+    workers: Optional[int] = None,
+    fresh: bool = False,
+    extract_fn: ExtractFn = pdf_chunks,
+    executor: Optional[Executor] = None,
+) -> Optional[Path]:
+    """Build (or resume) a Markdown bundle + JSON index from PDFs; returns the bundle directory."""
     input_path = Path(input_dir).resolve()
     if not input_path.exists():
         logger.error(f"Directory not found: {input_dir}")
-        return
+        return None
 
     output_base = Path(output_name)
     if not output_base.is_absolute():
         output_base = input_path / output_base
+    stem = output_base.stem
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    bundle_dir = output_base.parent / f"{output_base.stem}_bundle_{timestamp}"
-    bundle_dir.mkdir(parents=True, exist_ok=True)
-
-    processor = PDFProcessor()
     files: List[Path] = sorted([f for f in input_path.iterdir() if f.suffix.lower() == ".pdf"])
     if not files:
         logger.warning(f"No PDFs found in {input_dir}")
-        return
+        return None
+
+    bundle_dir = None if fresh else _latest_bundle(output_base)
+    if bundle_dir is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        bundle_dir = output_base.parent / f"{stem}_bundle_{timestamp}"
+        suffix = 1
+        while bundle_dir.exists():
+            suffix += 1
+            bundle_dir = output_base.parent / f"{stem}_bundle_{timestamp}_{suffix}"
+        bundle_dir.mkdir(parents=True)
+    else:
+        logger.info(f"Resuming bundle: {bundle_dir}")
+
+    md_filename = bundle_dir / f"{stem}.md"
+    json_filename = bundle_dir / f"{stem}_index.json"
+    chunk_jsonl_path = bundle_dir / f"{stem}_chunks.jsonl"
+    checkpoint_path = bundle_dir / f"{stem}_checkpoint.jsonl"
+    parts_dir = bundle_dir / ".parts"
+    parts_dir.mkdir(exist_ok=True)
+
+    documents: Dict[str, Dict[str, Any]] = {}
+    checkpoint = _load_checkpoint(checkpoint_path)
+    for entry in checkpoint:
+        _record(documents, entry)
+    md_size = checkpoint[-1]["md_size"] if checkpoint else 0
+    chunks_size = checkpoint[-1]["chunks_size"] if checkpoint else 0
+    next_order = max((entry["order"] for entry in checkpoint), default=0) + 1
+
+    todo = []
+    scheduled = {digest for digest, entry in documents.items() if entry["processed_successfully"]}
+    for file_path in files:
+        digest = _file_hash(file_path)
+        if digest not in scheduled:
+            scheduled.add(digest)
+            todo.append((file_path, digest))
+    skipped = len(files) - len(todo)
+    if skipped:
+        logger.info(f"Skipping {skipped} documents already in the bundle (or repeated).")
 
-    markdown_content: List[str] = []
-    documents_index: List[Dict[str, Any]] = []
     json_index: Dict[str, Any] = {
-        "bundle_name": output_base.stem,
+        "bundle_name": stem,
         "generated_at": datetime.now().isoformat(),
         "total_documents": len(files),
-        "documents": documents_index,
+        "documents": [],
         "source_dir": str(input_path),
         "bundle_dir": str(bundle_dir),
+        "chunk_file": chunk_jsonl_path.name,
+        "checkpoint_file": checkpoint_path.name,
     }
 
-    chunk_jsonl_path = bundle_dir / f"{output_base.stem}_chunks.jsonl"
-    json_index["chunk_file"] = chunk_jsonl_path.name
+    logger.info(f"Starting ingestion of {len(todo)} documents...")
+    pool = executor or ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+    window = 2 * (workers or os.cpu_count() or 1)
+    # Drop output of a document that was being appended when the last run stopped
+    with _open_output(md_filename, md_size) as md_stream, _open_output(chunk_jsonl_path, chunks_size) as chunk_stream, open(
+        checkpoint_path, "a", encoding="utf-8"
+    ) as checkpoint_stream:
+        if not md_size:
+            _write_lines(
+                md_stream,
+                [
+                    f"# Knowledge Library: {stem}\n",
+                    f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M')}\n",
+                    f"**Source Directory:** {input_path}\n",
+                    f"**Document Count:** {len(files)}\n",
+                    "---\n",
+                ],
+            )
+        _write_index(json_filename, json_index, documents)
+
+        in_flight: deque = deque()
+        pending = iter(todo)
+        try:
+            while True:
+                while len(in_flight) < window:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    file_path, digest = item
+                    spool = str(parts_dir / digest)
+                    in_flight.append((next_order, file_path, digest, spool, pool.submit(_process_document, extract_fn, str(file_path), spool)))
+                    next_order += 1
+                if not in_flight:
+                    break
+
+                # Documents are appended in order; later ones keep processing meanwhile
+                order, file_path, digest, spool, future = in_flight.popleft()
+                entry: Dict[str, Any] = {"order": order, "filename": file_path.name, "file_hash": digest}
+                md_before, chunks_before = md_stream.tell(), chunk_stream.tell()
+                try:
+                    summary = future.result()
+                    _append_document(md_stream, chunk_stream, order, file_path.name, spool, summary)
+                    entry.update(summary, processed_successfully=True)
+                    logger.info(f"Processed ({order}/{len(files)}): {file_path.name}")
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.error(f"Failed to process {file_path.name}: {e}")
+                    entry.update(error=str(e), processed_successfully=False)
+                    _rewind(md_stream, md_before)
+                    _rewind(chunk_stream, chunks_before)
+                finally:
+                    for suffix in (".jsonl", ".md"):
+                        Path(spool + suffix).unlink(missing_ok=True)
+                md_stream.flush()
+                chunk_stream.flush()
+                entry.update(md_size=md_stream.tell(), chunks_size=chunk_stream.tell())
+                checkpoint_stream.write(json.dumps(entry) + "\n")
+                checkpoint_stream.flush()
+                _record(documents, entry)
+                _write_index(json_filename, json_index, documents)
+        finally:
+            for *_, future in in_flight:
+                future.cancel()
+            if executor is None:
+                pool.shutdown()
+
+    json_index["completed"] = True
+    _write_index(json_filename, json_index, documents)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    logger.info(f"Saved text bundle to: {md_filename}")
+    logger.info(f"Saved structure index to: {json_filename}")
+    logger.info(f"Saved chunk database to: {chunk_jsonl_path}")
+    return bundle_dir
 
-    markdown_content.append(f"# Knowledge Library: {output_base.stem}\n")
-    markdown_content.append(f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
-    markdown_content.append(f"**Source Directory:** {input_path}\n")
-    markdown_content.append(f"**Document Count:** {len(files)}\n")
-    markdown_content.append("---\n")
 
-    logger.info(f"Starting ingestion of {len(files)} documents...")
-    total_chunks = 0
+def _process_document(extract_fn: ExtractFn, file_path: str, spool: str) -> Dict[str, Any]:
+    """Worker: spool one document's chunk records (``spool``.jsonl) and text (``spool``.md)."""
+    name = Path(file_path).name
+    char_count = 0
+    chunk_count = 0
+    ocr_used = False
+    with open(spool + ".jsonl", "w", encoding="utf-8") as chunk_stream, open(spool + ".md", "w", encoding="utf-8") as body:
+        for chunk in extract_fn(file_path):
+            if chunk_count:
+                body.write("\n")
+                char_count += 1
+            body.write(chunk["content"])
+            char_count += len(chunk["content"])
 
-    md_filename = bundle_dir / f"{output_base.stem}.md"
-    json_filename = bundle_dir / f"{output_base.stem}_index.json"
+            meta = chunk["metadata"]
+            global_idx = meta.get("chunk_index_global", chunk_count)
+            ocr_used = ocr_used or bool(meta.get("ocr_applied"))
+            record = {
+                "id": meta.get("chunk_id", f"{name}_{global_idx}"),
+                "text": chunk["content"],
+                "metadata": {
+                    "source": meta["file_name"],
+                    "page": meta["page_number"],
+                    "ocr": bool(meta.get("ocr_applied")),
+                    "global_idx": global_idx,
+                    "chunk_group": global_idx // 20,
+                    "page_char_start": meta.get("page_char_start"),
+                    "page_char_end": meta.get("page_char_end"),
+                    "char_count": meta.get("char_count", len(chunk["content"])),
+                },
+            }
+            chunk_stream.write(json.dumps(record) + "\n")
+            chunk_count += 1
+    return {"char_count": char_count, "chunk_count": chunk_count, "ocr_used": ocr_used}
 
-    with open(chunk_jsonl_path, "w", encoding="utf-8") as chunk_stream:
-        for order, file_path in enumerate(files, 1):
-            logger.info(f"Processing ({order}/{len(files)}): {file_path.name}")
+
+def _append_document(md_stream: BinaryIO, chunk_stream: BinaryIO, order: int, filename: str,
+                     spool: str, summary: Dict[str, Any]) -> None:
+    _write_lines(
+        md_stream,
+        [
+            f"# DOC {order}: {filename}",
+            "## Metadata",
+            f"- **Filename:** `{filename}`",
+            f"- **Size:** {summary['char_count']} chars",
+            f"- **Chunks:** {summary['chunk_count']}",
+            f"- **OCR Used:** {'Yes' if summary['ocr_used'] else 'No'}",
+            "\n## Content\n",
+        ],
+    )
+    with open(spool + ".md", "rb") as body:
+        shutil.copyfileobj(body, md_stream)
+    _write_lines(md_stream, ["", "\n---\n"])
+    with open(spool + ".jsonl", "rb") as records:
+        shutil.copyfileobj(records, chunk_stream)
+
+
+def _record(documents: Dict[str, Dict[str, Any]], entry: Dict[str, Any]) -> None:
+    """Latest outcome per file hash; a failure is dropped once its file has a later outcome."""
+    for digest, previous in list(documents.items()):
+        if not previous["processed_successfully"] and previous["filename"] == entry["filename"]:
+            del documents[digest]
+    documents[entry["file_hash"]] = entry
+
+
+def _latest_bundle(output_base: Path) -> Optional[Path]:
+    """Most recent bundle for this output base that has a checkpoint."""
+    bundles = sorted(
+        p for p in output_base.parent.glob(f"{output_base.stem}_bundle_*")
+        if (p / f"{output_base.stem}_checkpoint.jsonl").exists()
+    )
+    return bundles[-1] if bundles else None
+
+
+def _load_checkpoint(path: Path) -> List[Dict[str, Any]]:
+    """Checkpoint entries; a line torn by a crash (and anything after it) is cut off."""
+    entries: List[Dict[str, Any]] = []
+    if not path.exists():
+        return entries
+    valid = 0
+    with open(path, "rb") as f:
+        for line in f:
             try:
-                chunks = processor.process_file(file_path)
-                full_text = "\n".join(chunk["content"] for chunk in chunks)
-
-                documents_index.append(
-                    {
-                        "order": order,
-                        "filename": file_path.name,
-                        "char_count": len(full_text),
-                        "chunk_count": len(chunks),
-                        "processed_successfully": True,
-                    }
-                )
-
-                for chunk in chunks:
-                    meta = chunk["metadata"]
-                    record = {
-                        "id": meta["chunk_id"],
-                        "text": chunk["content"],
-                        "metadata": {
-                            "source": meta["file_name"],
-                            "page": meta["page_number"],
-                            "ocr": meta["ocr_applied"],
-                            "global_idx": meta["chunk_index_global"],
-                            "chunk_group": meta["chunk_index_global"] // 20,
-                            "page_char_start": meta["page_char_start"],
-                            "page_char_end": meta["page_char_end"],
-                            "char_count": meta["char_count"],
-                        },
-                    }
-                    chunk_stream.write(json.dumps(record) + "\n")
-                total_chunks += len(chunks)
-
-                markdown_content.append(f"# DOC {order}: {file_path.name}")
-                markdown_content.append("## Metadata")
-                markdown_content.append(f"- **Filename:** `{file_path.name}`")
-                markdown_content.append(f"- **Size:** {len(full_text)} chars")
-                markdown_content.append(f"- **Chunks:** {len(chunks)}")
-                markdown_content.append(
-                    f"- **OCR Used:** {'Yes' if any(c['metadata']['ocr_applied'] for c in chunks) else 'No'}"
-                )
-                markdown_content.append("\n## Content\n")
-                markdown_content.append(full_text)
-                markdown_content.append("\n---\n")
-            except Exception as e:  # pylint: disable=broad-except
-                logger.error(f"Failed to process {file_path.name}: {e}")
-                documents_index.append(
-                    {
-                        "order": order,
-                        "filename": file_path.name,
-                        "error": str(e),
-                        "processed_successfully": False,
-                    }
-                )
-
-    json_index["total_chunks"] = total_chunks
-
-    with open(md_filename, "w", encoding="utf-8") as f:
-        f.write("\n".join(markdown_content))
-    logger.info(f"Saved text bundle to: {md_filename}")
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                entries.pop()
+                break
+            valid += len(line)
+    with open(path, "r+b") as f:
+        f.truncate(valid)
+    return entries
+
 
-    with open(json_filename, "w", encoding="utf-8") as f:
+def _open_output(path: Path, size: int) -> BinaryIO:
+    """Open for appending after truncating to ``size`` bytes."""
+    with open(path, "ab") as f:
+        f.truncate(size)
+    return open(path, "ab")
+
+
+def _rewind(stream: BinaryIO, size: int) -> None:
+    """Drop everything after ``size``; truncate() alone leaves tell() at the old end."""
+    stream.flush()
+    stream.truncate(size)
+    stream.seek(size)
+
+
+def _write_index(path: Path, json_index: Dict[str, Any], documents: Dict[str, Dict[str, Any]]) -> None:
+    json_index["documents"] = sorted(
+        ({k: v for k, v in entry.items() if k not in ("md_size", "chunks_size")} for entry in documents.values()),
+        key=lambda entry: entry["order"],
+    )
+    json_index["total_chunks"] = sum(entry.get("chunk_count", 0) for entry in documents.values())
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(json_index, f, indent=4)
-    logger.info(f"Saved structure index to: {json_filename}")
-    logger.info(f"Saved chunk database to: {chunk_jsonl_path}")
+    os.replace(tmp_path, path)
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_lines(stream: BinaryIO, lines: List[str]) -> None:
+    for line in lines:
+        stream.write((line + "\n").encode("utf-8"))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Aletheia Library Builder (PDF -> MD+JSON)")
@@ -149,5 +355,7 @@ if __name__ == "__main__":
         default=str(DEFAULT_OUTPUT_BASE),
         help="Output filename base (absolute or relative; default: cli_scans/knowledge_bundle)",
     )
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--fresh", action="store_true", help="Start a new bundle instead of resuming the latest one")
     args = parser.parse_args()
-    build_library(args.input_dir, args.output)
+    build_library(args.input_dir, args.output, workers=args.workers, fresh=args.fresh)
@@ -0,0 +1,53 @@
+"""
+Persistent per-page OCR cache.
+
+OCR text is stored in SQLite keyed by the sha256 of the rendered page
+image, so a page that was OCR'd before (same document re-ingested, or the
+same scanned page appearing in another file) never reaches Tesseract again.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional
+
+
+def page_hash(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class OCRPageCache:
+    """SQLite-backed page hash -> OCR text map; safe to share across threads."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ocr_page_cache (
+                page_hash TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            ) WITHOUT ROWID
+        """
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr_page_cache WHERE page_hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_page_cache VALUES (?, ?, ?)",
+                (key, text, datetime.utcnow().isoformat()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,9 +1,13 @@
 from PIL import Image
 import pytesseract
+import io
 import logging
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
 from pdf2image import convert_from_path
 import os
 import sys
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +19,9 @@ POPPLER_PATH = r"C:\Users\jakem\Documents\poppler\poppler-25.12.0\Library\bin"
 # 2. TESSERACT PATH (For Image -> Text OCR)
 # CRITICAL FOR WINDOWS: Point this to your tesseract.exe
 # If you haven't installed it, download from: https://github.com/UB-Mannheim/tesseract/wiki
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+if os.path.exists(TESSERACT_PATH):
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
 
 def _get_poppler_path():
     """
@@ -68,4 +74,64 @@ def convert_page_to_image(pdf_path, page_number):
             logger.error(f"Poppler not found. Please update POPPLER_PATH in tools/common/ocr_service.py. Error: {e}")
         else:
             logger.error(f"Error converting PDF page {page_number} to image: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+# --- In-document rasterization (no poppler subprocess) ---
+
+def render_page(page, dpi: int = 200) -> Optional[bytes]:
+    """PNG bytes of an already-open PyMuPDF page rendered at ``dpi``."""
+    try:
+        zoom = dpi / 72.0
+        pix = page.get_pixmap(matrix=(zoom, 0, 0, zoom, 0, 0))
+        return pix.tobytes("png")
+    except Exception as e:
+        logger.error(f"Image conversion failed for page {page.number + 1}: {e}")
+        return None
+
+
+def ocr_image_bytes(image_bytes: bytes) -> str:
+    """
+    OCR an encoded page image. Runs in OCR pool workers; a missing Tesseract
+    binary raises (TesseractNotFoundError is an EnvironmentError) so the
+    caller can stop queueing pages.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    return pytesseract.image_to_string(image)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Set by the ingest and library-builder pool initializers: those workers
+# already run one per core, so each OCRs inline instead of starting a pool
+INLINE_ENV = "OCR_INLINE"
+
+
+def submit_ocr(image_bytes: bytes, workers: Optional[int] = None) -> Future:
+    """OCR a page image in the shared pool, or inline (as a finished Future) in pool workers or with ``workers=0``."""
+    if workers == 0 or os.environ.get(INLINE_ENV) == "1":
+        future: Future = Future()
+        try:
+            future.set_result(ocr_image_bytes(image_bytes))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return get_ocr_pool(workers).submit(ocr_image_bytes, image_bytes)
+
+
+def get_ocr_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool shared by every PDFProcessor in this process (created on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+
+def shutdown_ocr_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
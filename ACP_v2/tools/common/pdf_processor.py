@@ -1,9 +1,13 @@
 import importlib
 import logging
+from collections import deque
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Any, Dict, List, cast
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, cast
 from config.settings import settings  # type: ignore[import]
+from core.chunking.chunker import Chunker, resolve_tokenizer
 from . import ocr_service  # type: ignore[import]
+from .ocr_cache import OCRPageCache, page_hash
 
 fitz = cast(Any, importlib.import_module("fitz"))
 
@@ -15,71 +19,127 @@ class PDFProcessor:
     """
     def __init__(self):
         self.settings = settings
+        self.chunker = Chunker(
+            settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, tokenizer=resolve_tokenizer(settings.CHUNK_TOKENIZER)
+        )
+        self.ocr_cache: Optional[OCRPageCache] = None
+        if self.settings.OCR_CACHE_PATH:
+            self.ocr_cache = OCRPageCache(str(self.settings.OCR_CACHE_PATH))
 
-    def process_file(self, file_path: Path) -> List[Dict[str, Any]]:
+    def process_file(self, file_path: Path) -> Iterator[Dict[str, Any]]:
         """
         Extracts text from PDF page-by-page, applying OCR if text density is low.
+
+        Chunks are yielded lazily in page order, so callers can embed page 1
+        while later pages are still being extracted. Scanned pages are
+        rasterized from the already-open document (no poppler subprocess per
+        page) and OCR'd in a process pool, with at most a few pages per
+        worker in flight; a page waits only for its own OCR result. Inside
+        ingest / library-builder workers OCR runs inline instead (see
+        ``ocr_service.submit_ocr``). OCR results are cached by page image hash.
+
+        A document that fails part-way raises after the pages already
+        yielded, so callers never mistake a truncated document for a
+        complete one.
         """
-        documents = []
-        ocr_available = True  # stop retrying if deps are missing
+        # (page_num, text, ocr_applied, cache key, OCR future or None) in page order
+        pending: Deque[Tuple[int, str, bool, Optional[str], Optional[Future]]] = deque()
+        state = {"ocr_available": True}  # stop retrying if deps are missing
+        window = 2 * max(1, self.settings.OCR_WORKERS)
+        # text pages held back behind a page that is still being OCR'd
+        max_buffered_pages = 4 * window
+        doc = None
         try:
             doc = fitz.open(file_path)
             for page_num, page in enumerate(doc):
                 raw_text = page.get_text()
+                key, future, ocr_applied = None, None, False
 
                 # Decision Gate: Check for Scanned Pages
-                if len(raw_text.strip()) < self.settings.OCR_TEXT_DENSITY_THRESHOLD and ocr_available:
+                if len(raw_text.strip()) < self.settings.OCR_TEXT_DENSITY_THRESHOLD and state["ocr_available"]:
                     logger.warning(f"Low text density on page {page_num + 1} of {file_path.name}. Checking OCR...")
-                    try:
-                        image = ocr_service.convert_page_to_image(str(file_path), page_num + 1)
-                        if image:
-                            ocr_text = ocr_service.extract_text_from_image(image)
-                            if len(ocr_text.strip()) > len(raw_text.strip()):
-                                raw_text = ocr_text
-                                logger.info(f"OCR improved text yield for page {page_num + 1}.")
-                    except EnvironmentError as env_err:
-                        logger.warning(f"OCR disabled for {file_path.name}: {env_err}")
-                        ocr_available = False
-                    except Exception as ocr_e:
-                        logger.error(f"OCR failed for page {page_num + 1}: {ocr_e}")
+                    image_bytes = ocr_service.render_page(page, self.settings.OCR_DPI)
+                    if image_bytes:
+                        key = page_hash(image_bytes)
+                        cached = self.ocr_cache.get(key) if self.ocr_cache else None
+                        if cached is not None:
+                            raw_text, ocr_applied = self._better_text(page_num, raw_text, cached)
+                        else:
+                            future = ocr_service.submit_ocr(image_bytes, self.settings.OCR_WORKERS)
+                pending.append((page_num, raw_text, ocr_applied, key, future))
 
-                # Chunking
-                if raw_text.strip():
-                    page_docs = self._chunk_text(raw_text, str(file_path), file_path.name, page_num + 1)
-                    documents.extend(page_docs)
-            
-            doc.close()
+                # Emit every page whose text is final; block on OCR only when the window is full
+                while pending:
+                    head = pending[0][4]
+                    in_flight = sum(1 for item in pending if item[4] is not None)
+                    if (
+                        head is not None
+                        and not head.done()
+                        and in_flight < window
+                        and len(pending) < max_buffered_pages
+                    ):
+                        break
+                    yield from self._page_chunks(pending.popleft(), state, file_path)
+
+            while pending:
+                yield from self._page_chunks(pending.popleft(), state, file_path)
         except Exception as e:
             logger.error(f"Error processing PDF {file_path}: {e}")
-            
-        return documents
+            raise
+        finally:
+            for *_, future in pending:
+                if future is not None:
+                    future.cancel()
+            if doc is not None:
+                doc.close()
+
+    def _page_chunks(self, item, state: Dict[str, bool], file_path: Path) -> Iterator[Dict[str, Any]]:
+        page_num, text, ocr_applied, key, future = item
+        if future is not None:
+            text, ocr_applied = self._collect_ocr(page_num, text, key, future, state, file_path)
+        if text.strip():
+            for chunk in self._chunk_text(text, str(file_path), file_path.name, page_num + 1):
+                chunk["metadata"]["ocr_applied"] = ocr_applied
+                yield chunk
+
+    def _collect_ocr(self, page_num: int, raw_text: str, key: Optional[str], future: Future,
+                     state: Dict[str, bool], file_path: Path) -> Tuple[str, bool]:
+        try:
+            ocr_text = future.result()
+        except EnvironmentError as env_err:
+            if state["ocr_available"]:
+                logger.warning(f"OCR disabled for {file_path.name}: {env_err}")
+            state["ocr_available"] = False
+            return raw_text, False
+        except Exception as ocr_e:
+            logger.error(f"OCR failed for page {page_num + 1}: {ocr_e}")
+            return raw_text, False
+        if self.ocr_cache and key:
+            self.ocr_cache.put(key, ocr_text)
+        return self._better_text(page_num, raw_text, ocr_text)
+
+    @staticmethod
+    def _better_text(page_num: int, raw_text: str, ocr_text: str) -> Tuple[str, bool]:
+        if len(ocr_text.strip()) > len(raw_text.strip()):
+            logger.info(f"OCR improved text yield for page {page_num + 1}.")
+            return ocr_text, True
+        return raw_text, False
 
     def _chunk_text(self, text: str, file_path: str, file_name: str, page_num: int) -> List[Dict[str, Any]]:
         """Helper to split text into chunks."""
-        chunk_size = self.settings.CHUNK_SIZE
-        overlap = self.settings.CHUNK_OVERLAP
-        chunks = []
-        
-        text_len = len(text)
-        start = 0
-        chunk_idx = 0
-        
-        while start < text_len:
-            end = min(start + chunk_size, text_len)
-            chunk_content = text[start:end]
-            
-            chunks.append({
-                "content": chunk_content,
+        return [
+            {
+                "content": chunk.text,
                 "metadata": {
                     "file_path": file_path,
                     "file_name": file_name,
                     "page_number": page_num,
-                    "chunk_index": chunk_idx,
+                    "chunk_index": chunk.index,
+                    "chunk_id": chunk.chunk_id,
+                    "page_char_start": chunk.start,
+                    "page_char_end": chunk.end,
                     "file_type": "pdf"
                 }
-            })
-            
-            start += (chunk_size - overlap)
-            chunk_idx += 1
-            
-        return chunks
\ No newline at end of file
+            }
+            for chunk in self.chunker.split(text, source=f"{file_name}#page={page_num}")
+        ]
@@ -1,16 +1,44 @@
 import logging
+import time
 import chromadb
-from pymongo import MongoClient
+from pymongo import ASCENDING, MongoClient
 from config.settings import settings
-from tools.common.embedding_client import EmbeddingClient
-from typing import cast, List, Any
+from tools.common.embedding_client import get_embedding_client
+from tools.common.latency import LatencyTracker
+from tools.common.lexical_index import LexicalIndex, is_symbol_query, reciprocal_rank_fusion
+from typing import cast, Dict, List, Any, Optional, Tuple
 mongo_client: Any = ...
 
 logger = logging.getLogger(__name__)
 
+ChunkKey = Tuple[str, int]
+
+
 class RetrievalController:
-    def __init__(self):
-        self.embedding_client = EmbeddingClient()
+    """
+    Query path: embed -> Chroma top-k -> canonical chunk text.
+
+    When a lexical index is configured (``settings.LEXICAL_INDEX_PATH``) its
+    BM25 ranking is fused with the vector ranking by reciprocal rank fusion.
+    Code-symbol queries (``get_embedding``, ``RetrievalController.query``)
+    that hit the lexical index are answered from it alone, without an
+    embedding call.
+
+    The canonical text for all hits is fetched with one MongoDB query on the
+    (file_hash, chunk_index) index. With ``documents_from_index`` (default:
+    ``settings.RETRIEVAL_FROM_INDEX``) the text Chroma already stores is used
+    and Mongo is only asked for hits without it. Per-stage p50/p99 latencies
+    are available from ``latency_stats()``.
+    """
+    def __init__(self, documents_from_index: Optional[bool] = None, lexical_index: Optional[LexicalIndex] = None):
+        self.embedding_client = get_embedding_client()
+        self.documents_from_index = (
+            settings.RETRIEVAL_FROM_INDEX if documents_from_index is None else documents_from_index
+        )
+        self.latency = LatencyTracker()
+        if lexical_index is None and settings.LEXICAL_INDEX_PATH:
+            lexical_index = LexicalIndex.open(settings.LEXICAL_INDEX_PATH)
+        self.lexical = lexical_index
 
         # ChromaDB (Index)
         self.chroma_client = chromadb.PersistentClient(path=str(settings.CHROMA_DB_PATH))
@@ -20,40 +48,101 @@ class RetrievalController:
         self.mongo_client: Any = MongoClient(settings.MONGO_URI)
         self.db = self.mongo_client[settings.DB_NAME]
         self.collection_truth = self.db[settings.COLLECTION_TRUTH]
+        try:
+            # Same spec as ops/init.py; a no-op when it already exists
+            self.collection_truth.create_index(
+                [("file_hash", ASCENDING), ("chunk_index", ASCENDING)], unique=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not ensure (file_hash, chunk_index) index: {e}")
 
-    def query(self, query: str) -> str:
-        """Retrieves context and generates a response."""
-        # 1. Embed Query
-        query_embedding = self.embedding_client.get_embedding(query)
-        if not query_embedding:
-            return "Error: Could not process query."
+    def retrieve(self, query: str, n_results: Optional[int] = None) -> Optional[List[str]]:
+        """Canonical text of the top hits in rank order (None if the query could not be embedded)."""
+        started = time.perf_counter()
+        n_results = n_results or settings.NUM_RETRIEVAL_RESULTS
+        lexical_keys = self._lexical_search(query, n_results)
+        context: Dict[ChunkKey, str] = {}
+        if lexical_keys and is_symbol_query(query):
+            # Exact symbol lookup: skip the embedding and the vector search
+            keys = lexical_keys
+        else:
+            # 1. Embed Query
+            with self.latency.time("embed"):
+                query_embedding = self.embedding_client.get_embedding(query)
+            if not query_embedding:
+                return None
 
-        # 2. Retrieve from ChromaDB
-        results = self.collection_index.query(
-            query_embeddings=cast(List[float], [query_embedding]),
-            n_results=settings.NUM_RETRIEVAL_RESULTS,
-            include=['metadatas']
-        )
+            # 2. Retrieve from ChromaDB
+            include = ['metadatas', 'documents'] if self.documents_from_index else ['metadatas']
+            with self.latency.time("search"):
+                results = self.collection_index.query(
+                    query_embeddings=cast(List[float], [query_embedding]),
+                    n_results=n_results,
+                    include=cast(Any, include)
+                )
+
+            metadatas = (results.get('metadatas') or [[]])[0] if results else []
+            documents = (results.get('documents') or [[]])[0] if results and self.documents_from_index else []
+            keys = [(meta.get('file_hash'), meta.get('chunk_index')) for meta in metadatas or []]
+            if documents:
+                context.update({key: doc for key, doc in zip(keys, documents) if doc})
+            if lexical_keys:
+                fused = reciprocal_rank_fusion([keys, lexical_keys])
+                keys = [cast(ChunkKey, key) for key, _ in fused[:n_results]]
 
         # 3. Fetch Full Content from MongoDB (Canonical Truth)
         # We rely on the index to find *where* the data is, but fetch the *clean* data from Mongo.
-        context_docs = []
-        if results and results['metadatas'] and results['metadatas'][0]:
-            for meta in results['metadatas'][0]:
-                file_hash = meta.get('file_hash')
-                chunk_index = meta.get('chunk_index')
+        missing = [key for key in keys if key not in context]
+        if missing:
+            with self.latency.time("fetch"):
+                context.update(self.fetch_chunks(missing))
+
+        self.latency.record("total", time.perf_counter() - started)
+        return [context[key] for key in dict.fromkeys(keys) if key in context]
 
-                record = self.collection_truth.find_one({
-                    "file_hash": file_hash,
-                    "chunk_index": chunk_index
-                })
+    def _lexical_search(self, query: str, n_results: int) -> List[ChunkKey]:
+        """BM25 ranking as (file_hash, chunk_index) keys; picks up saves from other processes."""
+        if self.lexical is None:
+            return []
+        with self.latency.time("lexical"):
+            self.lexical.refresh()
+            hits = self.lexical.search(query, n_results)
+        keys = []
+        for key, _ in hits:
+            meta = self.lexical.meta(key) or {}
+            keys.append((meta.get("file_hash"), meta.get("chunk_index")))
+        return keys
+
+    def fetch_chunks(self, keys: List[ChunkKey]) -> Dict[ChunkKey, str]:
+        """Content for many (file_hash, chunk_index) keys in one round-trip."""
+        by_file: Dict[str, List[int]] = {}
+        for file_hash, chunk_index in keys:
+            by_file.setdefault(file_hash, []).append(chunk_index)
+        clauses = [
+            {"file_hash": file_hash, "chunk_index": {"$in": sorted(set(indexes))}}
+            for file_hash, indexes in by_file.items()
+        ]
+        if not clauses:
+            return {}
+        selector = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+        cursor = self.collection_truth.find(
+            selector, {"_id": 0, "file_hash": 1, "chunk_index": 1, "content": 1}
+        )
+        return {(record["file_hash"], record["chunk_index"]): record["content"] for record in cursor}
 
-                if record:
-                    context_docs.append(record['content'])
+    def query(self, query: str) -> str:
+        """Retrieves context and generates a response."""
+        context_docs = self.retrieve(query)
+        if context_docs is None:
+            return "Error: Could not process query."
 
         if not context_docs:
             return "No relevant information found in the archives."
 
         # 4. Construct Prompt
         context_text = "\n\n---\n\n".join(context_docs)
-        return f"Based on the following research:\n\n{context_text}\n\nAnswer: {query}"
\ No newline at end of file
+        return f"Based on the following research:\n\n{context_text}\n\nAnswer: {query}"
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """count / mean / p50 / p99 (ms) for the lexical, embed, search, fetch and total stages."""
+        return self.latency.stats()
@@ -0,0 +1,271 @@
+"""
+Content-addressed source storage for canon.db.
+
+Component source text lives once per distinct ``source_hash`` in
+``canon_blobs``; ``canon_source_segments`` rows only point at a hash.
+Blobs are compressed with zstd when the ``zstandard`` package is installed
+and zlib otherwise (the codec is stored per blob, so both can coexist).
+
+Nested components (methods inside a class) are stored as ``slice`` blobs:
+an offset/length into their parent's blob instead of a second copy of the
+same text.
+
+Every blob carries a reference count: one per segment row, one per
+``component_history`` row and one per slice that points into it. Blobs are
+deleted as soon as their count reaches zero; the drift detector releases
+history references when it prunes old versions.
+
+Usage:
+    python -m tools.core.blob_store migrate [canon.db]   # convert legacy rows + VACUUM
+    python -m tools.core.blob_store stats [canon.db]
+"""
+
+import hashlib
+import sqlite3
+import sys
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+# Keep IN (...) lists well below SQLite's host parameter limit.
+_SQL_CHUNK = 500
+
+
+def sha256(s: str) -> str:
+    return hashlib.sha256(s.encode()).hexdigest()
+
+
+def _chunks(items, size=_SQL_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ---------------- codecs ----------------
+
+def _compress(text: str):
+    raw = text.encode("utf-8")
+    if zstandard is not None:
+        packed, codec = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), "zstd"
+    else:
+        packed, codec = zlib.compress(raw, ZLIB_LEVEL), "zlib"
+    if len(packed) >= len(raw):
+        return "raw", raw
+    return codec, packed
+
+
+def _decompress(codec: str, data: bytes) -> str:
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but the 'zstandard' package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return bytes(data).decode("utf-8")
+
+
+# ---------------- writes ----------------
+
+def put_blob(conn: sqlite3.Connection, text: str, source_hash: Optional[str] = None,
+             parent_hash: Optional[str] = None, parent_text: Optional[str] = None) -> str:
+    """
+    Store ``text`` (if new) and take one reference to it. Returns its hash.
+
+    When ``parent_text`` contains ``text`` verbatim the blob is stored as a
+    slice of ``parent_hash`` rather than as its own compressed copy.
+    """
+    source_hash = source_hash or sha256(text)
+    updated = conn.execute(
+        "UPDATE canon_blobs SET refcount = refcount + 1 WHERE source_hash=?", (source_hash,)
+    ).rowcount
+    if updated:
+        return source_hash
+
+    offset = parent_text.find(text) if (parent_hash and parent_text and text) else -1
+    if offset >= 0 and parent_hash != source_hash:
+        conn.execute(
+            "INSERT INTO canon_blobs VALUES (?,?,?,?,?,?,?,?)",
+            (source_hash, "slice", parent_hash, offset, len(text), None, len(text.encode("utf-8")), 1),
+        )
+        acquire(conn, [parent_hash])
+    else:
+        codec, data = _compress(text)
+        conn.execute(
+            "INSERT INTO canon_blobs VALUES (?,?,?,?,?,?,?,?)",
+            (source_hash, codec, None, None, None, data, len(text.encode("utf-8")), 1),
+        )
+    return source_hash
+
+
+def acquire(conn: sqlite3.Connection, hashes: Iterable[str]):
+    """Take one additional reference per listed hash (duplicates count twice)."""
+    conn.executemany(
+        "UPDATE canon_blobs SET refcount = refcount + 1 WHERE source_hash=?",
+        [(h,) for h in hashes if h],
+    )
+
+
+def release(conn: sqlite3.Connection, hashes: Iterable[str]) -> int:
+    """Drop one reference per listed hash and delete blobs that reach zero. Returns blobs deleted."""
+    pending = [h for h in hashes if h]
+    deleted = 0
+    while pending:
+        conn.executemany(
+            "UPDATE canon_blobs SET refcount = refcount - 1 WHERE source_hash=?",
+            [(h,) for h in pending],
+        )
+        dead = []
+        bases = []
+        for chunk in _chunks(set(pending)):
+            ph = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT source_hash, base_hash FROM canon_blobs WHERE refcount <= 0 AND source_hash IN ({ph})",
+                chunk,
+            ).fetchall()
+            dead.extend(r[0] for r in rows)
+            bases.extend(r[1] for r in rows if r[1])
+        for chunk in _chunks(dead):
+            conn.execute(
+                f"DELETE FROM canon_blobs WHERE source_hash IN ({','.join('?' * len(chunk))})", chunk
+            )
+        deleted += len(dead)
+        # Deleting a slice releases the reference it held on its base blob
+        pending = bases
+    return deleted
+
+
+def release_orphan_segments(conn: sqlite3.Connection) -> int:
+    """Delete segment rows whose component is gone and release their blobs."""
+    orphans = conn.execute(
+        """
+        SELECT s.component_id, s.source_hash
+        FROM canon_source_segments s
+        LEFT JOIN canon_components c ON c.component_id = s.component_id
+        WHERE c.component_id IS NULL
+        """
+    ).fetchall()
+    for chunk in _chunks([r[0] for r in orphans]):
+        conn.execute(
+            f"DELETE FROM canon_source_segments WHERE component_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+    release(conn, [r[1] for r in orphans])
+    return len(orphans)
+
+
+# ---------------- reads ----------------
+
+def get_blobs(conn: sqlite3.Connection, hashes: Iterable[str]) -> Dict[str, str]:
+    """Resolve many hashes to text, decompressing each base blob at most once."""
+    texts: Dict[str, str] = {}
+    slices = []
+    for chunk in _chunks({h for h in hashes if h}):
+        ph = ",".join("?" * len(chunk))
+        for source_hash, codec, base_hash, start, length, data in conn.execute(
+            f"SELECT source_hash, codec, base_hash, start, length, data FROM canon_blobs "
+            f"WHERE source_hash IN ({ph})",
+            chunk,
+        ):
+            if codec == "slice":
+                slices.append((source_hash, base_hash, start, length))
+            else:
+                texts[source_hash] = _decompress(codec, data)
+
+    if slices:
+        # Bases of nested slices resolve recursively (class -> method -> inner function)
+        missing = {base for _, base, _, _ in slices if base not in texts}
+        if missing:
+            texts.update(get_blobs(conn, missing))
+        for source_hash, base_hash, start, length in slices:
+            if base_hash in texts:
+                texts[source_hash] = texts[base_hash][start:start + length]
+    return texts
+
+
+def get_blob(conn: sqlite3.Connection, source_hash: str) -> Optional[str]:
+    return get_blobs(conn, [source_hash]).get(source_hash)
+
+
+def read_segments(conn: sqlite3.Connection, component_ids: Iterable[str]) -> Dict[str, str]:
+    """Return {component_id: source_text}, handling both legacy inline rows and blob references."""
+    ids = list(component_ids)
+    inline: Dict[str, str] = {}
+    refs: Dict[str, str] = {}
+    for chunk in _chunks(ids):
+        ph = ",".join("?" * len(chunk))
+        for cid, text, source_hash in conn.execute(
+            f"SELECT component_id, source_text, source_hash FROM canon_source_segments "
+            f"WHERE component_id IN ({ph})",
+            chunk,
+        ):
+            if text is not None:
+                inline[cid] = text
+            elif source_hash:
+                refs[cid] = source_hash
+    blobs = get_blobs(conn, refs.values())
+    inline.update({cid: blobs[h] for cid, h in refs.items() if h in blobs})
+    return inline
+
+
+def read_segment(conn: sqlite3.Connection, component_id: str) -> Optional[str]:
+    return read_segments(conn, [component_id]).get(component_id)
+
+
+# ---------------- maintenance ----------------
+
+def migrate_legacy_segments(conn: sqlite3.Connection, batch: int = 1000) -> int:
+    """Move inline ``source_text`` rows into canon_blobs. Returns rows converted."""
+    converted = 0
+    while True:
+        rows = conn.execute(
+            "SELECT component_id, source_text FROM canon_source_segments "
+            "WHERE source_text IS NOT NULL LIMIT ?",
+            (batch,),
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for cid, text in rows:
+            updates.append((put_blob(conn, text), cid))
+        conn.executemany(
+            "UPDATE canon_source_segments SET source_text=NULL, source_hash=? WHERE component_id=?",
+            updates,
+        )
+        conn.commit()
+        converted += len(rows)
+    return converted
+
+
+def stats(conn: sqlite3.Connection) -> Dict[str, int]:
+    blobs, stored, logical = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(byte_size), 0) FROM canon_blobs"
+    ).fetchone()
+    segments = conn.execute("SELECT COUNT(*) FROM canon_source_segments").fetchone()[0]
+    return {"segments": segments, "blobs": blobs, "stored_bytes": stored, "logical_bytes": logical}
+
+
+def main(argv: List[str]) -> int:
+    from tools.core.canon_db import init_db
+
+    if not argv or argv[0] not in ("migrate", "stats"):
+        print("USAGE: python -m tools.core.blob_store (migrate|stats) [canon.db]")
+        return 1
+    conn = init_db(argv[1] if len(argv) > 1 else "canon.db")
+    if argv[0] == "migrate":
+        converted = migrate_legacy_segments(conn)
+        print(f"[*] Converted {converted} legacy segments")
+        conn.execute("VACUUM")
+    for key, value in stats(conn).items():
+        print(f"    {key:14}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
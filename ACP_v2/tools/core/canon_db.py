@@ -1,10 +1,16 @@
 
+import datetime
 import sqlite3
 
 def init_db(db_path="canon.db"):
     conn = sqlite3.connect(db_path)
     c = conn.cursor()
 
+    # Databases created before content-addressed segments lack source_hash
+    existing = {row[1] for row in c.execute("PRAGMA table_info(canon_source_segments)")}
+    if existing and "source_hash" not in existing:
+        c.execute("ALTER TABLE canon_source_segments ADD COLUMN source_hash TEXT")
+
     c.executescript("""
     CREATE TABLE IF NOT EXISTS canon_files (
         file_id TEXT PRIMARY KEY,
@@ -35,7 +41,20 @@ def init_db(db_path="canon.db"):
 
     CREATE TABLE IF NOT EXISTS canon_source_segments (
         component_id TEXT PRIMARY KEY,
-        source_text TEXT
+        source_text TEXT,           -- legacy inline text; NULL once stored in canon_blobs
+        source_hash TEXT
+    );
+
+    -- Content-addressed source text (see tools/core/blob_store.py)
+    CREATE TABLE IF NOT EXISTS canon_blobs (
+        source_hash TEXT PRIMARY KEY,
+        codec TEXT,                 -- zstd | zlib | raw | slice
+        base_hash TEXT,             -- slice: blob this text is cut from
+        start INTEGER,
+        length INTEGER,
+        data BLOB,
+        byte_size INTEGER,
+        refcount INTEGER
     );
 
     CREATE TABLE IF NOT EXISTS canon_symbols (
@@ -155,6 +174,16 @@ def init_db(db_path="canon.db"):
         created_at TEXT
     );
 
+    -- Stat snapshot per file at its last VERIFIED proof (workflow_verify --all skips untouched files)
+    CREATE TABLE IF NOT EXISTS verify_state (
+        file_id TEXT PRIMARY KEY,
+        mtime_ns INTEGER,
+        byte_size INTEGER,
+        proof_id TEXT,
+        proof_status TEXT,
+        verified_at TEXT
+    );
+
     -- ===== PHASE 6: DRIFT DETECTION =====
     
     CREATE TABLE IF NOT EXISTS file_versions (
@@ -192,7 +221,59 @@ def init_db(db_path="canon.db"):
         new_value TEXT,
         detected_at TEXT
     );
+
+    -- ===== PHASE 3: CALL GRAPH METRICS =====
+
+    CREATE TABLE IF NOT EXISTS call_graph_metrics (
+        component_id TEXT PRIMARY KEY,
+        file_id TEXT,
+        qualified_name TEXT,
+        fan_in INTEGER,
+        fan_out INTEGER,
+        external_fan_out INTEGER,
+        orchestrator_score REAL,
+        is_orchestrator INTEGER,
+        updated_at TEXT
+    );
+
+    -- Change log read by graph caches: ingest appends one row per touched file
+    CREATE TABLE IF NOT EXISTS canon_generations (
+        generation INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_id TEXT,
+        changed_at TEXT
+    );
+
+    -- Lookup indexes used by incremental (per-file) analysis passes
+    CREATE INDEX IF NOT EXISTS idx_components_file ON canon_components(file_id);
+    CREATE INDEX IF NOT EXISTS idx_calls_component ON canon_calls(component_id);
+    CREATE INDEX IF NOT EXISTS idx_imports_component ON canon_imports(component_id);
+    CREATE INDEX IF NOT EXISTS idx_edges_caller ON call_graph_edges(caller_id);
+    CREATE INDEX IF NOT EXISTS idx_edges_callee ON call_graph_edges(callee_id);
+    CREATE INDEX IF NOT EXISTS idx_edges_resolved ON call_graph_edges(resolved_name);
+    CREATE INDEX IF NOT EXISTS idx_metrics_file ON call_graph_metrics(file_id);
+    CREATE INDEX IF NOT EXISTS idx_history_version ON component_history(file_version_id);
+    CREATE INDEX IF NOT EXISTS idx_versions_file ON file_versions(file_id, version_number);
+    CREATE INDEX IF NOT EXISTS idx_drift_component ON drift_events(component_id);
+    CREATE INDEX IF NOT EXISTS idx_variables_component ON canon_variables(component_id);
+    CREATE INDEX IF NOT EXISTS idx_types_component ON canon_types(component_id);
+    CREATE INDEX IF NOT EXISTS idx_practice_component ON overlay_best_practice(component_id);
     """)
 
     conn.commit()
     return conn
+
+
+def bump_generation(conn, file_ids):
+    """Record that ``file_ids`` changed; returns the new DB generation."""
+    now = datetime.datetime.utcnow().isoformat()
+    conn.executemany(
+        "INSERT INTO canon_generations (file_id, changed_at) VALUES (?, ?)",
+        [(fid, now) for fid in sorted(set(file_ids))],
+    )
+    conn.commit()
+    return current_generation(conn)
+
+
+def current_generation(conn):
+    row = conn.execute("SELECT MAX(generation) FROM canon_generations").fetchone()
+    return row[0] or 0
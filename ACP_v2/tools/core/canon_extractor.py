@@ -5,6 +5,8 @@ import json
 import re
 import datetime
 
+from tools.core.blob_store import put_blob
+
 def uid():
     return str(uuid.uuid4())
 
@@ -202,6 +204,8 @@ class CanonExtractor(ast.NodeVisitor):
             is_new = True
             print(f"  [NEW]   {qualified_name[:50]:50} | {committed_hash[:8]}")
 
+        parent = self.component_stack[-1] if self.component_stack else None
+
         rec = {
             "component_id": cid,
             "file_id": self.file_id,
@@ -215,7 +219,8 @@ class CanonExtractor(ast.NodeVisitor):
             "end": node.end_lineno,
             "hash": source_hash,
             "committed_hash": committed_hash,
-            "committed_at": committed_at
+            "committed_at": committed_at,
+            "segment": segment,
         }
 
         self.order_counter += 1
@@ -230,10 +235,15 @@ class CanonExtractor(ast.NodeVisitor):
             rec["committed_hash"], rec["committed_at"]
         ))
 
-        # 2. Write to canon_source_segments (The Flesh)
+        # 2. Write to canon_source_segments (The Flesh), text stored by hash
+        put_blob(
+            self.conn, segment, source_hash,
+            parent_hash=parent["hash"] if parent else None,
+            parent_text=parent["segment"] if parent else None,
+        )
         self._write("""
-        INSERT INTO canon_source_segments VALUES (?,?)
-        """, (rec["component_id"], segment))
+        INSERT INTO canon_source_segments (component_id, source_text, source_hash) VALUES (?,?,?)
+        """, (rec["component_id"], None, source_hash))
 
         # PHASE 5: Parse and index comment directives
         try:
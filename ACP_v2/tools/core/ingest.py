@@ -1,6 +1,7 @@
 
 import sys, ast, hashlib, uuid, datetime, os
-from tools.core.canon_db import init_db
+from tools.core.canon_db import init_db, bump_generation
+from tools.core.blob_store import release_orphan_segments
 from tools.core.canon_extractor import CanonExtractor
 from tools.analysis.call_graph_normalizer import CallGraphNormalizer
 from tools.analysis.semantic_rebuilder import SemanticRebuilder
@@ -65,7 +66,7 @@ def main():
         # ===== PHASE 3: PURGE OLD COMPONENTS (Discrepancy Fix 1) =====
         # Delete old components to prevent duplication
         conn.execute("DELETE FROM canon_components WHERE file_id=?", (fid,))
-        conn.execute("DELETE FROM canon_source_segments WHERE component_id NOT IN (SELECT component_id FROM canon_components)")  # Cleanup orphans
+        release_orphan_segments(conn)  # Cleanup orphans (drops unreferenced blobs)
         
         # Update file metadata
         conn.execute(
@@ -146,7 +147,7 @@ def main():
     # ===== PHASE 6: Normalize Call Graph (Phase 3) =====
     # This must run after extraction to have all components registered
     print("[*] Normalizing call graph...")
-    normalizer = CallGraphNormalizer()
+    normalizer = CallGraphNormalizer(conn, file_id=fid)
     normalizer.normalize_calls()
     normalizer.compute_metrics()
     normalizer.detect_orchestrators()
@@ -169,12 +170,15 @@ def main():
     print("[*] Analyzing drift...")
     detector = DriftDetector(conn)
     drift_stats = detector.detect_drift(fid, version_id)
+
+    # Let graph caches (canon API) refresh only the files this ingest touched
+    bump_generation(conn, normalizer.touched_files | {fid})
     
     print(f"[+] Ingest complete.")
     print(f"    File ID: {fid}")
     print(f"    Version: {next_version}")
     print(f"    Components: {component_count}")
-    print(f"    Drift: +{drift_stats['added']} -{drift_stats['removed']} ~{drift_stats['modified']}")
+    print(f"    Drift: +{drift_stats['added']} -{drift_stats['removed']} ~{drift_stats['modified']} >{drift_stats['moved']}")
     print(f"    Run 'python rebuild_verifier.py' next.")
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 import sqlite3
 
+from tools.core.blob_store import read_segments
+
 conn = sqlite3.connect('canon.db')
 c = conn.cursor()
 
@@ -16,10 +18,10 @@ for i, (cid,) in enumerate(comps[:3]):
 
 # Query 2: For each, check source_text
 print("\nChecking source_text for each:")
+segments = read_segments(conn, [cid for (cid,) in comps])
 for i, (cid,) in enumerate(comps):
-    result = c.execute('SELECT source_text FROM canon_source_segments WHERE component_id=?', (cid,)).fetchone()
-    if result:
-        src = result[0]
+    if cid in segments:
+        src = segments[cid]
         preview = (src[:30] if src else "(empty)").replace('\n', '\\n')
         print(f"  {i+1}. {cid[:8]}... -> {len(src) if src else 0} bytes: {preview}")
     else:
@@ -0,0 +1,59 @@
+"""
+Content-hash deduplication for ingestion.
+
+Chunks are identified by the sha256 of their text (``content_hash``), which
+is also their Chroma id, so the same text is embedded and indexed once no
+matter how many files or runs contain it. Before a batch is embedded,
+``known_chunks`` asks both stores in bulk (one query each) which of its
+hashes are already present; those chunks are skipped.
+
+Source files are recorded by the sha256 of their bytes once every chunk is
+stored. ``known_sources`` lets a re-dropped file be skipped before
+extraction, so it costs no parsing or OCR either.
+"""
+
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Set
+
+from tools.common.embedding_cache import text_hash
+
+# The chunk id is the hash the embedding cache already keys vectors by
+content_hash = text_hash
+
+
+def source_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def known_chunks(collection_truth: Any, collection_index: Any, hashes: Iterable[str]) -> Set[str]:
+    """Hashes already stored in the truth collection and, when given, the vector index."""
+    wanted = list(dict.fromkeys(hashes))
+    if not wanted:
+        return set()
+    cursor = collection_truth.find({"content_hash": {"$in": wanted}}, {"_id": 0, "content_hash": 1})
+    found = {doc["content_hash"] for doc in cursor}
+    if found and collection_index is not None:
+        indexed = collection_index.get(ids=sorted(found), include=[])
+        found &= set(indexed.get("ids") or [])
+    return found
+
+
+def known_sources(collection_sources: Any, hashes: Iterable[str]) -> Set[str]:
+    wanted = list(dict.fromkeys(hashes))
+    if not wanted:
+        return set()
+    return {doc["_id"] for doc in collection_sources.find({"_id": {"$in": wanted}}, {"_id": 1})}
+
+
+def record_source(collection_sources: Any, digest: str, path: Path, chunks: int):
+    collection_sources.update_one(
+        {"_id": digest},
+        {"$set": {"file_name": path.name, "chunks": chunks, "ingested_at": datetime.utcnow().isoformat()}},
+        upsert=True,
+    )
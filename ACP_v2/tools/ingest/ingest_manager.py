@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 from pathlib import Path
 import shutil
 
@@ -8,9 +9,10 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 import logging
-from typing import cast, Sequence, List, Dict, Any, Mapping
+from itertools import islice
+from typing import cast, Sequence, List, Dict, Any, Mapping, Optional, Tuple
 from pathlib import Path
-from pymongo import MongoClient
+from pymongo import ASCENDING, MongoClient
 from pymongo.errors import BulkWriteError
 import chromadb
 from datetime import datetime
@@ -19,8 +21,11 @@ from config.settings import settings
 from tools.common.pdf_processor import PDFProcessor
 from tools.common.codebase_processor import CodebaseProcessor
 
-from tools.common.embedding_client import EmbeddingClient
+from tools.common.embedding_client import get_embedding_client
+from tools.common.lexical_index import LexicalIndex
 from tools.common.metadata_extractor import extract_document_metadata
+from tools.ingest.dedup import content_hash, known_chunks, known_sources, record_source, source_hash
+from tools.ingest.pipeline import IngestPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +38,12 @@ class IngestManager:
         self.mongo_client: Any = MongoClient(settings.MONGO_URI)
         self.db = self.mongo_client[settings.DB_NAME]
         self.collection_truth = self.db[settings.COLLECTION_TRUTH]
+        self.collection_sources = self.db[settings.COLLECTION_SOURCES]
+        try:
+            # Pre-flight lookups of known chunks by content hash
+            self.collection_truth.create_index([("content_hash", ASCENDING)])
+        except Exception as e:
+            logger.warning(f"Could not ensure content_hash index: {e}")
         
         # Initialize ChromaDB
         self.chroma_client = chromadb.PersistentClient(path=str(settings.CHROMA_DB_PATH))
@@ -41,7 +52,12 @@ class IngestManager:
         # Initialize Core Engines
         self.pdf_processor = PDFProcessor()
         self.codebase_processor = CodebaseProcessor()
-        self.embedder = EmbeddingClient()
+        self.embedder = get_embedding_client()
+        # Local BM25 index next to the vector index; single files schedule a
+        # delayed save so a burst of staged files is written once
+        self.lexical = LexicalIndex.open(settings.LEXICAL_INDEX_PATH) if settings.LEXICAL_INDEX_PATH else None
+        self._lexical_lock = threading.Lock()
+        self._lexical_timer: Optional[threading.Timer] = None
 
         # Ensure processed/failed directories exist
         self.processed_dir = settings.RAW_LANDING_DIR.parent / "processed"
@@ -49,84 +65,177 @@ class IngestManager:
         self.processed_dir.mkdir(parents=True, exist_ok=True)
         self.failed_dir.mkdir(parents=True, exist_ok=True)
         
-    def process_file(self, file_path: Path) -> bool:
+    def process_file(self, file_path: Path, move: bool = True) -> bool:
         """
         Processes a single file through the ingestion pipeline.
         Routes to the appropriate processor based on file type.
+
+        With ``move=False`` the file stays where it is on success and on
+        failure, for callers (the staging work queue) that retry it and
+        move it themselves.
+
+        Chunks are consumed as the processor yields them and embedded and
+        written every ``INGEST_WRITE_BATCH_SIZE`` chunks, so memory stays
+        bounded on very large documents. A file ingested completely before
+        is skipped unopened, and chunks whose content hash is already
+        stored are skipped before embedding.
         """
         try:
             logger.info(f"Processing: {file_path.name}")
+            source = source_hash(file_path)
+            if known_sources(self.collection_sources, [source]):
+                logger.info(f"Skipping {file_path.name}: already ingested.")
+                if move:
+                    shutil.move(str(file_path), str(self.processed_dir / file_path.name))
+                return True
             # 1. Select Processor Strategy
             if file_path.suffix.lower() == '.pdf':
-                chunks = list(self.pdf_processor.process_file(file_path))
+                chunks = iter(self.pdf_processor.process_file(file_path))
             else:
-                chunks = list(self.codebase_processor.process_file(file_path))
-            if not chunks:
+                chunks = iter(self.codebase_processor.process_file(file_path))
+            # 2. Vectorization and Persistence, one batch at a time
+            total = written = duplicates = skipped = 0
+            while True:
+                batch = list(islice(chunks, settings.INGEST_WRITE_BATCH_SIZE))
+                if not batch:
+                    break
+                batch_written, batch_duplicates, batch_skipped = self._write_chunks(file_path, total, batch)
+                total += len(batch)
+                written += batch_written
+                duplicates += batch_duplicates
+                skipped += batch_skipped
+            if not total:
                 logger.warning(f"No usable content found in {file_path.name}")
                 raise ValueError("No text extracted")
-            # 2. Vectorization and Persistence
-            chroma_ids = []
-            chroma_embeddings = []
-            chroma_metadatas = []
-            mongo_docs = []
-            for i, chunk in enumerate(chunks):
-                content_text = chunk["content"]
-                chunk_meta = chunk["metadata"]
-                file_hash = chunk_meta.get('file_name', file_path.name)
-                doc_id = f"{file_hash}_{i}"
-                vector = self.embedder.get_embedding(content_text)
-                if not vector:
-                    continue
-                mongo_docs.append({
-                    "file_hash": file_hash,
-                    "chunk_index": i,
-                    "content": content_text,
-                    "metadata": chunk_meta,
-                    "ingested_at": datetime.utcnow().isoformat()
-                })
-                chroma_ids.append(doc_id)
-                chroma_embeddings.append(vector)
-                chroma_metadatas.append({
-                    "file_hash": file_hash,
-                    "chunk_index": i,
-                    "page": chunk_meta.get('page_number', 0),
-                    "file_name": chunk_meta.get('file_name', 'unknown')
-                })
-            if mongo_docs:
-                try:
-                    self.collection_truth.insert_many(mongo_docs, ordered=False)
-                except BulkWriteError as bwe:
-                    duplicates = [e for e in bwe.details['writeErrors'] if e['code'] == 11000]
-                    if len(duplicates) == len(mongo_docs):
-                        logger.info(f"Skipping {file_path.name}: All chunks already exist in DB.")
-                        shutil.move(str(file_path), str(self.processed_dir / file_path.name))
-                        return True
-                    elif duplicates:
-                        logger.info(f"Partial insert for {file_path.name}: {len(duplicates)} duplicates skipped.")
-                    else:
-                        error_msg = str(bwe).encode('ascii', 'replace').decode('ascii')
-                        logger.warning(f"MongoDB Bulk Write Error: {error_msg}")
-            if chroma_ids:
-                try:
-                    self.collection_index.add(
-                        ids=chroma_ids,
-                        embeddings=cast(Sequence[float], chroma_embeddings),
-                        metadatas=cast(List[Mapping[str, Any]], chroma_metadatas),
-                        documents=[d['content'] for d in mongo_docs]
-                    )
-                except Exception as e:
-                    logger.warning(f"ChromaDB Write Warning for {file_path.name}: {e}")
+            if skipped + duplicates == total:
+                logger.info(f"Skipping {file_path.name}: All chunks already exist in DB.")
+            else:
+                logger.info(f"{file_path.name}: {written - duplicates} new chunks, {skipped + duplicates} already stored.")
+            if written + skipped == total:
+                record_source(self.collection_sources, source, file_path, total)
+            self._schedule_lexical_save()
             logger.info(f"Successfully processed: {file_path.name}")
-            shutil.move(str(file_path), str(self.processed_dir / file_path.name))
+            if move:
+                shutil.move(str(file_path), str(self.processed_dir / file_path.name))
             return True
         except Exception as e:
             safe_error = str(e).encode('ascii', 'replace').decode('ascii')
             logger.error(f"Error processing file {file_path.name}: {safe_error}")
+            if not move:
+                return False
             try:
                 shutil.move(str(file_path), str(self.failed_dir / file_path.name))
             except Exception as move_err:
                 logger.error(f"Failed to move {file_path.name} to failed dir: {move_err}")
             return False
+
+    def _write_chunks(self, file_path: Path, first_index: int, chunks: List[Dict[str, Any]]) -> Tuple[int, int, int]:
+        """
+        Embed and persist one batch of a file's chunks.
+
+        Returns (documents sent, duplicates, skipped): skipped chunks were
+        already stored (or repeat an earlier chunk of the batch) and are not
+        embedded.
+        """
+        hashes = [content_hash(chunk["content"]) for chunk in chunks]
+        try:
+            known = known_chunks(self.collection_truth, self.collection_index, hashes)
+        except Exception as e:
+            logger.warning(f"Chunk lookup failed for {file_path.name}, embedding the whole batch: {e}")
+            known = set()
+        new: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        for i, (chunk, digest) in enumerate(zip(chunks, hashes), start=first_index):
+            if digest not in known and digest not in new:
+                new[digest] = (i, chunk)
+        skipped = len(chunks) - len(new)
+        if not new:
+            return 0, 0, skipped
+
+        chroma_ids = []
+        chroma_embeddings = []
+        chroma_metadatas = []
+        mongo_docs = []
+        # One batched (and cached) embedding call per batch
+        vectors = self.embedder.embed_many([chunk["content"] for _, chunk in new.values()])
+        for (digest, (i, chunk)), vector in zip(new.items(), vectors):
+            content_text = chunk["content"]
+            chunk_meta = chunk["metadata"]
+            file_hash = chunk_meta.get('file_name', file_path.name)
+            if not vector:
+                continue
+            mongo_docs.append({
+                "file_hash": file_hash,
+                "chunk_index": i,
+                "content_hash": digest,
+                "content": content_text,
+                "metadata": chunk_meta,
+                "ingested_at": datetime.utcnow().isoformat()
+            })
+            chroma_ids.append(digest)
+            chroma_embeddings.append(vector)
+            chroma_metadatas.append({
+                "file_hash": file_hash,
+                "chunk_index": i,
+                "page": chunk_meta.get('page_number', 0),
+                "file_name": chunk_meta.get('file_name', 'unknown')
+            })
+        if self.lexical is not None:
+            self.lexical.add_many(
+                (doc_id, doc["content"], {"file_hash": doc["file_hash"], "chunk_index": doc["chunk_index"]})
+                for doc_id, doc in zip(chroma_ids, mongo_docs)
+            )
+        duplicates = 0
+        duplicate_rows = set()
+        if mongo_docs:
+            try:
+                self.collection_truth.insert_many(mongo_docs, ordered=False)
+            except BulkWriteError as bwe:
+                duplicate_rows = {e['index'] for e in bwe.details['writeErrors'] if e['code'] == 11000}
+                duplicates = len(duplicate_rows)
+                if duplicates == len(mongo_docs):
+                    # Already ingested: the index already holds these chunks too
+                    return len(mongo_docs), duplicates, skipped
+                if not duplicates:
+                    error_msg = str(bwe).encode('ascii', 'replace').decode('ascii')
+                    logger.warning(f"MongoDB Bulk Write Error: {error_msg}")
+        rows = [row for row in range(len(chroma_ids)) if row not in duplicate_rows]
+        if rows:
+            try:
+                self.collection_index.add(
+                    ids=[chroma_ids[row] for row in rows],
+                    embeddings=cast(Sequence[float], [chroma_embeddings[row] for row in rows]),
+                    metadatas=cast(List[Mapping[str, Any]], [chroma_metadatas[row] for row in rows]),
+                    documents=[mongo_docs[row]['content'] for row in rows]
+                )
+            except Exception as e:
+                logger.warning(f"ChromaDB Write Warning for {file_path.name}: {e}")
+        return len(mongo_docs), duplicates, skipped
+
+    def _schedule_lexical_save(self):
+        """Save the BM25 index LEXICAL_SAVE_DELAY_SECONDS from now unless a save is already scheduled."""
+        if self.lexical is None:
+            return
+        with self._lexical_lock:
+            if self._lexical_timer is None:
+                self._lexical_timer = threading.Timer(settings.LEXICAL_SAVE_DELAY_SECONDS, self.flush_lexical_index)
+                self._lexical_timer.daemon = True
+                self._lexical_timer.start()
+
+    def flush_lexical_index(self):
+        """Save pending BM25 additions now (end of a run, or shutdown)."""
+        with self._lexical_lock:
+            if self._lexical_timer is not None:
+                self._lexical_timer.cancel()
+                self._lexical_timer = None
+        self._save_lexical_index()
+
+    def _save_lexical_index(self):
+        if self.lexical is None:
+            return
+        try:
+            self.lexical.save()
+        except OSError as e:
+            logger.warning(f"Could not save lexical index to {self.lexical.path}: {e}")
     
     def process_all(self):
         """Processes all supported files in the raw landing directory recursively."""
@@ -141,14 +250,47 @@ class IngestManager:
             logger.info("No files found to process.")
             return 0
 
-        processed_count = 0
-        for f in all_files:
-            if self.process_file(f):
-                processed_count += 1
+        pipeline = self.build_pipeline()
+        results = pipeline.run(all_files)
+        self.flush_lexical_index()
+        processed_count = sum(1 for ok in results.values() if ok)
 
+        dedup = pipeline.metrics()["dedup"]
         logger.info(f"Ingestion completed. Processed {processed_count}/{len(all_files)}.")
+        logger.info(
+            f"Dedup: {dedup['chunks_new']} new chunks, {dedup['chunks_skipped']} known chunks and "
+            f"{dedup['files_skipped']} known files skipped before embedding."
+        )
+        logger.info(f"Pipeline metrics: {pipeline.metrics()}")
         return processed_count
 
+    def build_pipeline(self, **overrides) -> IngestPipeline:
+        """Staged extract -> embed -> write pipeline over this manager's stores."""
+        options = dict(
+            extract_workers=settings.INGEST_EXTRACT_WORKERS,
+            max_pending_files=settings.INGEST_MAX_PENDING_FILES,
+            embed_batch_size=settings.INGEST_EMBED_BATCH_SIZE,
+            embed_workers=settings.INGEST_EMBED_WORKERS,
+            write_batch_size=settings.INGEST_WRITE_BATCH_SIZE,
+            queue_size=settings.INGEST_QUEUE_SIZE,
+        )
+        options.update(overrides)
+        return IngestPipeline(
+            self.embedder,
+            self.collection_truth,
+            self.collection_index,
+            on_file_done=self._move_processed_file,
+            lexical_index=self.lexical,
+            collection_sources=self.collection_sources,
+            **options,
+        )
+
+    def _move_processed_file(self, file_path: Path, success: bool):
+        dest = self.processed_dir if success else self.failed_dir
+        if success:
+            logger.info(f"Successfully processed: {file_path.name}")
+        shutil.move(str(file_path), str(dest / file_path.name))
+
 if __name__ == "__main__":
     manager = IngestManager()
     count = manager.process_all()
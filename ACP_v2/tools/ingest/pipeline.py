@@ -0,0 +1,526 @@
+"""
+Staged ingestion pipeline used by ``IngestManager.process_all``.
+
+    files -> [extract: process pool] -> batcher -> [embed: N threads] -> [bulk writer] -> on_file_done
+
+  - Extraction runs ``extract_fn(path)`` in a process pool. ``extract_fn``
+    may be a generator: workers forward its chunks in slices as they are
+    produced, so page 1 of a large manual is embedded while later pages are
+    still being extracted. At most ``max_pending_files`` files are in
+    extraction at a time and the slice queue is bounded, so neither a large
+    library nor a single huge file ever sits in memory all at once. Workers
+    OCR scanned pages inline (``init_extract_worker``) rather than each
+    starting its own OCR pool, so OCR stays at about one process per core.
+  - The batcher groups chunks from any number of files into batches of
+    ``embed_batch_size`` texts. Bounded queues between the stages
+    (``queue_size`` batches) provide backpressure: a slow model stalls
+    extraction instead of buffering without limit.
+  - Files whose bytes were ingested completely before (``collection_sources``)
+    are skipped without being extracted. Embed workers first look up each
+    batch's content hashes in both stores (see ``tools.ingest.dedup``) and
+    embed only unknown texts, each once, calling
+    ``embedder.embed_many(texts)`` when the client has it, else
+    ``get_embedding`` per text.
+  - One writer accumulates up to ``write_batch_size`` records and issues one
+    Mongo ``insert_many(ordered=False)`` plus one Chroma ``add`` per batch.
+    A file is reported through ``on_file_done(path, success)`` once all of
+    its chunks have been written.
+
+``metrics()`` returns per-stage item counts, busy time and throughput, and
+the files and chunks skipped as already known versus the new chunks.
+Stores and the embedder are injected, so tests can run the pipeline against
+mongomock / in-memory collections and a local embedding stub.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from tools.ingest.dedup import content_hash, known_chunks, known_sources, record_source, source_hash
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+# Vector placeholder for a chunk that is already stored
+_KNOWN = object()
+# Duplicate key: the chunk was ingested before
+DUPLICATE_KEY_ERROR = 11000
+
+_processors: Dict[str, Any] = {}
+
+
+def init_extract_worker():
+    """Pool initializer: extraction already uses one process per core, so OCR runs inline in each."""
+    os.environ["OCR_INLINE"] = "1"
+
+
+def iter_chunks(path: str) -> Iterator[Dict[str, Any]]:
+    """Default extraction step (runs in a worker process; processors are created once per process)."""
+    file_path = Path(path)
+    if file_path.suffix.lower() == ".pdf":
+        if "pdf" not in _processors:
+            from tools.common.pdf_processor import PDFProcessor
+
+            _processors["pdf"] = PDFProcessor()
+        processor = _processors["pdf"]
+    else:
+        if "text" not in _processors:
+            from tools.common.codebase_processor import CodebaseProcessor
+
+            _processors["text"] = CodebaseProcessor()
+        processor = _processors["text"]
+    return processor.process_file(file_path)
+
+
+def stream_extract(extract_fn: Callable[[str], Iterable[Dict[str, Any]]], path: str, out: Any, slice_size: int):
+    """
+    Worker side of extraction: forward ``extract_fn(path)`` to ``out`` as
+    ``("chunks", path, first_index, chunks)`` slices, then ``("done", path, None, None)``
+    or ``("error", path, None, message)``.
+    """
+    sent = 0
+    pending: List[Dict[str, Any]] = []
+    try:
+        for chunk in extract_fn(path):
+            pending.append(chunk)
+            if len(pending) >= slice_size:
+                out.put(("chunks", path, sent, pending))
+                sent += len(pending)
+                pending = []
+        if pending:
+            out.put(("chunks", path, sent, pending))
+        out.put(("done", path, None, None))
+    except Exception as e:
+        out.put(("error", path, None, str(e)))
+
+
+@dataclass
+class StageMetrics:
+    items: int = 0
+    busy_seconds: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def record(self, items: int, seconds: float):
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        self.items += items
+        self.busy_seconds += seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        end = self.finished_at or time.monotonic()
+        wall = end - self.started_at if self.started_at is not None else 0.0
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 4),
+            "items_per_second": round(self.items / wall, 2) if wall > 0 else 0.0,
+        }
+
+
+@dataclass
+class _FileState:
+    path: Path
+    # known once extraction has finished
+    total: Optional[int] = None
+    received: int = 0
+    done: int = 0
+    written: int = 0
+    duplicates: int = 0
+    # chunks skipped as already stored
+    known: int = 0
+    failed: bool = False
+
+
+@dataclass
+class _Record:
+    file_key: str
+    doc_id: str
+    mongo_doc: Dict[str, Any]
+    metadata: Dict[str, Any]
+    vector: List[float] = field(default_factory=list)
+
+
+class IngestPipeline:
+    """Extraction -> embedding -> persistence with bounded queues between stages."""
+
+    def __init__(
+        self,
+        embedder: Any,
+        collection_truth: Any,
+        collection_index: Any,
+        on_file_done: Optional[Callable[[Path, bool], None]] = None,
+        extract_fn: Callable[[str], Iterable[Dict[str, Any]]] = iter_chunks,
+        extract_executor: Optional[Executor] = None,
+        extract_workers: Optional[int] = None,
+        max_pending_files: int = 16,
+        embed_batch_size: int = 32,
+        embed_workers: int = 4,
+        write_batch_size: int = 256,
+        queue_size: int = 8,
+        lexical_index: Any = None,
+        collection_sources: Any = None,
+    ):
+        self.embedder = embedder
+        self.collection_truth = collection_truth
+        self.collection_index = collection_index
+        self.on_file_done = on_file_done
+        self.extract_fn = extract_fn
+        self.extract_executor = extract_executor
+        self.extract_workers = extract_workers
+        self.max_pending_files = max_pending_files
+        self.embed_batch_size = embed_batch_size
+        self.embed_workers = embed_workers
+        self.write_batch_size = write_batch_size
+        self.queue_size = queue_size
+        self.lexical_index = lexical_index
+        self.collection_sources = collection_sources
+
+        self._stages = {name: StageMetrics() for name in ("extract", "embed", "write")}
+        self._metrics_lock = threading.Lock()
+        self._high_water = {"embed_queue": 0, "write_queue": 0}
+        self._dedup = {"files_skipped": 0, "chunks_skipped": 0, "chunks_new": 0}
+
+    # ---------------- metrics ----------------
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            stats: Dict[str, Any] = {name: stage.as_dict() for name, stage in self._stages.items()}
+            stats["queue_high_water"] = dict(self._high_water)
+            stats["dedup"] = dict(self._dedup)
+        return stats
+
+    def _count(self, name: str, n: int):
+        with self._metrics_lock:
+            self._dedup[name] += n
+
+    def _record(self, stage: str, items: int, seconds: float):
+        with self._metrics_lock:
+            self._stages[stage].record(items, seconds)
+
+    def _put(self, q: "queue.Queue", item: Any, name: str):
+        q.put(item)
+        with self._metrics_lock:
+            self._high_water[name] = max(self._high_water[name], q.qsize())
+
+    # ---------------- run ----------------
+
+    def run(self, files: Iterable[Path]) -> Dict[Path, bool]:
+        """Ingest ``files``; returns path -> success."""
+        files = list(dict.fromkeys(Path(f) for f in files))
+        results: Dict[Path, bool] = {}
+        if not files:
+            return results
+
+        embed_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        write_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        pending_files = threading.BoundedSemaphore(self.max_pending_files)
+        state: Dict[str, _FileState] = {}
+        state_lock = threading.Lock()
+        submitted: Dict[str, float] = {}
+        sources: Dict[str, str] = {}
+
+        def finish(file_key: str, success: bool, source_known: bool = False):
+            with state_lock:
+                file_state = state.pop(file_key)
+            results[file_state.path] = success
+            stored = file_state.written + file_state.known
+            if file_state.total and file_state.duplicates + file_state.known == file_state.total:
+                logger.info(f"{file_state.path.name}: all chunks already existed in DB.")
+            if success and not source_known and file_key in sources and stored == file_state.total:
+                try:
+                    record_source(self.collection_sources, sources[file_key], file_state.path, stored)
+                except Exception as e:
+                    logger.warning(f"Could not record {file_state.path.name} as ingested: {e}")
+            if self.on_file_done:
+                try:
+                    self.on_file_done(file_state.path, success)
+                except Exception as e:
+                    logger.error(f"Post-processing of {file_state.path.name} failed: {e}")
+
+        executor = self.extract_executor or ProcessPoolExecutor(
+            max_workers=self.extract_workers, initializer=init_extract_worker
+        )
+        # Worker processes need a managed queue to stream slices back
+        manager = multiprocessing.Manager() if isinstance(executor, ProcessPoolExecutor) else None
+        extracted: Any = (manager.Queue if manager else queue.Queue)(maxsize=self.queue_size)
+
+        # -- stage 1: extraction (process pool, bounded by pending_files) --
+        def on_extract_done(future: Future, file_key: str):
+            # stream_extract reports its own errors; this catches pool failures
+            if future.exception() is not None:
+                extracted.put(("error", file_key, None, str(future.exception())))
+
+        def feed():
+            known: Set[str] = set()
+            if self.collection_sources is not None:
+                for path in files:
+                    try:
+                        sources[str(path)] = source_hash(path)
+                    except OSError:
+                        pass  # reported by extraction
+                try:
+                    known = known_sources(self.collection_sources, sources.values())
+                except Exception as e:
+                    logger.warning(f"Source lookup failed, extracting every file: {e}")
+            for path in files:
+                file_key = str(path)
+                if sources.get(file_key) in known:
+                    extracted.put(("known", file_key, None, None))
+                    continue
+                pending_files.acquire()
+                submitted[file_key] = time.monotonic()
+                try:
+                    future = executor.submit(stream_extract, self.extract_fn, file_key, extracted, self.embed_batch_size)
+                except Exception as e:  # e.g. a broken process pool
+                    future = Future()
+                    future.set_exception(e)
+                future.add_done_callback(lambda f, k=file_key: on_extract_done(f, k))
+
+        # -- stage 2: batching across files --
+        def batch():
+            buffer: List[Tuple[str, int, Dict[str, Any]]] = []
+
+            def flush():
+                if buffer:
+                    self._put(embed_q, list(buffer), "embed_queue")
+                    buffer.clear()
+
+            extracting = len(files)
+            while extracting:
+                try:
+                    kind, file_key, index, payload = extracted.get(timeout=0.05)
+                except queue.Empty:
+                    flush()  # idle: do not hold a partial batch back
+                    continue
+                with state_lock:
+                    file_state = state.setdefault(file_key, _FileState(Path(file_key)))
+                if kind == "chunks":
+                    with state_lock:
+                        file_state.received += len(payload)
+                    for i, chunk in enumerate(payload, start=index):
+                        buffer.append((file_key, i, chunk))
+                        if len(buffer) >= self.embed_batch_size:
+                            flush()
+                    continue
+
+                extracting -= 1
+                if kind == "known":
+                    logger.info(f"Skipping {file_state.path.name}: already ingested.")
+                    self._count("files_skipped", 1)
+                    finish(file_key, True, source_known=True)
+                    continue
+
+                # extraction of this file has finished
+                pending_files.release()
+                self._record("extract", 1, time.monotonic() - submitted.pop(file_key, time.monotonic()))
+                if kind == "error":
+                    logger.error(f"Error extracting {file_state.path.name}: {payload}")
+                with state_lock:
+                    file_state.total = file_state.received
+                    file_state.failed = file_state.failed or kind == "error"
+                    # the writer may already have persisted every chunk
+                    complete = file_state.done == file_state.total
+                if not file_state.total:
+                    if kind == "done":
+                        logger.warning(f"No usable content found in {file_state.path.name}")
+                    finish(file_key, False)
+                elif complete:
+                    finish(file_key, not file_state.failed)
+            flush()
+            with self._metrics_lock:
+                self._stages["extract"].finished_at = time.monotonic()
+            for _ in range(self.embed_workers):
+                embed_q.put(_END)
+
+        # -- stage 3: embedding (concurrent batched requests) --
+        def embed():
+            while True:
+                items = embed_q.get()
+                if items is _END:
+                    write_q.put(_END)
+                    return
+                started = time.monotonic()
+                hashes = [content_hash(chunk["content"]) for _, _, chunk in items]
+                vectors = self._embed_new(items, hashes)
+                self._record("embed", len(items), time.monotonic() - started)
+                self._put(write_q, (items, hashes, vectors), "write_queue")
+
+        # -- stage 4: bulk persistence --
+        def write():
+            finished_workers = 0
+            records: List[_Record] = []
+            # chunks handled per file in the current batch (including ones without a vector)
+            handled: Dict[str, int] = {}
+            known: Dict[str, int] = {}
+            batch_hashes: Set[str] = set()
+
+            def flush():
+                if not handled:
+                    return
+                started = time.monotonic()
+                try:
+                    duplicates, failed = self._persist(records), False
+                except Exception as e:
+                    logger.error(f"Persisting {len(records)} chunks failed: {e}")
+                    duplicates, failed = {}, True
+                self._record("write", len(records), time.monotonic() - started)
+                self._count("chunks_new", len(records))
+                self._count("chunks_skipped", sum(known.values()))
+                completed = []
+                with state_lock:
+                    for file_key, count in handled.items():
+                        file_state = state[file_key]
+                        file_state.failed = file_state.failed or failed
+                        file_state.done += count
+                        file_state.written += sum(1 for r in records if r.file_key == file_key)
+                        file_state.duplicates += duplicates.get(file_key, 0)
+                        file_state.known += known.get(file_key, 0)
+                        if file_state.done == file_state.total:
+                            completed.append((file_key, not file_state.failed))
+                for file_key, success in completed:
+                    finish(file_key, success)
+                records.clear()
+                handled.clear()
+                known.clear()
+                batch_hashes.clear()
+
+            while finished_workers < self.embed_workers:
+                try:
+                    item = write_q.get(timeout=0.05)
+                except queue.Empty:
+                    flush()
+                    continue
+                if item is _END:
+                    finished_workers += 1
+                    continue
+                items, hashes, vectors = item
+                for (file_key, index, chunk), digest, vector in zip(items, hashes, vectors):
+                    handled[file_key] = handled.get(file_key, 0) + 1
+                    if vector is _KNOWN or (vector and digest in batch_hashes):
+                        known[file_key] = known.get(file_key, 0) + 1
+                    elif vector:
+                        batch_hashes.add(digest)
+                        records.append(self._build_record(file_key, index, chunk, vector, digest))
+                if len(records) >= self.write_batch_size:
+                    flush()
+            flush()
+
+        threads = [threading.Thread(target=feed, name="ingest-feed"), threading.Thread(target=batch, name="ingest-batch")]
+        threads += [threading.Thread(target=embed, name=f"ingest-embed-{n}") for n in range(self.embed_workers)]
+        threads.append(threading.Thread(target=write, name="ingest-write"))
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            if self.extract_executor is None:
+                executor.shutdown()
+            if manager is not None:
+                manager.shutdown()
+            with self._metrics_lock:
+                now = time.monotonic()
+                for stage in self._stages.values():
+                    stage.finished_at = stage.finished_at or now
+        return results
+
+    # ---------------- stage helpers ----------------
+
+    def _embed_new(self, items: List[Tuple[str, int, Dict[str, Any]]], hashes: List[str]) -> List[Any]:
+        """Vectors for one batch; ``_KNOWN`` for stored chunks, and each new text embedded once."""
+        try:
+            known = known_chunks(self.collection_truth, self.collection_index, hashes)
+        except Exception as e:
+            logger.warning(f"Chunk lookup failed, embedding the whole batch: {e}")
+            known = set()
+        texts = {digest: chunk["content"] for digest, (_, _, chunk) in zip(hashes, items) if digest not in known}
+        try:
+            embedded = dict(zip(texts, self._embed(list(texts.values())))) if texts else {}
+        except Exception as e:
+            logger.error(f"Embedding batch failed: {e}")
+            embedded = {}
+        return [_KNOWN if digest in known else embedded.get(digest) for digest in hashes]
+
+    def _embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        embed_many = getattr(self.embedder, "embed_many", None)
+        if embed_many is not None:
+            return list(embed_many(texts))
+        return [self.embedder.get_embedding(text) for text in texts]
+
+    @staticmethod
+    def _build_record(file_key: str, index: int, chunk: Dict[str, Any], vector: List[float], digest: str) -> _Record:
+        chunk_meta = chunk["metadata"]
+        file_hash = chunk_meta.get("file_name", Path(file_key).name)
+        return _Record(
+            file_key=file_key,
+            doc_id=digest,
+            mongo_doc={
+                "file_hash": file_hash,
+                "chunk_index": index,
+                "content_hash": digest,
+                "content": chunk["content"],
+                "metadata": chunk_meta,
+                "ingested_at": datetime.utcnow().isoformat(),
+            },
+            metadata={
+                "file_hash": file_hash,
+                "chunk_index": index,
+                "page": chunk_meta.get("page_number", 0),
+                "file_name": chunk_meta.get("file_name", "unknown"),
+            },
+            vector=vector,
+        )
+
+    def _persist(self, records: List[_Record]) -> Dict[str, int]:
+        """Bulk-write one batch; returns duplicate counts per file."""
+        duplicates: Dict[str, int] = {}
+        if not records:
+            return duplicates
+        duplicate_rows = set()
+        try:
+            self.collection_truth.insert_many([r.mongo_doc for r in records], ordered=False)
+        except Exception as e:
+            # pymongo / mongomock BulkWriteError
+            write_errors = (getattr(e, "details", None) or {}).get("writeErrors")
+            if write_errors is None:
+                raise
+            for error in write_errors:
+                if error.get("code") == DUPLICATE_KEY_ERROR:
+                    file_key = records[error["index"]].file_key
+                    duplicates[file_key] = duplicates.get(file_key, 0) + 1
+                    duplicate_rows.add(error["index"])
+            others = [err for err in write_errors if err.get("code") != DUPLICATE_KEY_ERROR]
+            if others:
+                error_msg = str(others[0].get("errmsg", e)).encode("ascii", "replace").decode("ascii")
+                logger.warning(f"MongoDB Bulk Write Error ({len(others)} docs): {error_msg}")
+        # a duplicate (file_hash, chunk_index) is indexed already, possibly under its pre-hash id
+        new_records = [r for i, r in enumerate(records) if i not in duplicate_rows]
+        if new_records:
+            try:
+                self.collection_index.add(
+                    ids=[r.doc_id for r in new_records],
+                    embeddings=[r.vector for r in new_records],
+                    metadatas=[r.metadata for r in new_records],
+                    documents=[r.mongo_doc["content"] for r in new_records],
+                )
+            except Exception as e:
+                logger.warning(f"ChromaDB Write Warning ({len(new_records)} chunks): {e}")
+        if self.lexical_index is not None:
+            self.lexical_index.add_many(
+                (r.doc_id, r.mongo_doc["content"], {"file_hash": r.metadata["file_hash"], "chunk_index": r.metadata["chunk_index"]})
+                for r in records
+            )
+        return duplicates
@@ -78,6 +78,7 @@ def main():
             print("="*60)
             print(answer)
             print("="*60 + "\n")
+            logging.info(f"Retrieval latency: {controller.latency_stats()}")
         except Exception as e:
             logging.error(f"Retrieval failed: {e}")
             print(f"\n[CRITICAL] Inference engine error: {e}")
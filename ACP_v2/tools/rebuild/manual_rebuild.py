@@ -2,6 +2,8 @@ import sqlite3
 import ast
 import hashlib
 
+from tools.core.blob_store import read_segments
+
 conn = sqlite3.connect('canon.db')
 c = conn.cursor()
 
@@ -19,11 +21,12 @@ rebuilt_parts = []
 query_result = c.execute('SELECT component_id FROM canon_components WHERE file_id=? AND parent_id IS NULL ORDER BY order_index', (fid,)).fetchall()
 print(f"Query returned {len(query_result)} rows")
 
+segments = read_segments(conn, [cid for (cid,) in query_result])
 for i, (cid,) in enumerate(query_result):
-    src_row = c.execute('SELECT source_text FROM canon_source_segments WHERE component_id=?', (cid,)).fetchone()
-    if src_row and src_row[0]:
-        rebuilt_parts.append(src_row[0])
-        print(f"  {i+1}. Added: {len(src_row[0])} bytes")
+    text = segments.get(cid)
+    if text:
+        rebuilt_parts.append(text)
+        print(f"  {i+1}. Added: {len(text)} bytes")
     else:
         print(f"  {i+1}. MISSING or EMPTY segment for {cid[:8]}...")
 
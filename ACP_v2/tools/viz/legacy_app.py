@@ -57,6 +57,13 @@ except Exception as e:
     print(f"Error importing LLM UI: {e}")
     render_llm_workflow_builder_tab_fn = None
 
+try:
+    # Segments written after content-addressed storage live in canon_blobs
+    from tools.core.blob_store import read_segment as _read_segment
+    read_segment_fn: Optional[Callable[..., Optional[str]]] = _read_segment
+except ImportError:
+    read_segment_fn = None
+
 # Page configuration
 st.set_page_config(
     page_title="Canonical Code Platform",
@@ -404,13 +411,17 @@ elif tab == "📊 Analysis":
                 
                 with left:
                     st.markdown("#### 📝 Source Code")
-                    source = conn.execute("""
-                        SELECT source_text FROM canon_source_segments
-                        WHERE component_id = ?
-                    """, (comp_id,)).fetchone()
+                    if read_segment_fn:
+                        source_text = read_segment_fn(conn, comp_id)
+                    else:
+                        row = conn.execute("""
+                            SELECT source_text FROM canon_source_segments
+                            WHERE component_id = ?
+                        """, (comp_id,)).fetchone()
+                        source_text = row[0] if row else None
                     
-                    if source:
-                        st.code(source[0], language="python")
+                    if source_text:
+                        st.code(source_text, language="python")
                     else:
                         st.info("No source code found")
                 
@@ -784,6 +795,7 @@ elif tab == "⚙️ Settings":
         "canon_files",
         "canon_components",
         "canon_source_segments",
+        "canon_blobs",
         "overlay_semantic",
         "overlay_best_practice",
         "file_versions",